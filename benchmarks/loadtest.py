@@ -0,0 +1,250 @@
+# 同時セッション数の負荷試験
+#
+#   python benchmarks/loadtest.py --sessions 40 --output loadtest.json
+#
+# streamlit.testing.v1.AppTest で app.py のセッションを N 個立ち上げ、
+# ゲーム開始 → サイコロ → 投資 → 保有の売却 → ゲーム終了画面 までを自動で進める。
+# AppTest はスレッドセーフではないため、全セッションを同時に保持したまま
+# 1スレッドで1手ずつ順番に進める（サーバーでも GIL により再実行はほぼ直列になる）。
+# 再実行（rerun）ごとの所要時間とプロセスの RSS を測り、JSON で書き出す。
+# --baseline を渡すと前回の結果と比べ、許容範囲を超えて悪化していれば終了コード 1 を返す。
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+APP_PATH = Path(__file__).resolve().parent.parent / "app.py"
+
+# 手番ごとに保有を1件売る確率
+SELL_PROBABILITY = 0.2
+
+
+# 現在のプロセスの常駐メモリ（バイト）
+def current_rss():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(q / 100 * (len(values) - 1))))
+    return values[index]
+
+
+# 1セッション分の自動プレイ
+class ScriptedSession:
+    def __init__(self, seed, buy_probability, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.random = random.Random(seed)
+        self.buy_probability = buy_probability
+        self.app = AppTest.from_file(str(APP_PATH), default_timeout=timeout)
+        self.timings = []
+
+    def run(self, action):
+        start = time.perf_counter()
+        self.app.run()
+        self.timings.append((action, time.perf_counter() - start))
+        if self.app.exception:
+            raise RuntimeError(f"{action}: {self.app.exception[0].message}")
+
+    def click(self, prefix, action):
+        for button in self.app.button:
+            if button.label.startswith(prefix):
+                button.click()
+                self.run(action)
+                return True
+        return False
+
+    def has_button(self, prefix):
+        return any(button.label.startswith(prefix) for button in self.app.button)
+
+    # 1手ずつ進めるジェネレーター（ゲーム終了画面に着いたら終わる）
+    def play(self):
+        self.run("load")
+        yield
+        self.click("🚀", "start")
+        yield
+
+        while not self.has_button("🔄"):
+            sell = [button for button in self.app.button if button.label.startswith("💰 売却")]
+            if sell and self.random.random() < SELL_PROBABILITY:
+                # 保有のどれかを今の評価額で売る
+                self.random.choice(sell).click()
+                self.run("sell")
+            elif self.has_button("🎲"):
+                self.click("🎲", "dice")
+            elif self.has_button("🍾"):
+                self.click("🍾", "bonus")
+            elif self.has_button("✅ 購入"):
+                if self.random.random() < self.buy_probability:
+                    self.click("✅ 購入", "invest")
+                else:
+                    self.click("❌ 購入しない", "skip")
+            elif self.has_button("✅ ターン"):
+                self.click("✅ ターン", "end_turn")
+            else:
+                raise RuntimeError("操作できるボタンが見つかりません")
+            yield
+
+
+def run_load_test(sessions, seed, buy_probability, max_steps, timeout):
+    # モジュールの読み込み分を RSS に含めないよう、先に1セッション分だけ最後まで進めておく
+    for _ in ScriptedSession(seed - 1, buy_probability, timeout).play():
+        pass
+
+    rss_before = current_rss()
+    errors = []
+    completed = 0
+
+    # セッション状態を保持したまま RSS を測るため、AppTest は最後まで解放しない
+    scripted = [ScriptedSession(seed + i, buy_probability, timeout) for i in range(sessions)]
+    active = {i: session.play() for i, session in enumerate(scripted)}
+    steps = dict.fromkeys(active, 0)
+
+    start = time.perf_counter()
+    while active:
+        for i, game in list(active.items()):
+            try:
+                next(game)
+                steps[i] += 1
+                if steps[i] > max_steps:
+                    errors.append(f"session {i}: {max_steps} 手以内に終わりませんでした")
+                    del active[i]
+            except StopIteration:
+                completed += 1
+                del active[i]
+            except Exception as e:
+                errors.append(f"session {i}: {e}")
+                del active[i]
+    elapsed = time.perf_counter() - start
+    rss_after = current_rss()
+
+    timings = [t for session in scripted for t in session.timings]
+    latencies = [duration * 1000 for _, duration in timings]
+    by_action = {}
+    for action, duration in timings:
+        by_action.setdefault(action, []).append(duration * 1000)
+
+    return {
+        'config': {
+            'sessions': sessions,
+            'seed': seed,
+            'buy_probability': buy_probability,
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'streamlit': _streamlit_version(),
+            'platform': platform.platform(),
+        },
+        'completed_sessions': completed,
+        'errors': errors,
+        'elapsed_sec': elapsed,
+        'reruns': len(latencies),
+        'reruns_per_sec': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'latency_ms': {
+            'p50': percentile(latencies, 50),
+            'p90': percentile(latencies, 90),
+            'p99': percentile(latencies, 99),
+            'max': max(latencies, default=0.0),
+            'mean': statistics.fmean(latencies) if latencies else 0.0,
+        },
+        'by_action': {
+            action: {
+                'count': len(values),
+                'p50': percentile(values, 50),
+                'p99': percentile(values, 99),
+            }
+            for action, values in sorted(by_action.items())
+        },
+        'rss_bytes': {
+            'before': rss_before,
+            'after': rss_after,
+            'per_session': (rss_after - rss_before) / max(sessions, 1),
+        },
+    }
+
+
+def _streamlit_version():
+    import streamlit
+    return streamlit.__version__
+
+
+# 前回の結果との比較（悪化した指標の説明を返す）
+def compare(report, baseline, tolerance):
+    regressions = []
+    if report['reruns_per_sec'] < baseline['reruns_per_sec'] * (1 - tolerance):
+        regressions.append(
+            f"reruns/sec {report['reruns_per_sec']:.1f} < {baseline['reruns_per_sec']:.1f}")
+    for key in ('p50', 'p99'):
+        if report['latency_ms'][key] > baseline['latency_ms'][key] * (1 + tolerance):
+            regressions.append(
+                f"{key} {report['latency_ms'][key]:.1f}ms > {baseline['latency_ms'][key]:.1f}ms")
+    if report['rss_bytes']['per_session'] > baseline['rss_bytes']['per_session'] * (1 + tolerance):
+        regressions.append(
+            f"RSS/session {report['rss_bytes']['per_session'] / 1024:.0f}KB > "
+            f"{baseline['rss_bytes']['per_session'] / 1024:.0f}KB")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streamlit アプリの同時セッション負荷試験")
+    parser.add_argument('--sessions', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--buy-probability', type=float, default=0.7)
+    parser.add_argument('--max-steps', type=int, default=1000, help="1セッションあたりの最大手数")
+    parser.add_argument('--timeout', type=float, default=30.0, help="1回の再実行のタイムアウト（秒）")
+    parser.add_argument('--output', type=Path, default=None, help="結果を書き出す JSON ファイル")
+    parser.add_argument('--db', default=None,
+                        help="ゲームの保存先（省略時は一時ファイル、空文字で保存しない）")
+    parser.add_argument('--baseline', type=Path, default=None, help="比較する前回の結果（JSON）")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="悪化を許容する割合")
+    args = parser.parse_args(argv)
+
+    # 保存（SQLite への書き込み）も含めて測る
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['SUGOROKU_DB'] = str(Path(tmp) / "loadtest.db") if args.db is None else args.db
+        report = run_load_test(args.sessions, args.seed, args.buy_probability, args.max_steps, args.timeout)
+        # 一時ディレクトリを消す前に書き込みを終わらせる
+        from sugoroku.store import close_stores
+        close_stores()
+
+    print(f"セッション: {report['completed_sessions']}/{args.sessions} 完了, "
+          f"再実行 {report['reruns']} 回 / {report['elapsed_sec']:.1f} 秒 "
+          f"({report['reruns_per_sec']:.1f} 回/秒)")
+    print(f"レイテンシ: p50 {report['latency_ms']['p50']:.1f}ms, p99 {report['latency_ms']['p99']:.1f}ms")
+    print(f"RSS/セッション: {report['rss_bytes']['per_session'] / 1024:.0f}KB")
+    for error in report['errors']:
+        print(f"エラー: {error}")
+
+    if args.output:
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+
+    status = 1 if report['errors'] else 0
+    if args.baseline:
+        regressions = compare(report, json.loads(args.baseline.read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"悪化: {regression}")
+        if regressions:
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
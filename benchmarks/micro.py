@@ -0,0 +1,293 @@
+# ゲームの主な処理のマイクロベンチマーク
+#
+#   python benchmarks/micro.py --output micro.json
+#   python benchmarks/micro.py --baseline micro.json --threshold 0.25
+#
+# Streamlit は何もしない代わりのモジュールに差し替えて画面（sugoroku.ui）を読み込むので、画面なしで動く。
+# 各処理を合計 --min-time 秒以上になる回数だけ繰り返す計測を --repeat 回行い、1回あたりの中央値と最小値を出す。
+# --baseline を渡すと前回の結果と中央値で比べ、--threshold の割合を超えて遅くなった処理があれば終了コード 1 を返す。
+import argparse
+import fnmatch
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import types
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+# 何を呼ばれても何もしない Streamlit の代わり
+class _Null:
+    def __call__(self, *args, **kwargs):
+        return self
+
+    def __getattr__(self, name):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __bool__(self):
+        return False
+
+
+class _SessionState(dict):
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+
+# @st.cache_resource と @st.fragment(key=...) の両方の書き方に対応するデコレーター
+def _passthrough_decorator(func=None, **kwargs):
+    if func is None:
+        return lambda f: f
+    return func
+
+
+def _columns(spec, *args, **kwargs):
+    return [_Null() for _ in range(spec if isinstance(spec, int) else len(spec))]
+
+
+def install_streamlit_stub():
+    null = _Null()
+    st = types.ModuleType("streamlit")
+    st.__getattr__ = lambda name: null
+    st.__version__ = "stub"
+    st.session_state = _SessionState()
+    st.query_params = {}
+    st.cache_resource = _passthrough_decorator
+    st.cache_data = _passthrough_decorator
+    st.fragment = _passthrough_decorator
+    st.columns = _columns
+    st.tabs = _columns
+    st.button = lambda *args, **kwargs: False
+    st.checkbox = lambda *args, **kwargs: False
+    st.text_input = lambda label, value="", **kwargs: value
+    st.number_input = lambda label, value=None, **kwargs: value
+
+    components = types.ModuleType("streamlit.components")
+    components_v1 = types.ModuleType("streamlit.components.v1")
+    components_v1.declare_component = lambda *args, **kwargs: (lambda *a, default=None, **kw: default)
+    components.v1 = components_v1
+    st.components = components
+
+    sys.modules["streamlit"] = st
+    sys.modules["streamlit.components"] = components
+    sys.modules["streamlit.components.v1"] = components_v1
+    return st
+
+
+def load_ui():
+    from sugoroku.ui import charts, results
+    return charts, results
+
+
+# 1回あたりの所要時間（秒）を repeat 回分返す
+# 初回（遅延 import など）は数えず、合計 min_time 秒以上になる回数を決めてから計測する
+def measure(func, repeat, min_time):
+    func()
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return number, timings
+
+
+# 計測する処理（名前 → 引数なしの関数）
+def build_cases(st, charts, results):
+    from sugoroku import analytics, bots, engine, forecast, game
+    from sugoroku.board import BoardConfig, generate_board, generate_boards
+    from sugoroku.components import board_layout
+    from sugoroku.journal import CASH, REVENUE, Journal
+    from sugoroku.leaderboard import Leaderboard
+    from sugoroku.market import generate_candlestick_data
+    from sugoroku.player import Player
+    from sugoroku.portfolio import CANDLES_PER_TURN, Portfolio
+    from sugoroku.rng import GameRNG
+    from sugoroku.rules import INVESTMENT_TYPES, MASS_TYPES
+    from sugoroku.store import GameStore
+    from sugoroku.tables import TableRegistry
+    from sugoroku.tournament import always_buy, sell_last
+    from sugoroku.undo import UndoHistory, checkpoint
+
+    rng = random.Random(0)
+    game_rng = GameRNG(0)
+    large_config = BoardConfig(100_000, cols=100)
+    large_board = generate_board(large_config, game_rng.board)
+    large_board.positions('investment')
+
+    # 最後まで進めたゲーム（常に買って売らずに持つ）
+    finished = game.new_game("bench", [f"プレイヤー{i + 1}" for i in range(4)], seed=0)
+    while not finished['game_finished']:
+        kind, decision = bots.next_decision(finished, always_buy, sell_last)
+        game.apply_event(finished, game.draw_event(finished, kind, **decision))
+    players = finished['players']
+    board = finished['board']
+
+    # 10万人の順位表と、イベントの卓の一覧
+    scores = random.Random(1)
+    leaderboard = Leaderboard()
+    for i in range(100_000):
+        leaderboard.update(i, scores.randrange(100_000))
+    registry = TableRegistry()
+
+    candles = generate_candlestick_data()
+    journal = Journal()
+    sell_state = dict(finished, game_finished=False, turn=6)
+    player = Player("ベンチ", 0)
+
+    # 4人で1000件の保有（ターンの終わりの評価し直し）
+    book = Portfolio()
+    for i in range(1000):
+        book.open(i % 4, INVESTMENT_TYPES[i % len(INVESTMENT_TYPES)], 2000, game_rng.candles(), 1)
+
+    # 元に戻す手順を記録しながら最後まで進めたゲーム（最後の手順を取り消してやり直す）
+    recorded = game.new_game("bench-undo", [f"プレイヤー{i + 1}" for i in range(4)], seed=0)
+    history = UndoHistory()
+    while not recorded['game_finished']:
+        kind, decision = bots.next_decision(recorded, always_buy, sell_last)
+        history.begin(recorded)
+        event = game.draw_event(recorded, kind, **decision)
+        game.apply_event(recorded, event)
+        history.record(event)
+    last = checkpoint(recorded)
+
+    cases = {
+        'generate_board': lambda: generate_board(rng=game_rng.board),
+        'generate_board[100k]': lambda: generate_board(large_config, game_rng.board),
+        'generate_boards[1000]': lambda: generate_boards(1000, rng=game_rng.board),
+        'next_position[100k]': lambda: large_board.next_position('investment', 54_321),
+        'board_layout': lambda: json.dumps(board_layout(board, players)),
+        'bonus_time': lambda: engine.resolve_bonus(player, 1, rng),
+        'generate_candlestick_data': lambda: generate_candlestick_data(),
+        'GameRNG.candles': game_rng.candles,
+        'candlestick_figure': lambda: charts.build_candlestick_figure(candles),
+        'candlestick_figure+to_json': lambda: charts.build_candlestick_figure(candles).to_json(),
+        'bot_choose_sell': lambda: bots.choose_sell(sell_state),
+        'portfolio.revalue[1000]': lambda: book.revalue(CANDLES_PER_TURN, 4),
+        'journal.post': lambda: journal.post(CASH, REVENUE, 100),
+        'check_invariants': lambda: game.check_invariants(finished),
+        'undo.checkpoint': lambda: checkpoint(recorded, last),
+        'undo.undo+redo': lambda: (history.undo(recorded), history.redo(recorded)),
+        'ledger.to_frame': lambda: [p.ledger.to_frame() for p in players],
+        'analytics.analyze': lambda: analytics.analyze(players),
+        'analytics_figures': lambda: charts.build_analytics_figures(analytics.analyze(players)),
+        'forecast.equity_outlook': lambda: forecast.equity_outlook(dict(finished, game_finished=False, turn=1)),
+        'forecast.board_bias': lambda: forecast.board_bias(board),
+        'forecast.board_bias[100k]': lambda: forecast.board_bias(large_board),
+        'leaderboard.update[100k]': lambda: leaderboard.update(scores.randrange(100_000), scores.randrange(100_000)),
+        'leaderboard.page[100k]': lambda: (leaderboard.items(50_000, 50_020), leaderboard.rank(7)),
+        'tables.report': lambda: registry.report("BENCH", finished['game_id'], "卓", finished),
+    }
+    for mass_type in MASS_TYPES:
+        cases[f'apply_mass_effect[{mass_type}]'] = (
+            lambda mass_type=mass_type: engine.apply_mass_effect(player, mass_type, 1, rng))
+
+    # 終了画面の描画（Streamlit の呼び出しは何もしない）
+    def end_screen():
+        st.session_state.clear()
+        st.session_state.update(finished)
+        results.game_end_screen()
+    cases['game_end_screen'] = end_screen
+
+    # 保存（呼び出し側で待つのはキューに積むところまで）
+    store = GameStore(str(Path(tempfile.mkdtemp()) / "bench.db"))
+    event = game.end_turn_event(finished, None)
+    cases['store.record[end_turn]'] = lambda: store.record(finished, event)
+
+    bots.get_policy()
+    return cases, store
+
+
+def run_benchmarks(pattern, repeat, min_time):
+    st = install_streamlit_stub()
+    charts, results = load_ui()
+    cases, store = build_cases(st, charts, results)
+
+    results = {}
+    for name, func in cases.items():
+        if not fnmatch.fnmatch(name, pattern):
+            continue
+        number, timings = measure(func, repeat, min_time)
+        results[name] = {
+            'number': number,
+            'median_us': statistics.median(timings) * 1e6,
+            'min_us': min(timings) * 1e6,
+        }
+        print(f"  {name:<32} {results[name]['median_us']:>12,.1f} µs  (最小 {results[name]['min_us']:,.1f} µs, {number} 回 × {repeat})")
+    store.close()
+
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'config': {'repeat': repeat, 'min_time': min_time},
+        'results': results,
+    }
+
+
+# 前回の結果との比較（遅くなった処理の説明を返す）
+def compare(report, baseline, threshold):
+    regressions = []
+    for name, result in report['results'].items():
+        base = baseline['results'].get(name)
+        if base is not None and result['median_us'] > base['median_us'] * (1 + threshold):
+            regressions.append(
+                f"{name}: {result['median_us']:,.1f}µs > {base['median_us']:,.1f}µs "
+                f"(+{result['median_us'] / base['median_us'] - 1:.0%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ゲームの主な処理のマイクロベンチマーク")
+    parser.add_argument('--filter', default='*', help="計測する処理の名前（ワイルドカード可）")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2, help="1回の計測の最短時間（秒）")
+    parser.add_argument('--output', type=Path, default=None, help="結果を書き出す JSON ファイル")
+    parser.add_argument('--baseline', type=Path, default=None, help="比較する前回の結果（JSON）")
+    parser.add_argument('--threshold', type=float, default=0.25, help="遅くなってよい割合")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.filter, args.repeat, args.min_time)
+    if args.output:
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+
+    status = 0
+    if args.baseline:
+        regressions = compare(report, json.loads(args.baseline.read_text()), args.threshold)
+        for regression in regressions:
+            print(f"悪化: {regression}")
+        if regressions:
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+# 起動時間のベンチマーク（オートスケールで増えたワーカーが最初の画面を返すまでの時間）
+#
+#   python benchmarks/startup.py --output startup.json
+#   python benchmarks/startup.py --baseline startup.json --threshold 0.25
+#
+# 計測はすべて新しいプロセスで行い、--repeat 回の中央値を出す。
+#   import      streamlit と画面（sugoroku.ui）の import にかかる時間と、そのとき読み込まれた重いモジュール
+#   render:*    開始画面・ゲーム中の画面・終了画面の初回と2回目の描画時間（AppTest）
+# 重い依存（pandas・plotly の図）は使う画面まで読み込まない。import と開始画面・ゲーム中の画面で
+# 読み込まれたら、その旨を出して終了コード 1 を返す（AppTest 自体が plotly を読み込むので描画では pandas だけを見る）。
+# --baseline を渡すと前回の結果と中央値で比べ、--threshold の割合を超えて遅くなった項目があれば終了コード 1 を返す。
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+APP_PATH = ROOT / "app.py"
+
+# 読み込まれたら気付きたい重いモジュール
+HEAVY_MODULES = ('pandas', 'pyarrow', 'plotly.graph_objs', 'scipy')
+
+# 画面ごとに、読み込んではいけないモジュール
+# （カスタムコンポーネントを表示すると Streamlit が必ず pyarrow を読み込むので、描画では pyarrow は見ない）
+FORBIDDEN = {
+    'import': ('pandas', 'pyarrow', 'plotly.graph_objs'),
+    'render:start': ('pandas',),
+    'render:game': ('pandas',),
+}
+
+SCENARIOS = ('import', 'render:start', 'render:game', 'render:end')
+
+
+def _loaded(before):
+    return sorted(name for name in HEAVY_MODULES if name in sys.modules and name not in before)
+
+
+# 子プロセス: import の時間
+def child_import():
+    sys.path.insert(0, str(ROOT))
+    start = time.perf_counter()
+    import streamlit  # noqa: F401
+    streamlit_seconds = time.perf_counter() - start
+
+    before = set(sys.modules)
+    start = time.perf_counter()
+    import sugoroku.ui  # noqa: F401
+    return {
+        'timings': {'import_streamlit': streamlit_seconds, 'import_ui': time.perf_counter() - start},
+        'loaded': _loaded(before),
+    }
+
+
+# 子プロセス: 画面の初回と2回目の描画時間
+def child_render(screen):
+    sys.path.insert(0, str(ROOT))
+    os.environ.setdefault('SUGOROKU_DB', "")
+    os.environ.setdefault('SUGOROKU_HUB_PORT', "")
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(APP_PATH), default_timeout=120)
+    if screen != 'start':
+        from sugoroku import game
+        state = game.new_game("startup", [f"プレイヤー{i + 1}" for i in range(4)], seed=0, bots=(1, 2, 3))
+        if screen == 'end':
+            from sugoroku import bots
+            while not state['game_finished']:
+                kind, decision = bots.next_decision(state)
+                game.apply_event(state, game.draw_event(state, kind, **decision))
+        for key, value in state.items():
+            at.session_state[key] = value
+        at.session_state['action_messages'] = []
+
+    before = set(sys.modules)
+    start = time.perf_counter()
+    at.run()
+    first = time.perf_counter() - start
+    if at.exception:
+        raise SystemExit(f"{screen}: {at.exception}")
+    loaded = _loaded(before)
+
+    start = time.perf_counter()
+    at.run()
+    return {
+        'timings': {f'{screen}_first': first, f'{screen}_second': time.perf_counter() - start},
+        'loaded': loaded,
+    }
+
+
+def run_child(scenario):
+    output = subprocess.run(
+        [sys.executable, __file__, '--child', scenario],
+        check=True, capture_output=True, text=True, cwd=ROOT,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run_benchmarks(repeat):
+    samples = {}
+    loaded = {}
+    for scenario in SCENARIOS:
+        for _ in range(repeat):
+            result = run_child(scenario)
+            for name, seconds in result['timings'].items():
+                samples.setdefault(name, []).append(seconds)
+            loaded[scenario] = sorted(set(loaded.get(scenario, [])) | set(result['loaded']))
+
+    results = {}
+    for name, values in samples.items():
+        results[name] = {'median_ms': statistics.median(values) * 1e3, 'min_ms': min(values) * 1e3}
+        print(f"  {name:<24} {results[name]['median_ms']:>10,.1f} ms  (最小 {results[name]['min_ms']:,.1f} ms, {repeat} 回)")
+    for scenario, modules in loaded.items():
+        print(f"  {scenario:<24} 読み込まれた重いモジュール: {', '.join(modules) or 'なし'}")
+
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'config': {'repeat': repeat},
+        'results': results,
+        'loaded': loaded,
+    }
+
+
+# 読み込んではいけないモジュールが読み込まれた画面の説明
+def check_lazy(report):
+    problems = []
+    for scenario, forbidden in FORBIDDEN.items():
+        found = [name for name in report['loaded'].get(scenario, []) if name in forbidden]
+        if found:
+            problems.append(f"{scenario}: {', '.join(found)} が読み込まれました")
+    return problems
+
+
+# 前回の結果との比較（遅くなった項目の説明を返す）
+def compare(report, baseline, threshold):
+    regressions = []
+    for name, result in report['results'].items():
+        base = baseline['results'].get(name)
+        if base is not None and result['median_ms'] > base['median_ms'] * (1 + threshold):
+            regressions.append(
+                f"{name}: {result['median_ms']:,.1f}ms > {base['median_ms']:,.1f}ms "
+                f"(+{result['median_ms'] / base['median_ms'] - 1:.0%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="起動時間のベンチマーク")
+    parser.add_argument('--repeat', type=int, default=5, help="各項目を測るプロセスの数")
+    parser.add_argument('--output', type=Path, default=None, help="結果を書き出す JSON ファイル")
+    parser.add_argument('--baseline', type=Path, default=None, help="比較する前回の結果（JSON）")
+    parser.add_argument('--threshold', type=float, default=0.25, help="遅くなってよい割合")
+    parser.add_argument('--child', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child is not None:
+        result = child_import() if args.child == 'import' else child_render(args.child.split(':', 1)[1])
+        print(json.dumps(result))
+        return 0
+
+    report = run_benchmarks(args.repeat)
+    if args.output:
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+
+    status = 0
+    for problem in check_lazy(report):
+        print(f"遅延読み込み: {problem}")
+        status = 1
+    if args.baseline:
+        for regression in compare(report, json.loads(args.baseline.read_text()), args.threshold):
+            print(f"悪化: {regression}")
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+# 年間収益勝ち組ゲーム（会社経営すごろく）のルールとシミュレーション
@@ -0,0 +1,146 @@
+# 終了したゲームの分析
+#
+# 全プレイヤーの取引履歴を1つの表にまとめ、プレイヤー・ターン・種類ごとの集計を pandas の groupby で一度に行う。
+# 純資産は取引履歴から組み立て直す（収益・費用・ボーナス・保有の評価損益はそのまま、借入と投資は純資産を変えず、
+# 売却は評価額で売るので変えない）。保有の番号（holding 列）のない以前の売却は、直前の投資額との差だけ変える。
+import numpy as np
+import pandas as pd
+
+from .rules import INITIAL_CASH, NUM_TURNS
+
+# 取引の種類 → キャッシュフロー計算書の区分
+CF_CATEGORIES = {
+    '収益': '営業CF',
+    '費用': '営業CF',
+    'ボーナス': '営業CF',
+    '投資': '投資CF',
+    '売却益': '投資CF',
+    '売却損': '投資CF',
+    '借入': '財務CF',
+}
+CF_ORDER = ('営業CF', '投資CF', '財務CF')
+
+PL_TYPES = ('収益', '費用', 'ボーナス')
+SALE_TYPES = ('売却益', '売却損')
+VALUATION_TYPE = '評価損益'
+SALE_REASON = '投資の損益'
+
+
+# 全プレイヤーの取引履歴を1つの表にする（player 列はプレイヤーの番号）
+# 売却の行には取得額（cost）、すべての行に純資産の増減（equity_change）を付ける
+# 評価損益の行はキャッシュの動きがないので、キャッシュフローの区分はない
+def combined_frame(players):
+    frames = [player.ledger.to_frame(copy=True) for player in players]
+    frame = pd.concat(frames, ignore_index=True)
+    frame.insert(0, 'player', np.repeat(np.arange(len(players)), [len(f) for f in frames]))
+
+    kind = frame['type'].astype(str)
+    is_buy = kind == '投資'
+    is_sale = kind.isin(SALE_TYPES)
+
+    # 売却の取得額は同じ保有の番号の取得の行から引く（番号のない以前の売却は、そのプレイヤーの直前の投資）
+    legacy = frame['holding'] == 0
+    buys = frame[is_buy & ~legacy]
+    costs = pd.Series(-buys['amount'].to_numpy(), index=pd.MultiIndex.from_arrays([buys['player'], buys['holding']]))
+    cost = pd.Series(costs.reindex(pd.MultiIndex.from_arrays([frame['player'], frame['holding']])).to_numpy(),
+                     index=frame.index)
+    previous = (-frame['amount']).where(is_buy).groupby(frame['player']).ffill()
+    frame['cost'] = cost.where(~legacy, previous).where(is_sale)
+    frame['equity_change'] = np.select(
+        [kind.isin(PL_TYPES) | (kind == VALUATION_TYPE), is_sale & legacy],
+        [frame['amount'], frame['amount'] - frame['cost'].fillna(0)],
+        0,
+    ).astype(np.int64)
+    frame['cf_category'] = kind.map(CF_CATEGORIES)
+    return frame
+
+
+# ターンごとの現金・純資産（行: ターン 0〜最後、列: プレイヤーの番号）。ターン 0 は開始時
+def turn_curves(frame, num_players, num_turns=NUM_TURNS):
+    turns = pd.RangeIndex(0, max(num_turns, int(frame['turn'].max()) if len(frame) else 0) + 1, name='turn')
+    columns = pd.RangeIndex(num_players, name='player')
+    by_turn = frame.groupby(['turn', 'player'])
+
+    cash = (by_turn['cash_after'].last().unstack('player')
+            .reindex(index=turns, columns=columns).ffill().fillna(INITIAL_CASH).astype(np.int64))
+    equity = (by_turn['equity_change'].sum().unstack('player')
+              .reindex(index=turns, columns=columns, fill_value=0).fillna(0).cumsum() + INITIAL_CASH).astype(np.int64)
+    return cash, equity
+
+
+# 理由ごとの収益と費用（保有の評価損益と売却の損益は「投資の損益」にまとめる）
+def pl_breakdown(frame):
+    kind = frame['type'].astype(str)
+    investment = kind.isin(SALE_TYPES) | (kind == VALUATION_TYPE)
+    items = frame[kind.isin(PL_TYPES) | investment]
+    reason = items['reason'].astype(str).where(~investment[items.index], SALE_REASON)
+    amount = items['equity_change']
+    breakdown = (pd.DataFrame({
+        'player': items['player'],
+        'side': np.where(amount >= 0, '収益', '費用'),
+        'reason': reason,
+        'amount': amount,
+    }).groupby(['player', 'side', 'reason'], as_index=False)['amount'].sum())
+    return breakdown[breakdown['amount'] != 0].reset_index(drop=True)
+
+
+# 区分ごとのキャッシュフロー（行: プレイヤーの番号、列: 営業CF・投資CF・財務CF）
+def cash_flow_totals(frame, num_players):
+    return (frame.groupby(['player', 'cf_category'])['amount'].sum().unstack('cf_category')
+            .reindex(index=pd.RangeIndex(num_players, name='player'), columns=list(CF_ORDER), fill_value=0)
+            .fillna(0).astype(np.int64))
+
+
+# 投資1件ごとの取得額・売却額（保有中なら評価額）・利回り
+# portfolio を渡すと、売らずに持っている保有も open を True にして加える
+def investment_returns(frame, portfolio=None):
+    sales = frame[frame['type'].astype(str).isin(SALE_TYPES)]
+    returns = pd.DataFrame({
+        'player': sales['player'].to_numpy(),
+        'turn': sales['turn'].to_numpy(),
+        'asset': sales['reason'].astype(str).str.removesuffix('の売却').to_numpy(),
+        'cost': sales['cost'].to_numpy(dtype=np.int64),
+        'proceeds': sales['amount'].to_numpy(),
+        'open': np.zeros(len(sales), dtype=bool),
+    })
+    if portfolio is not None and len(portfolio):
+        n = len(portfolio)
+        holdings = [portfolio.holding(holding_id) for holding_id in portfolio.ids[:n].tolist()]
+        held = pd.DataFrame({
+            'player': [holding.owner for holding in holdings],
+            'turn': [holding.turn for holding in holdings],
+            'asset': [holding.investment_type for holding in holdings],
+            'cost': np.array([holding.cost for holding in holdings], dtype=np.int64),
+            'proceeds': [holding.value for holding in holdings],
+            'open': np.ones(n, dtype=bool),
+        })
+        returns = pd.concat([returns, held], ignore_index=True)
+    returns['roi'] = returns['proceeds'] / returns['cost'] - 1
+    return returns
+
+
+# プレイヤーごとの投資の合計と、合計での利回り
+def investment_summary(returns, num_players):
+    totals = (returns.groupby('player')[['cost', 'proceeds']].sum()
+              .reindex(pd.RangeIndex(num_players, name='player'), fill_value=0))
+    totals['count'] = returns.groupby('player').size().reindex(totals.index, fill_value=0)
+    totals['roi'] = (totals['proceeds'] / totals['cost'].where(totals['cost'] > 0) - 1)
+    return totals
+
+
+# 終了したゲームの分析結果をまとめて返す（portfolio は最後まで持っていた保有）
+def analyze(players, num_turns=NUM_TURNS, portfolio=None):
+    frame = combined_frame(players)
+    num_players = len(players)
+    cash, equity = turn_curves(frame, num_players, num_turns)
+    returns = investment_returns(frame, portfolio)
+    return {
+        'names': [player.name for player in players],
+        'ledger': frame,
+        'cash': cash,
+        'equity': equity,
+        'pl': pl_breakdown(frame),
+        'cash_flow': cash_flow_totals(frame, num_players),
+        'investments': returns,
+        'investment_summary': investment_summary(returns, num_players),
+    }
@@ -0,0 +1,177 @@
+# ボードの設定・生成・マスの種類ごとの位置の索引
+#
+# マスの数は種類ごとに決まった数（quota）ちょうどにして、その並びを NumPy で一様に並べ替える。
+# 以前のように確実に置くマスを後から上書きしないので、種類ごとの数がずれない。
+# 大きなボード（長時間のイベント用）でも、マスは int8 のコード配列1本で持つ。
+import numpy as np
+
+from .rules import BOARD_SIZE, BOARD_COLS, MASS_TYPES, MASS_MINIMUMS
+
+# マスの種類を整数コードで扱う
+MASS_NAMES = tuple(MASS_TYPES)
+MASS_CODES = {mass_type: code for code, mass_type in enumerate(MASS_NAMES)}
+
+LAYOUTS = ('serpentine', 'rows')
+
+
+# ボードの設定
+#   size:     マスの数
+#   cols:     表示の列数
+#   layout:   'serpentine'（行ごとに折り返す蛇行）か 'rows'（毎行左から右）
+#   quotas:   種類ごとのマスの数（省略すると MASS_TYPES の weight の比で size に合わせる）
+#   minimums: 少なくとも置くマスの数（省略するとルールの minimum。既定では投資マスとボーナスマス）
+#   max_bias: ボードの偏り（forecast.board_bias）の上限。指定するとこれを超えるボードは並べ直す
+class BoardConfig:
+    __slots__ = ('size', 'cols', 'layout', 'quotas', 'max_bias')
+
+    def __init__(self, size=BOARD_SIZE, cols=BOARD_COLS, layout='serpentine', quotas=None, minimums=None,
+                 max_bias=None):
+        if layout not in LAYOUTS:
+            raise ValueError(f"layout は {', '.join(LAYOUTS)} のいずれかです")
+        if minimums is None:
+            minimums = MASS_MINIMUMS
+        if quotas is None:
+            quotas = _scaled_quotas(size, minimums)
+        if sum(quotas.values()) != size:
+            raise ValueError(f"マスの数の合計 {sum(quotas.values())} が size {size} と一致しません")
+        for mass_type, count in minimums.items():
+            if quotas.get(mass_type, 0) < count:
+                raise ValueError(f"{mass_type} は {count} マス以上必要です")
+
+        self.size = size
+        self.cols = cols
+        self.layout = layout
+        self.quotas = {mass_type: quotas.get(mass_type, 0) for mass_type in MASS_NAMES}
+        self.max_bias = max_bias
+
+    def __eq__(self, other):
+        return isinstance(other, BoardConfig) and self.__getstate__() == other.__getstate__()
+
+    def __getstate__(self):
+        return {'size': self.size, 'cols': self.cols, 'layout': self.layout, 'quotas': self.quotas,
+                'max_bias': self.max_bias}
+
+    # max_bias がなかった頃に保存した設定は、偏りを確かめない設定として読む
+    def __setstate__(self, state):
+        self.max_bias = None
+        for key, value in state.items():
+            setattr(self, key, value)
+
+    # 種類コードの順に並べたマスの数
+    def counts(self):
+        return np.array([self.quotas[mass_type] for mass_type in MASS_NAMES], dtype=np.int64)
+
+
+# weight の比で size マスを配分する（最大剰余法）
+# 最低数に足りない種類の分は、最低数を超えている種類のうち最も多いものから1マスずつ回す
+def _scaled_quotas(size, minimums):
+    if sum(minimums.values()) > size:
+        raise ValueError(f"{size} マスでは必要なマスを置けません")
+
+    weights = np.array([MASS_TYPES[mass_type]['weight'] for mass_type in MASS_NAMES], dtype=np.float64)
+    exact = weights / weights.sum() * size
+    counts = np.floor(exact).astype(np.int64)
+    remainder = size - counts.sum()
+    counts[np.argsort(-(exact - counts), kind='stable')[:remainder]] += 1
+
+    quotas = dict(zip(MASS_NAMES, counts.tolist()))
+    for mass_type, count in minimums.items():
+        while quotas[mass_type] < count:
+            donor = max((t for t in MASS_NAMES if quotas[t] > minimums.get(t, 0) and t != mass_type),
+                        key=quotas.get)
+            quotas[donor] -= 1
+            quotas[mass_type] += 1
+    return quotas
+
+
+DEFAULT_CONFIG = BoardConfig()
+
+
+class Board:
+    __slots__ = ('codes', 'config', '_index')
+
+    def __init__(self, codes, config=DEFAULT_CONFIG):
+        self.codes = codes
+        self.config = config
+        self._index = None
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, position):
+        return MASS_NAMES[self.codes[position]]
+
+    def __iter__(self):
+        names = MASS_NAMES
+        return (names[code] for code in self.codes.tolist())
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    # 種類ごとのマスの位置（昇順）。初めて使うときに一度だけ作る
+    def positions(self, mass_type):
+        if self._index is None:
+            order = np.argsort(self.codes, kind='stable')
+            bounds = np.concatenate(([0], np.cumsum(np.bincount(self.codes, minlength=len(MASS_NAMES)))))
+            self._index = [order[bounds[code]:bounds[code + 1]] for code in range(len(MASS_NAMES))]
+        return self._index[MASS_CODES[mass_type]]
+
+    def count(self, mass_type):
+        return len(self.positions(mass_type))
+
+    # position より先（一周して戻る）で最初の mass_type のマスと、そこまでのマス数（なければ None）
+    def next_position(self, mass_type, position):
+        positions = self.positions(mass_type)
+        if len(positions) == 0:
+            return None
+        i = int(np.searchsorted(positions, position, side='right'))
+        target = int(positions[i if i < len(positions) else 0])
+        return target, (target - position - 1) % len(self.codes) + 1
+
+    # 保存するのはコードのバイト列と設定だけ（索引は読み込み後に作り直す）
+    def __getstate__(self):
+        return {'codes': self.codes.tobytes(), 'config': self.config}
+
+    def __setstate__(self, state):
+        self.codes = np.frombuffer(state['codes'], dtype=np.int8).copy()
+        self.config = state['config']
+        self._index = None
+
+
+# 偏りの上限があるとき、並べ直す回数の上限（超えたらそれまでで最も偏りの小さいボードにする）
+MAX_BOARD_TRIES = 64
+
+
+# 1枚のボードを生成する（rng は numpy.random.Generator）
+# config.max_bias があれば、偏りがその範囲に収まるまで並べ直す（同じ rng なら同じボードになる）
+def generate_board(config=DEFAULT_CONFIG, rng=None):
+    rng = np.random.default_rng() if rng is None else rng
+    codes = np.repeat(np.arange(len(MASS_NAMES), dtype=np.int8), config.counts())
+    if config.max_bias is None:
+        return Board(rng.permutation(codes), config)
+
+    from .forecast import board_biases
+
+    best, best_bias = None, None
+    for _ in range(MAX_BOARD_TRIES):
+        candidate = rng.permutation(codes)
+        bias = abs(board_biases(candidate[None, :])[0])
+        if best is None or bias < best_bias:
+            best, best_bias = candidate, bias
+        if bias <= config.max_bias:
+            break
+    return Board(best, config)
+
+
+# n 枚のボードを一括生成し、(n, size) のコード配列で返す
+def generate_boards(n, config=DEFAULT_CONFIG, rng=None):
+    rng = np.random.default_rng() if rng is None else rng
+    codes = np.repeat(np.arange(len(MASS_NAMES), dtype=np.int8), config.counts())
+    return rng.permuted(np.broadcast_to(codes, (n, config.size)), axis=1)
+
+
+# 文字列のボード（list）をコード配列に変換
+def encode_board(board):
+    if isinstance(board, Board):
+        return board.codes
+    return np.array([MASS_CODES[mass_type] for mass_type in board], dtype=np.int8)
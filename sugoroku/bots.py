@@ -0,0 +1,244 @@
+# コンピューターのプレイヤー
+#
+# 投資するかどうかと、保有のどれを今売るかを事前に計算した表で決める（1回の判断は保有ごとに表を1回引くだけ）。
+#
+# 値動きは平均が変わらない（martingale）ので、売却額の期待値はいつ売っても同じになる。
+# そこでコンピューターは「最後にトップの相手より純資産が多い確率」を最大にする。
+# 残りのターンでの純資産の差のぶれを正規分布で近似すると、取得額の比率 r で確定したときの評価は
+#   Φ(z + a (r - 1))   z = その保有を取得額で数えたときの差 / σ,  a = 取得額 / σ,  σ = 残りターンでの差の標準偏差
+# となる（売らずに持ち続けた保有は、最後の評価額で同じ式になる）。
+# 負けているとき（z < 0）は値動きに賭けて持ち続け、勝っているときは早めに確定する。
+# 保有はターンの終わりごとに CANDLES_PER_TURN 本ずつ進むので、残りの評価の回数 m と比率 r を状態とする
+# 最適停止問題を、generate_candlestick_data で生成した値動きから推定した1回の評価分の推移確率で
+# 後ろ向きに解き、(z, a, m, r) ごとに売るかどうかの表を作る。保有が複数あれば1件ずつ表を引く。
+#
+# 表を解くには数秒かかるので、事前に解いた表を sugoroku/policy.npz に入れておき、読み込むだけにする
+# （作り直すときは python -m sugoroku.bots）。ファイルの表は、ルール・ターン数・格子・表の作り方の版が
+# 同じときだけ使う。別のルールなどで使えなければ、サーバーの起動時に warm_up で裏で1度だけ作る。
+import argparse
+import json
+import math
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .market import CLOSE, generate_candlestick_data
+from .portfolio import CANDLES_PER_TURN
+from .rules import INITIAL_CASH, NUM_CANDLES, NUM_TURNS, RULES
+
+# 表の格子
+Z_GRID = np.linspace(-3.0, 3.0, 25)
+LOG_A_GRID = np.linspace(math.log(0.05), math.log(4.0), 16)
+LOG_R_GRID = np.linspace(-1.6, 1.6, 129)
+
+# 事前に解いた表のファイル
+POLICY_PATH = Path(__file__).with_name('policy.npz')
+
+# 表の作り方（推移の推定・ぶれのシミュレーション・評価の式）を変えたら上げる
+POLICY_VERSION = 1
+
+# 表を解くときの値動きの本数・シミュレーションのゲーム数・シード
+BUILD_PATHS = 1 << 14
+BUILD_GAMES = 20_000
+BUILD_SEED = 0
+
+_policy = None
+_policy_lock = threading.Lock()
+
+
+class SellPolicy:
+    def __init__(self, stop, sigma_turn):
+        self.stop = stop              # (z, a, 残りの評価の回数, r) → True なら売る
+        self.sigma_turn = sigma_turn  # 1ターンあたりの純資産の差の標準偏差
+        self._r_one = _grid_index(LOG_R_GRID, 0.0)
+
+    # 現在の差 gap と投資額 amount を、残り remaining_turns ターン分のぶれで割った表の添字
+    def situation(self, gap, amount, remaining_turns):
+        sigma = self.sigma_turn * math.sqrt(max(remaining_turns, 0.5))
+        return _grid_index(Z_GRID, gap / sigma), _grid_index(LOG_A_GRID, math.log(max(amount, 1) / sigma))
+
+    # 残り remaining 回の評価があり、比率 ratio のとき売るか
+    def should_sell(self, situation, remaining, ratio):
+        z, a = situation
+        remaining = min(max(remaining, 0), self.stop.shape[2] - 1)
+        return bool(self.stop[z, a, remaining, _grid_index(LOG_R_GRID, math.log(max(ratio, 1e-9)))])
+
+    # 買って持ち続ける価値が、買わない（すぐ売るのと同じ）より高いときだけ買う
+    def should_buy(self, situation, remaining):
+        return not self.should_sell(situation, remaining, 1.0)
+
+
+# 等間隔の格子で最も近い点の添字（範囲外は端）
+def _grid_index(grid, value):
+    step = grid[1] - grid[0]
+    return min(len(grid) - 1, max(0, int(round((value - grid[0]) / step))))
+
+
+# 1本ごとの log(終値) の変化を格子上の推移確率にする
+# 変化量が格子の間に落ちたときは、両隣の点に距離に応じて分ける（平均がずれないように）
+def _transition_matrix(n_paths, rng):
+    close = generate_candlestick_data(n_paths, rng=rng)[:, :, CLOSE]
+    steps = np.diff(np.log(close), axis=1).ravel() / (LOG_R_GRID[1] - LOG_R_GRID[0])
+    lower = np.floor(steps).astype(np.int64)
+    upper_weight = steps - lower
+
+    offset = lower.min()
+    weights = (np.bincount(lower - offset, weights=1 - upper_weight, minlength=lower.max() - offset + 2)
+               + np.bincount(lower - offset + 1, weights=upper_weight, minlength=lower.max() - offset + 2))
+    weights /= weights.sum()
+
+    size = len(LOG_R_GRID)
+    rows = np.arange(size)
+    matrix = np.zeros((size, size))
+    for shift, weight in enumerate(weights, start=offset):
+        np.add.at(matrix, (rows, np.clip(rows + shift, 0, size - 1)), weight)
+    return matrix
+
+
+# 1ターンあたりの2人の純資産の差の標準偏差（半分の確率で投資するシミュレーションから）
+def _turn_sigma(n_games, seed):
+    from .simulator import simulate
+
+    equity = simulate(n_games, num_players=2, buy_probability=0.5, seed=seed)['equity']
+    return float(np.std(equity[:, 0] - equity[:, 1]) / math.sqrt(NUM_TURNS))
+
+
+# 売却の表を後ろ向き帰納法で作る（1回の評価は CANDLES_PER_TURN 本分の推移）
+def build_policy(n_paths=BUILD_PATHS, n_games=BUILD_GAMES, seed=BUILD_SEED):
+    rng = np.random.default_rng(seed)
+    transition = np.linalg.matrix_power(_transition_matrix(n_paths, rng), CANDLES_PER_TURN)
+
+    z = Z_GRID[:, None, None]
+    a = np.exp(LOG_A_GRID)[None, :, None]
+    r = np.exp(LOG_R_GRID)[None, None, :]
+    erf = np.frompyfunc(math.erf, 1, 1)
+    payoff = (0.5 * (1 + erf((z + a * (r - 1)) / math.sqrt(2)))).astype(np.float64)
+
+    stop = np.empty((len(Z_GRID), len(LOG_A_GRID), NUM_TURNS + 1, len(LOG_R_GRID)), dtype=bool)
+    stop[:, :, 0, :] = True
+    value = payoff
+    for m in range(1, NUM_TURNS + 1):
+        hold = value @ transition.T
+        # 同じ価値なら売る（不要な値動きのリスクを取らない）
+        stop[:, :, m, :] = payoff >= hold - 1e-9
+        value = np.maximum(payoff, hold)
+
+    return SellPolicy(stop, _turn_sigma(n_games, seed))
+
+
+# 表を解いた条件（ファイルの表は、これが今の条件と同じときだけ使う）
+def policy_key():
+    return json.dumps({
+        'version': POLICY_VERSION,
+        'rules': RULES.digest,
+        'num_turns': NUM_TURNS,
+        'num_candles': NUM_CANDLES,
+        'candles_per_turn': CANDLES_PER_TURN,
+        'initial_cash': INITIAL_CASH,
+        'grids': [[float(grid[0]), float(grid[-1]), len(grid)] for grid in (Z_GRID, LOG_A_GRID, LOG_R_GRID)],
+        'build': [BUILD_PATHS, BUILD_GAMES, BUILD_SEED],
+    }, sort_keys=True)
+
+
+def save_policy(policy, path=POLICY_PATH):
+    np.savez_compressed(path, key=np.array(policy_key()), stop=policy.stop, sigma_turn=np.array(policy.sigma_turn))
+
+
+# ファイルの表を読み込む（ファイルがないか、条件が違えば None）
+def load_policy(path=POLICY_PATH):
+    try:
+        with np.load(path) as data:
+            if str(data['key']) != policy_key():
+                return None
+            return SellPolicy(data['stop'], float(data['sigma_turn']))
+    except FileNotFoundError:
+        return None
+
+
+# 表をプロセスで1度だけ用意して使い回す（ファイルの表が使えなければ作る）
+def get_policy():
+    global _policy
+    if _policy is not None:
+        return _policy
+    with _policy_lock:
+        if _policy is None:
+            _policy = load_policy() or build_policy()
+    return _policy
+
+
+# 表の用意を裏のスレッドで始める（サーバーの起動時に呼び、最初のコンピューターの手番で待たないようにする）
+def warm_up():
+    thread = threading.Thread(target=get_policy, name="sugoroku-bots-policy", daemon=True)
+    thread.start()
+    return thread
+
+
+# 手番のプレイヤーの状況（トップの相手との差・投資額・残りターン数）
+# gain は差から除く含み益（保有を取得額で数えた差にする）
+def _situation(state, amount, gain=0):
+    policy = get_policy()
+    players = state['players']
+    player = players[state['current_player']]
+    leader = max((p.get_equity() for p in players if p is not player), default=0)
+    return policy.situation(player.get_equity() - gain - leader, amount, NUM_TURNS - state['turn'] + 0.5)
+
+
+# この手番のあとに保有が評価し直される回数（今のターンの終わりを含む）
+def _remaining_revaluations(state):
+    return NUM_TURNS - state['turn'] + 1
+
+
+def choose_buy(state):
+    player = state['players'][state['current_player']]
+    if player.cash < state['investment_amount']:
+        return False
+    return get_policy().should_buy(_situation(state, state['investment_amount']), _remaining_revaluations(state))
+
+
+# 保有を買った順に見て、表が「売る」と言った最初の保有の番号（なければ None。先の値動きは見ない）
+def choose_sell(state):
+    policy = get_policy()
+    remaining = _remaining_revaluations(state)
+    for holding in state['portfolio'].held(state['current_player']):
+        situation = _situation(state, holding.cost, holding.value - holding.cost)
+        if policy.should_sell(situation, remaining, holding.value / holding.cost):
+            return holding.holding_id
+    return None
+
+
+def is_bot_turn(state):
+    return state['current_player'] in state.get('bots', ()) and not state['game_finished']
+
+
+# 画面の状態に応じた次の選択（game.draw_event に渡す種類と項目）
+# 投資と売却の判断は buy(state) → bool, sell(state) → 今売る保有の番号か None で差し替えられる
+def next_decision(state, buy=choose_buy, sell=choose_sell):
+    if not state['dice_rolled']:
+        return 'roll', {}
+    if state['bonus_mode']:
+        return 'bonus', {}
+    if state['investment_pending']:
+        return ('buy' if buy(state) else 'skip'), {}
+    if state['portfolio'].latest(state['current_player']) is not None:
+        holding_id = sell(state)
+        if holding_id is not None:
+            return 'sell', {'holding_id': holding_id}
+    return 'end_turn', {}
+
+
+# 表を解いてファイルに書き出す（ルールや表の作り方を変えたとき）
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="コンピューターの売却の表を作り直す")
+    parser.add_argument('--output', default=str(POLICY_PATH), help="書き出すファイル")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    policy = build_policy()
+    save_policy(policy, args.output)
+    print(f"{args.output} に書き出しました（{time.perf_counter() - start:.1f} 秒、1ターンの差の標準偏差 {policy.sigma_turn:,.0f}円）")
+
+
+if __name__ == "__main__":
+    main()
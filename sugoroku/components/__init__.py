@@ -0,0 +1,132 @@
+# Streamlit カスタムコンポーネント（フロントエンドはビルド不要の静的 HTML）
+#
+# ローソク足の図の plotly.js は、インストールされている plotly に入っているものを部品のディレクトリに写して配る
+# （外のサイトから読み込まないので、ネットワークにつながらなくても図を描ける）。
+# 部品のディレクトリに書き込めないときは、一時ディレクトリに部品ごと写してそこから配る。
+import os
+import shutil
+import tempfile
+from importlib.metadata import version
+from importlib.util import find_spec
+from pathlib import Path
+
+import json
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+from .. import metrics
+from ..board import DEFAULT_CONFIG
+from ..rules import MASS_TYPES, PLAYER_COLORS
+
+_FRONTEND_DIR = Path(__file__).parent
+
+# ローソク足の部品から読み込む plotly.js のファイル名（plotly の版ごとに変え、古い版がキャッシュに残らないようにする）
+PLOTLYJS_FILE = f"plotly-{version('plotly')}.min.js"
+
+
+# file を directory に写す（他のプロセスが同時に写しても、途中までのファイルを配らないように置き換える）
+def _copy_into(file, directory, name):
+    target = directory / name
+    if target.exists() and target.stat().st_size == file.stat().st_size:
+        return
+    fd, temp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    try:
+        shutil.copyfile(file, temp)
+        os.chmod(temp, 0o644)
+        os.replace(temp, target)
+    except BaseException:
+        os.unlink(temp)
+        raise
+
+
+# plotly.js を置いたローソク足の部品のディレクトリ
+def _candles_dir():
+    bundle = Path(find_spec('plotly').submodule_search_locations[0]) / "package_data" / "plotly.min.js"
+    source = _FRONTEND_DIR / "candles"
+    try:
+        _copy_into(bundle, source, PLOTLYJS_FILE)
+        return source
+    except OSError:
+        directory = Path(tempfile.gettempdir()) / "sugoroku-candles"
+        directory.mkdir(exist_ok=True)
+        _copy_into(source / "index.html", directory, "index.html")
+        _copy_into(bundle, directory, PLOTLYJS_FILE)
+        return directory
+
+
+_board_component = components.declare_component("sugoroku_board", path=str(_FRONTEND_DIR / "board"))
+_candles_component = components.declare_component("sugoroku_candles", path=str(_candles_dir()))
+_room_component = components.declare_component("sugoroku_room", path=str(_FRONTEND_DIR / "room"))
+
+
+# ボードの静的なレイアウト（1ゲームにつき一度だけ送る）
+# 列数と並べ方はボードの設定から取る（設定を持たない以前のリストのボードは既定の設定）
+def board_layout(board, players):
+    config = getattr(board, 'config', DEFAULT_CONFIG)
+    return {
+        'cols': config.cols,
+        'serpentine': config.layout == 'serpentine',
+        'cells': list(board),
+        'types': {
+            mass_type: {'name': info['name'], 'color': info['color'], 'emoji': info['emoji']}
+            for mass_type, info in MASS_TYPES.items()
+        },
+        'players': [{'name': player.name, 'marker': PLAYER_COLORS[player.number]} for player in players],
+    }
+
+
+# すごろくボードを表示する
+# フロントエンドが game_id のレイアウトを読み込み済みと返してきたら、以降は位置と手番だけを送る
+# 引数は JSON の文字列1つにまとめて送る（リストや辞書を渡すと、Streamlit が表形式か調べるために pandas を読み込む）
+def sugoroku_board(game_id, board, players, current, key="board_view"):
+    loaded = st.session_state.get(key)
+    args = {
+        'game_id': game_id,
+        'positions': [player.position for player in players],
+        'current': current,
+    }
+    if loaded is None or loaded.get('game_id') != game_id:
+        args['layout'] = board_layout(board, players)
+    data = json.dumps(args, ensure_ascii=False)
+    metrics.record_payload('board', data)
+
+    return _board_component(key=key, default=None, data=data)
+
+
+# ローソク足を再生して売却するローソク足を選ぶ
+# 図は再生ごとに一度だけ送り、売却が選ばれたときだけそのローソク足の番号を返す（それ以外は None）
+# figure は Plotly の図か、その JSON（先に作っておいたもの）
+# on_sell を渡すと、売却が選ばれたときにコールバックとしてローソク足の番号で呼ばれる
+# history なら、これまでの値動きとして最後のローソク足から表示し、先へ進めるボタンは出さない
+def candlestick_replay(replay_id, figure, asset_value, on_sell=None, history=False):
+    key = f"candles_{replay_id}"
+
+    def on_change():
+        value = st.session_state.get(key)
+        if on_sell is not None and value is not None and value.get('replay_id') == replay_id:
+            on_sell(value['sell_index'])
+
+    figure_json = figure if isinstance(figure, str) else figure.to_json()
+    metrics.record_payload('candles', figure_json)
+    value = _candles_component(
+        key=key,
+        default=None,
+        on_change=on_change,
+        replay_id=replay_id,
+        figure=figure_json,
+        asset_value=asset_value,
+        history=history,
+        plotlyjs_url=PLOTLYJS_FILE,
+    )
+    if value is None or value.get('replay_id') != replay_id:
+        return None
+    return value['sell_index']
+
+
+# 部屋の更新の知らせを受け取る（画面には何も出さない）
+# ハブ（ws://ページのホスト:port、url を渡せばその URL）から version より新しい版が届くと、on_push が呼ばれる
+def room_listener(room_id, version, port, url=None, on_push=None, key="room_listener"):
+    return _room_component(key=key, default=None, on_change=on_push,
+                           room_id=room_id, version=version, port=port, url=url)
@@ -0,0 +1,190 @@
+# ゲームのルール処理（1ゲーム分・Streamlitに依存しない）
+# rng には random モジュール互換のオブジェクト（randint / choice / sample / shuffle / random）を渡す
+# ボードの生成は board.py（NumPy でまとめて並べる）
+# マスの効果はルール（rules.RULES）の効果の種類ごとの関数に、読み込み時に振り分けておく
+# お金の動きはプレイヤーの仕訳帳（journal.Journal）に仕訳として記帳し、取引履歴（ledger）に説明の行を残す
+import functools
+import random
+
+from .journal import CASH, DEBT, EXPENSES, REVENUE, VALUATION, asset_account
+from .rules import BOARD_SIZE, INVESTMENT_TYPES, NUM_TURNS, RULES
+
+
+# サイコロを振る
+def roll_dice(rng=random):
+    return rng.randint(1, 6)
+
+
+# ボトルフリップ
+def bottle_flip(rng=random):
+    return rng.choice([True, False])
+
+
+# コマを進める（移動前の位置を返す）
+def move_player(player, dice, board_size=BOARD_SIZE):
+    old_position = player.position
+    player.position = (player.position + dice) % board_size
+    return old_position
+
+
+# マスの効果の乱数部分（金額・理由・投資の種類など）を効果の種類ごとに決める
+# 結果は JSON にできる dict で、apply_mass_outcome に渡すと同じ効果を何度でも再現できる
+def _draw_nothing(rule, rng):
+    return None
+
+
+def _draw_event(rule, rng):
+    reason, low, high = rule.events.sample(rng)
+    return {'amount': rng.randint(low, high), 'reason': reason}
+
+
+def _draw_debt(rule, rng):
+    return {'amount': rng.randint(*rule.amount)}
+
+
+def _draw_investment(rule, rng):
+    investment_type = rng.choice(rule.assets)
+    return {'type': investment_type, 'amount': rng.randint(*rule.amount)}
+
+
+# 決まった結果でマスの効果を適用する（メッセージのリストと、投資マスなら購入の提案を返す）
+def _apply_nothing(rule, player, outcome, turn):
+    return ['何も起こりませんでした。'], None
+
+
+def _apply_revenue(rule, player, outcome, turn):
+    amount = outcome['amount']
+    player.journal.post(CASH, REVENUE, amount)
+    player.add_transaction('収益', amount, outcome['reason'], turn)
+    return [f"{rule.emoji} {outcome['reason']} +{amount:,}円"], None
+
+
+def _apply_expense(rule, player, outcome, turn):
+    amount = outcome['amount']
+    player.journal.post(EXPENSES, CASH, amount)
+    player.add_transaction('費用', -amount, outcome['reason'], turn)
+    return [f"{rule.emoji} {outcome['reason']} -{amount:,}円"], None
+
+
+def _apply_debt(rule, player, outcome, turn):
+    amount = outcome['amount']
+    player.journal.post(CASH, DEBT, amount)
+    player.add_transaction('借入', amount, rule.reason, turn)
+    return [f"{rule.emoji} 借金をしました +{amount:,}円（負債増加）"], None
+
+
+def _apply_investment(rule, player, outcome, turn):
+    offer = {'type': outcome['type'], 'amount': outcome['amount'], 'position': player.position}
+    return [f"{rule.emoji} {outcome['type']}に投資しますか？ 投資額: {outcome['amount']:,}円"], offer
+
+
+def _apply_bonus_mass(rule, player, outcome, turn):
+    return [f"{rule.emoji} ボーナスタイム！ボトルフリップチャレンジ！"], None
+
+
+_EFFECT_HANDLERS = {
+    'none': (_draw_nothing, _apply_nothing),
+    'revenue': (_draw_event, _apply_revenue),
+    'expense': (_draw_event, _apply_expense),
+    'debt': (_draw_debt, _apply_debt),
+    'investment': (_draw_investment, _apply_investment),
+    'bonus': (_draw_nothing, _apply_bonus_mass),
+}
+
+
+# マスの種類 → (乱数部分を決める関数, 適用する関数) の表をルールから作る
+def compile_effects(rules):
+    return {
+        key: tuple(functools.partial(handler, rule) for handler in _EFFECT_HANDLERS[rule.effect])
+        for key, rule in rules.masses.items()
+    }
+
+
+_EFFECTS = compile_effects(RULES)
+
+
+def draw_mass_outcome(mass_type, rng=random):
+    return _EFFECTS[mass_type][0](rng)
+
+
+# 投資マスでは購入の提案（offer）を返し、購入するかどうかは呼び出し側が決める
+def apply_mass_outcome(player, mass_type, outcome, turn):
+    return _EFFECTS[mass_type][1](player, outcome, turn)
+
+
+# マスの効果を適用
+def apply_mass_effect(player, mass_type, turn, rng=random):
+    return apply_mass_outcome(player, mass_type, draw_mass_outcome(mass_type, rng), turn)
+
+
+# ボーナスタイムの乱数部分（サイコロの目と各フリップの結果）
+def draw_bonus(rng=random):
+    dice = roll_dice(rng)
+    return dice, [bottle_flip(rng) for _ in range(dice)]
+
+
+# 決まったフリップの結果でボーナスを適用し、ボーナス額を返す（1回の成功の額は mass_type のマスのルール）
+def apply_bonus(player, flips, turn, mass_type='bonus'):
+    bonus = sum(flips) * RULES.masses[mass_type].payout
+    if bonus > 0:
+        player.journal.post(CASH, REVENUE, bonus)
+        player.add_transaction('ボーナス', bonus, 'ボトルフリップ成功', turn)
+    return bonus
+
+
+# ボーナスタイム（サイコロの目・各フリップの結果・ボーナス額を返す）
+def resolve_bonus(player, turn, rng=random, mass_type='bonus'):
+    dice, flips = draw_bonus(rng)
+    return dice, flips, apply_bonus(player, flips, turn, mass_type)
+
+
+# 投資資産の購入（資金不足なら False）。holding は取得の行に付ける保有の番号
+def buy_investment(player, investment_type, amount, turn, holding=0):
+    if player.cash < amount:
+        return False
+
+    player.journal.post(asset_account(investment_type), CASH, amount)
+    player.add_transaction('投資', -amount, f'{investment_type}の取得', turn, holding)
+    return True
+
+
+# 保有の評価額の変化（portfolio.Portfolio.revalue の1人分）を資産と評価損益に記帳し、種類ごとに評価損益の行を残す
+# changes は資産の種類順の評価額の合計の増減
+def mark_to_market(player, changes, turn):
+    for asset_type, change in zip(INVESTMENT_TYPES, changes):
+        if change:
+            player.journal.post(asset_account(asset_type), VALUATION, change)
+            player.add_transaction('評価損益', change, f'{asset_type}の評価', turn)
+
+
+# 保有（portfolio.Holding）を sell_value で売却し、売却額を返す
+# 帳簿の評価額と違う額で売るとき（以前のゲームの売却）は、先にその差を評価損益にしておく
+# 資産はその保有の評価額だけ減るので、売却で純資産は変わらない（損益は評価損益に入っている）
+def sell_investment(player, holding, sell_value, turn):
+    investment_type = holding.investment_type
+    account = asset_account(investment_type)
+    change = sell_value - holding.value
+    if change:
+        player.journal.post(account, VALUATION, change)
+        player.add_transaction('評価損益', change, f'{investment_type}の評価', turn)
+
+    player.journal.post(CASH, account, sell_value)
+
+    # 理由は共有の文字列表に登録されるため、損益額は含めず種類（売却益／売却損）で区別する
+    if sell_value >= holding.cost:
+        player.add_transaction('売却益', sell_value, f'{investment_type}の売却', turn, holding.holding_id)
+    else:
+        player.add_transaction('売却損', sell_value, f'{investment_type}の売却', turn, holding.holding_id)
+
+    return sell_value
+
+
+# 次の手番へ（新しい current_player, turn, ゲーム終了フラグを返す）
+def advance_turn(current_player, turn, num_players):
+    current_player = (current_player + 1) % num_players
+
+    # 全プレイヤーが終わったらターン進行
+    if current_player == 0:
+        turn += 1
+
+    return current_player, turn, turn > NUM_TURNS
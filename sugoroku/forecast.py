@@ -0,0 +1,225 @@
+# 止まるマスの確率と純資産の見通し（モンテカルロではなく正確に計算する）
+#
+# コマはサイコロ（1〜6）の目だけ進むので、止まるマスの確率はボードによらず、
+# 「今の位置から何マス先か」だけで決まる。k 回振った後の位置は今の位置から k〜6k マス先で、
+# 推移行列は各行に 1/6 が6つ並ぶ巡回行列になる。ここでは行列を作らず、位置の確率の列を
+# 1〜6 ずらして足す（疎な行列とベクトルの積と同じ）ことで、残りの回数分だけ進める。
+# 扱うのは今の位置から 6×残り回数 マス先までなので、ボードがどれだけ大きくても手間は変わらない。
+#
+# 止まったマスの効果（金額）は、その前の動きとは独立にマスの種類だけで決まる。
+# そこで位置ごとに「そこにいる確率」「そこにいるときの増減の合計の1次・2次モーメント」を持って進めると、
+# 最終的な純資産の増減の期待値と分散が正確に求まる。
+#   借金マス:   現金と負債が同じだけ増えるので純資産は変わらない
+#   投資マス:   値動きは平均が変わらない（martingale）ので期待値は 0。買った保有は最後まで持つとして、
+#               残りの評価で進む足の本数 n だけ (1 + 変動幅² / 12) ** n - 1 倍の分散になる
+#               （残りの回数が R の人の k 回目に買えば、評価は R - k + 1 回。現金が足りずに買えない場合は考えない）
+#   保有中の投資: 同じく期待値は今の評価額のままで、分散は評価額² × ((1 + 変動幅² / 12) ** n - 1)
+#   ボーナス:   サイコロの目の回数だけ確率 1/2 で payout
+# マスの種類ごとの値は rules.RULES（ルールファイル）の効果の種類と値から求める。
+import math
+
+import numpy as np
+
+from .board import MASS_CODES, MASS_NAMES, encode_board
+from .portfolio import CANDLES_PER_TURN
+from .rules import NUM_TURNS, INITIAL_CASH, NUM_CANDLES, RULES
+
+DICE_FACES = 6
+
+# 開始画面で「偏りの少ないボード」を選んだときの偏りの上限
+FAIR_BOARD_BIAS = 0.25
+
+# market.generate_candlestick_data の1本あたりの変動（-10%〜+10% の一様分布）の分散
+CANDLE_CHANGE_VARIANCE = 0.2 ** 2 / 12
+
+_landing_cache = {}
+
+
+# lo〜hi の整数の一様分布の (期待値, 分散)
+def _uniform_moments(lo, hi):
+    return (lo + hi) / 2, ((hi - lo + 1) ** 2 - 1) / 12
+
+
+# イベントをルールの重みで選び、その範囲の金額を一様に引くときの (期待値, 分散)
+def _event_moments(rule):
+    moments = [_uniform_moments(lo, hi) for _reason, lo, hi in rule.events.items]
+    weights = rule.events.probabilities
+    mean = sum(w * m for w, (m, _) in zip(weights, moments))
+    second = sum(w * (v + m * m) for w, (m, v) in zip(weights, moments))
+    return float(mean), float(second - mean * mean)
+
+
+# ボーナスタイムの (期待値, 分散)（フリップの回数 N はサイコロの目、成功数は二項分布 B(N, 1/2)）
+def bonus_moments(payout):
+    flips_mean, flips_var = _uniform_moments(1, DICE_FACES)
+    mean = flips_mean / 2
+    var = flips_mean / 4 + flips_var / 4
+    return mean * payout, var * payout ** 2
+
+
+# 1本目から candles 本進んだ足の終値の、1本目の終値に対する比の分散
+def ratio_variance(candles):
+    return (1 + CANDLE_CHANGE_VARIANCE) ** np.minimum(candles, NUM_CANDLES - 1) - 1
+
+
+# 保有が残り revaluations 回の評価で進む足の本数（最後の足より先には進まない）
+def holding_candles(revaluations, candle=0):
+    return np.minimum(CANDLES_PER_TURN * np.asarray(revaluations), NUM_CANDLES - 1 - np.asarray(candle))
+
+
+# マスの種類コードごとの純資産の増減の (期待値, 分散, 投資額の2乗の期待値) の配列
+# 投資マスの分散は買った後の評価の回数で変わるので、分散には入れず3つ目の値に ratio_variance を掛けて使う
+#   buy_probability: 投資マスで購入する確率
+def payoff_moments(buy_probability=1.0):
+    mean = np.zeros(len(MASS_NAMES))
+    var = np.zeros(len(MASS_NAMES))
+    growth = np.zeros(len(MASS_NAMES))
+
+    for key, rule in RULES.masses.items():
+        code = MASS_CODES[key]
+        if rule.effect == 'revenue':
+            mean[code], var[code] = _event_moments(rule)
+        elif rule.effect == 'expense':
+            loss_mean, var[code] = _event_moments(rule)
+            mean[code] = -loss_mean
+        elif rule.effect == 'bonus':
+            mean[code], var[code] = bonus_moments(rule.payout)
+        elif rule.effect == 'investment':
+            amount_mean, amount_var = _uniform_moments(*rule.amount)
+            growth[code] = buy_probability * (amount_var + amount_mean ** 2)
+    return mean, var, growth
+
+
+DEFAULT_MOMENTS = payoff_moments()
+
+
+# 確率の列を1〜6マス先へ等確率で進める（最後の軸が「今の位置から何マス先か」）
+def _step(values):
+    moved = np.zeros_like(values)
+    for face in range(1, DICE_FACES + 1):
+        moved[..., face:] += values[..., :-face]
+    return moved / DICE_FACES
+
+
+# rolls 回振る間に、k 回目（1〜rolls）で今の位置から x マス先に止まる確率 (rolls, 6 * rolls + 1)
+def landing_probabilities(rolls):
+    probabilities = _landing_cache.get(rolls)
+    if probabilities is None:
+        probabilities = np.zeros((rolls, DICE_FACES * rolls + 1))
+        current = np.zeros(DICE_FACES * rolls + 1)
+        current[0] = 1.0
+        for k in range(rolls):
+            current = _step(current)
+            probabilities[k] = current
+        probabilities.setflags(write=False)
+        _landing_cache[rolls] = probabilities
+    return probabilities
+
+
+# start から rolls 回振る間に各マスに止まる回数の期待値（長さ board_size）
+def landing_counts(board_size, start=0, rolls=NUM_TURNS):
+    weights = landing_probabilities(rolls).sum(axis=0)
+    cells = (start + np.arange(len(weights))) % board_size
+    return np.bincount(cells, weights=weights, minlength=board_size)
+
+
+# 各プレイヤーの純資産の増減の期待値と分散を、残りの回数ごとに出す
+# codes はボードのコード配列、starts と rolls はプレイヤーごとの位置と残りの回数
+def gain_moments(codes, starts, rolls, moments=DEFAULT_MOMENTS):
+    starts = np.asarray(starts, dtype=np.int64)
+    rolls = np.asarray(rolls, dtype=np.int64)
+    max_rolls = int(rolls.max()) if len(rolls) else 0
+    mean = np.zeros(len(starts))
+    var = np.zeros(len(starts))
+    if max_rolls == 0:
+        return mean, var
+
+    # プレイヤーごとに、今の位置から 0〜6 * max_rolls マス先のマスの増減の期待値と分散
+    # 投資マスの分散は k 回目に止まったときの残りの評価の回数 rolls - k + 1 による
+    cells = (starts[:, None] + np.arange(DICE_FACES * max_rolls + 1)) % len(codes)
+    cell_mean = moments[0][codes[cells]]
+    cell_second = moments[1][codes[cells]] + cell_mean ** 2
+    cell_growth = moments[2][codes[cells]]
+
+    # そこにいる確率、その場合の増減の合計の1次・2次モーメント
+    m0 = np.zeros(cells.shape)
+    m0[:, 0] = 1.0
+    m1 = np.zeros(cells.shape)
+    m2 = np.zeros(cells.shape)
+    for k in range(1, max_rolls + 1):
+        m0, s1, s2 = _step(m0), _step(m1), _step(m2)
+        growth = ratio_variance(holding_candles(np.maximum(rolls - k + 1, 0)))
+        m2 = s2 + 2 * cell_mean * s1 + m0 * (cell_second + cell_growth * growth[:, None])
+        m1 = s1 + m0 * cell_mean
+        done = rolls == k
+        mean[done] = m1[done].sum(axis=1)
+        var[done] = m2[done].sum(axis=1) - mean[done] ** 2
+    return mean, np.maximum(var, 0.0)
+
+
+# ゲームの状態から、各プレイヤーがこの後サイコロを振る回数
+def remaining_rolls(state):
+    if state['game_finished']:
+        return [0] * state['num_players']
+    rolls = []
+    for i in range(state['num_players']):
+        this_turn = i > state['current_player'] or (i == state['current_player'] and not state['dice_rolled'])
+        rolls.append(NUM_TURNS - state['turn'] + this_turn)
+    return rolls
+
+
+# 各プレイヤーの保有中の投資の、ゲームの終わりまでの評価額の変化の分散
+def holdings_variance(state):
+    variance = np.zeros(state['num_players'])
+    portfolio = state['portfolio']
+    n = len(portfolio)
+    if state['game_finished'] or not n:
+        return variance
+    revaluations = NUM_TURNS - state['turn'] + 1
+    values = portfolio.values[:n].astype(np.float64)
+    spread = values ** 2 * ratio_variance(holding_candles(revaluations, portfolio.candles[:n]))
+    return np.bincount(portfolio.owners[:n], weights=spread, minlength=state['num_players'])
+
+
+# 各プレイヤーの最終的な純資産の (期待値, 標準偏差) のリスト
+# 手番のプレイヤーがボーナスタイムの途中なら、その分も足す。保有中の投資の値動きのぶれも足す
+def equity_outlook(state, moments=DEFAULT_MOMENTS):
+    players = state['players']
+    mean, var = gain_moments(
+        encode_board(state['board']), [player.position for player in players], remaining_rolls(state), moments)
+    if state['bonus_mode'] and not state['game_finished']:
+        mass_type = state['board'][players[state['current_player']].position]
+        bonus_mean, bonus_var = bonus_moments(RULES.masses[mass_type].payout)
+        mean[state['current_player']] += bonus_mean
+        var[state['current_player']] += bonus_var
+    var += holdings_variance(state)
+    return [(float(player.get_equity() + m), math.sqrt(v)) for player, m, v in zip(players, mean, var)]
+
+
+# ボードの偏り: スタート（0マス目）から NUM_TURNS 回振ったときの純資産の増減の期待値が、
+# 同じマスの数のままランダムに並べ替えたボード全体の中で、平均から標準偏差いくつ分ずれているか
+# 並べ替えたボードでの期待値 Σ w_i a_π(i) の平均と分散は、
+#   平均 = Σw · ā,   分散 = Σ(w - w̄)² · Σ(a - ā)² / (n - 1)
+# と正確に求まる（w: 各マスに止まる回数の期待値, a: 各マスの増減の期待値）
+def board_bias(board, rolls=NUM_TURNS, moments=DEFAULT_MOMENTS):
+    codes = encode_board(board)
+    return board_biases(codes[None, :], rolls, moments)[0]
+
+
+# (n, size) のコード配列の各ボードの偏り
+def board_biases(codes, rolls=NUM_TURNS, moments=DEFAULT_MOMENTS):
+    size = codes.shape[1]
+    weights = landing_counts(size, 0, rolls)
+    payoff = moments[0][codes]
+    mean_payoff = payoff.mean(axis=1)
+    expected = weights.sum() * mean_payoff
+    spread = ((weights - weights.mean()) ** 2).sum() * ((payoff - mean_payoff[:, None]) ** 2).sum(axis=1) / (size - 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bias = (payoff @ weights - expected) / np.sqrt(spread)
+    return np.where(spread > 0, bias, 0.0)
+
+
+# スタートから NUM_TURNS 回振ったときの純資産の (期待値, 標準偏差)（1人で、投資は上の仮定）
+def board_outlook(board, rolls=NUM_TURNS, moments=DEFAULT_MOMENTS):
+    mean, var = gain_moments(encode_board(board), [0], [rolls], moments)
+    return INITIAL_CASH + mean[0], math.sqrt(var[0])
@@ -0,0 +1,336 @@
+# 1ゲーム分の状態とイベント
+#
+# ゲームの状態は st.session_state と同じキーを持つ dict 互換のオブジェクトで表す。
+# 状態を変えるのは apply_event だけで、乱数で決まる部分（サイコロの目・金額・ローソク足）は
+# あらかじめ *_event 関数でイベントに書き込んでおく。
+# 同じイベントを同じ順に適用すれば同じ状態になるので、保存したイベントからゲームを再開できる。
+# 乱数はゲームごとの GameRNG（state['rng']）から引くので、シードと選択の列からも同じゲームを再現できる。
+# 購入した投資は state['portfolio']（portfolio.Portfolio）に売るまで残り、ターンが終わるたびに時価で評価し直す。
+# お金の動きは各プレイヤーの仕訳帳に記帳し、イベントを適用するたびに記帳と保有が合っているかを確かめる。
+# ターン（全員の手番）が終わるたびに、各プレイヤーの仕訳帳の残高を締めとして残す。
+import logging
+
+import numpy as np
+
+from . import engine, metrics
+from .board import DEFAULT_CONFIG, generate_board
+from .player import Player
+from .portfolio import CANDLES_PER_TURN, Portfolio
+from .rng import GameRNG
+from .rules import RULES
+
+_log = logging.getLogger(__name__)
+
+# 1ゲーム分の状態のキー（スナップショットに保存する）
+GAME_KEYS = (
+    'game_id', 'game_started', 'game_finished', 'event_seq', 'seed', 'rng',
+    'board', 'players', 'num_players', 'bots', 'current_player', 'turn',
+    'dice_rolled', 'last_dice', 'bonus_mode',
+    'investment_pending', 'investment_amount', 'investment_type', 'investment_position',
+    'portfolio',
+)
+
+
+# プレイヤーの選択だけを持つイベントの項目（それ以外は乱数で決まる）
+# sell_index は以前のゲーム（購入した手番に選んだローソク足で売る）の売却の記録にだけある
+DECISION_FIELDS = {'sell': ('holding_id', 'sell_index')}
+
+
+# 新しいゲームの状態（seed を省略するとランダムなシードになる）
+# bots はコンピューターが操作する席の番号、board_config はボードの大きさ・並べ方・マスの数
+def new_game(game_id, player_names, seed=None, bots=(), board_config=DEFAULT_CONFIG):
+    rng = GameRNG(seed)
+    return {
+        'game_id': game_id,
+        'game_started': True,
+        'game_finished': False,
+        'event_seq': 0,
+        'seed': rng.seed,
+        'rng': rng,
+        'board': generate_board(board_config, rng.board),
+        'players': [Player(name, i) for i, name in enumerate(player_names)],
+        'num_players': len(player_names),
+        'bots': tuple(bots),
+        'current_player': 0,
+        'turn': 1,
+        'dice_rolled': False,
+        'last_dice': None,
+        'bonus_mode': False,
+        'investment_pending': False,
+        'investment_amount': 0,
+        'investment_type': "",
+        'investment_position': 0,
+        'portfolio': Portfolio(),
+    }
+
+
+# 以前に保存した状態に、後から加わったキーを足す（保有を持ち越せなかった頃の状態なので、保有はない）
+# 以前の売却は資産を 0 で止めていたので、資産が保有の評価額の合計と合わないことがある。その差は評価損益にする
+def upgrade_state(state):
+    if 'portfolio' not in state:
+        state['portfolio'] = Portfolio()
+    marks = state['portfolio'].marks(state['num_players'])
+    for player in state['players']:
+        changes = [mark - value for mark, value in zip(marks[player.number].tolist(), player.asset_values)]
+        if any(changes):
+            engine.mark_to_market(player, changes, state['turn'])
+    return state
+
+
+# 状態のうちゲームに関するキーだけを取り出す
+def game_state(state):
+    return {key: state[key] for key in GAME_KEYS}
+
+
+def current_turn_player(state):
+    return state['players'][state['current_player']]
+
+
+# サイコロを振るイベント（止まるマスの効果の乱数もここで決める）
+def roll_event(state, rng):
+    dice = engine.roll_dice(rng.dice)
+    position = (current_turn_player(state).position + dice) % len(state['board'])
+    return {'kind': 'roll', 'dice': dice, 'outcome': engine.draw_mass_outcome(state['board'][position], rng.events)}
+
+
+# ボトルフリップのイベント
+def bonus_event(state, rng):
+    dice = engine.roll_dice(rng.dice)
+    return {'kind': 'bonus', 'dice': dice, 'flips': [engine.bottle_flip(rng.bottle) for _ in range(dice)]}
+
+
+# 投資資産を購入するイベント（買えるときだけローソク足を生成する）
+def buy_event(state, rng):
+    candles = None
+    if current_turn_player(state).cash >= state['investment_amount']:
+        candles = rng.candles()
+    return {'kind': 'buy', 'candles': candles}
+
+
+def skip_event(state, rng):
+    return {'kind': 'skip'}
+
+
+# 保有 holding_id を今の評価額で売るイベント
+def sell_event(state, rng, holding_id=None, sell_index=None):
+    event = {'kind': 'sell'}
+    if holding_id is not None:
+        event['holding_id'] = int(holding_id)
+    if sell_index is not None:
+        event['sell_index'] = int(sell_index)
+    return event
+
+
+def end_turn_event(state, rng):
+    return {'kind': 'end_turn'}
+
+
+_DRAWS = {
+    'roll': roll_event,
+    'bonus': bonus_event,
+    'buy': buy_event,
+    'skip': skip_event,
+    'sell': sell_event,
+    'end_turn': end_turn_event,
+}
+
+
+# 選択（種類と DECISION_FIELDS の項目）からイベントを作る（乱数はゲームの GameRNG から引く）
+def draw_event(state, kind, **decision):
+    return _DRAWS[kind](state, state['rng'], **decision)
+
+
+# 今の状態で受け付けるイベントの種類
+def expected_kinds(state):
+    if state['game_finished']:
+        return ()
+    if not state['dice_rolled']:
+        return ('roll',)
+    if state['bonus_mode']:
+        return ('bonus',)
+    if state['investment_pending']:
+        return ('buy', 'skip')
+    if state['portfolio'].latest(state['current_player']) is not None:
+        return ('end_turn', 'sell')
+    return ('end_turn',)
+
+
+# 選択が今の状態で受け付けられるか確かめる（できなければ ValueError）
+def check_decision(state, kind, **decision):
+    if kind not in expected_kinds(state):
+        raise ValueError("今はその操作はできません")
+    if kind == 'sell':
+        holding = state['portfolio'].holding(decision.get('holding_id'))
+        if holding is None or holding.owner != state['current_player']:
+            raise ValueError("その資産は持っていません")
+
+
+# イベントから選択の部分だけを取り出す
+def decision_of(event):
+    return event['kind'], {field: event[field] for field in DECISION_FIELDS.get(event['kind'], ()) if field in event}
+
+
+# 保存されたイベントを適用し直す（乱数の系列も同じだけ進める）
+def replay_event(state, event):
+    if state.get('rng') is not None:
+        kind, decision = decision_of(event)
+        draw_event(state, kind, **decision)
+    return apply_event(state, event)
+
+
+# シードと選択の列からゲームを再現する
+# board_config は元のゲームのボードの設定（状態の state['board'].config にある。違う設定ではボードが変わる）
+def replay(seed, player_names, decisions, game_id=None, bots=(), board_config=DEFAULT_CONFIG):
+    state = new_game(game_id, player_names, seed, bots, board_config)
+    for kind, decision in decisions:
+        apply_event(state, draw_event(state, kind, **decision))
+    return state
+
+
+# イベントを状態に適用し、画面に出すメッセージ（種類, 文）のリストを返す
+# 適用した後に check_invariants で確かめ、合わないところがあればログとメトリクスに残す
+# 確かめるのはこのイベントで記帳するプレイヤー（ターンの終わりは全員）だけで、保有と資産の残高を比べるのは
+# 保有が変わったか、資産の勘定に記帳したときだけ
+def apply_event(state, event):
+    handler = _HANDLERS[event['kind']]
+    player = current_turn_player(state)
+    players = state['players'] if event['kind'] == 'end_turn' else (player,)
+    version = state['portfolio'].version
+    lengths = [len(p.journal) for p in players]
+    messages = handler(state, player, event)
+    state['event_seq'] += 1
+    holdings = state['portfolio'].version != version or any(
+        p.journal.touches_assets(length) for p, length in zip(players, lengths))
+    problems = check_invariants(state, players, holdings)
+    if problems:
+        _log.error("ゲーム %s の %d 番目のイベント（%s）の後: %s",
+                   state['game_id'], state['event_seq'], event['kind'], " / ".join(problems))
+        metrics.inc('sugoroku_invariant_violations_total', kind=event['kind'])
+    return messages
+
+
+# 記帳が保たれているか（各プレイヤーの仕訳帳の関係と、holdings なら資産の残高が保有の評価額の合計と一致すること）
+# 合わないところの説明のリストを返す。手間はプレイヤー × 勘定の数と、holdings なら保有の数に比例する
+def check_invariants(state, players=None, holdings=True):
+    problems = []
+    marks = state['portfolio'].marks(state['num_players']).tolist() if holdings else None
+    for player in state['players'] if players is None else players:
+        for text in player.journal.check():
+            problems.append(f"{player.name}: {text}")
+        if holdings and player.asset_values != marks[player.number]:
+            problems.append(f"{player.name}: 資産の残高 {player.asset_values} が保有の評価額 {marks[player.number]} と合いません")
+    return problems
+
+
+def _apply_roll(state, player, event):
+    dice = event['dice']
+    state['last_dice'] = dice
+
+    old_position = engine.move_player(player, dice, len(state['board']))
+    messages = [('info', f"📍 {old_position}マス目 → {player.position}マス目に移動しました")]
+
+    mass_type = state['board'][player.position]
+    if RULES.effect_of(mass_type) == 'bonus':
+        state['bonus_mode'] = True
+    else:
+        texts, offer = engine.apply_mass_outcome(player, mass_type, event['outcome'], state['turn'])
+        messages.extend(('write', text) for text in texts)
+        if offer is not None:
+            state['investment_amount'] = offer['amount']
+            state['investment_type'] = offer['type']
+            state['investment_position'] = offer['position']
+            state['investment_pending'] = True
+        state['bonus_mode'] = False
+
+    state['dice_rolled'] = True
+    return messages
+
+
+def _apply_bonus(state, player, event):
+    bonus = engine.apply_bonus(player, event['flips'], state['turn'], state['board'][player.position])
+    results = ["✅ 成功" if flip else "❌ 失敗" for flip in event['flips']]
+    messages = [
+        ('write', f"🎲 サイコロの目: {event['dice']}"),
+        ('write', f"ボトルフリップ結果: {' | '.join(results)}"),
+    ]
+    if bonus > 0:
+        messages.append(('success', f"🎊 ボーナス獲得: +{bonus:,}円"))
+    else:
+        messages.append(('info', "残念！ボーナスなし"))
+
+    state['bonus_mode'] = False
+    return messages
+
+
+def _apply_buy(state, player, event):
+    investment_type = state['investment_type']
+    amount = state['investment_amount']
+    state['investment_pending'] = False
+
+    portfolio = state['portfolio']
+    if event['candles'] is None or not engine.buy_investment(
+            player, investment_type, amount, state['turn'], portfolio.next_id):
+        return [('error', f"❌ 資金不足で投資できませんでした（必要額: {amount:,}円）")]
+
+    portfolio.open(player.number, investment_type, amount, np.asarray(event['candles'], dtype=np.float64), state['turn'])
+    return [('success', f"🏢 {investment_type}に投資しました -{amount:,}円（資産増加。売るまで持ち続け、ターンごとに時価で評価されます）")]
+
+
+def _apply_skip(state, player, event):
+    state['investment_pending'] = False
+    return [('info', "投資を見送りました")]
+
+
+# 保有を売る（以前のゲームの売却は、直前に買った保有を選んだローソク足の終値で売る）
+def _apply_sell(state, player, event):
+    portfolio = state['portfolio']
+    holding_id = event.get('holding_id')
+    if holding_id is None:
+        holding_id = portfolio.latest(player.number)
+    if 'sell_index' in event:
+        sell_value = portfolio.value_at(holding_id, event['sell_index'])
+    else:
+        sell_value = portfolio.holding(holding_id).value
+    holding = portfolio.close(holding_id)
+    engine.sell_investment(player, holding, sell_value, state['turn'])
+
+    profit = sell_value - holding.cost
+    return [('success', f"🏢 {holding.investment_type}を売却しました +{sell_value:,}円"
+                        f"（取得額 {holding.cost:,}円、損益 {profit:+,}円）")]
+
+
+def _apply_end_turn(state, player, event):
+    turn = state['turn']
+    state['current_player'], state['turn'], finished = engine.advance_turn(
+        state['current_player'], state['turn'], state['num_players'])
+
+    state['last_dice'] = None
+    state['dice_rolled'] = False
+    if finished:
+        state['game_finished'] = True
+    if state['turn'] == turn:
+        return []
+    messages = _revalue(state, turn)
+    for player in state['players']:
+        player.journal.close(turn)
+    return messages
+
+
+# ターンの終わりに、全員の保有を CANDLES_PER_TURN 本進めて評価し直す
+def _revalue(state, turn):
+    _, changes = state['portfolio'].revalue(CANDLES_PER_TURN, state['num_players'])
+    if not changes.any():
+        return []
+    for player in state['players']:
+        engine.mark_to_market(player, changes[player.number].tolist(), turn)
+    return [('info', f"📈 ターン{turn}の終わりに、保有している投資を時価で評価し直しました")]
+
+
+_HANDLERS = {
+    'roll': _apply_roll,
+    'bonus': _apply_bonus,
+    'buy': _apply_buy,
+    'skip': _apply_skip,
+    'sell': _apply_sell,
+    'end_turn': _apply_end_turn,
+}
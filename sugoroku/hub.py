@@ -0,0 +1,103 @@
+# 部屋の更新をブラウザに知らせる WebSocket サーバー
+#
+# ブラウザは ws://ホスト:ポート/rooms/<部屋ID> につなぎ、部屋の版が進むたびに {"room", "version"} を受け取る。
+# 状態そのものは送らず、受け取った画面が Streamlit の再実行で部屋の写しを読み直す。
+# 送るのはその時点の最新の版だけなので、遅いクライアントの分の知らせがたまることはない。
+#
+# websockets パッケージ（任意）を使い、専用のスレッドの asyncio ループで動かす。
+# 認証はないので、既定ではこのマシン（127.0.0.1）からの接続だけを受ける（広く開けるときは host で明示する）。
+import asyncio
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class Hub:
+    def __init__(self, manager, host='127.0.0.1', port=8765):
+        self.manager = manager
+        self.host = host
+        self.port = port
+        self.loop = None
+        self._server = None
+        self._error = None
+        self._ready = threading.Event()
+
+    def start(self):
+        from websockets.asyncio.server import serve
+
+        threading.Thread(target=self._run, args=(serve,), name="sugoroku-hub", daemon=True).start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        return self
+
+    def _run(self, serve):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self._server = self.loop.run_until_complete(self._listen(serve))
+        except Exception as error:
+            self._error = error
+            return
+        finally:
+            self._ready.set()
+        self.loop.run_forever()
+
+    async def _listen(self, serve):
+        return await serve(self._handle, self.host, self.port)
+
+    def stop(self):
+        if self.loop is None or self._server is None:
+            return
+        self._server.close()
+        asyncio.run_coroutine_threadsafe(self._server.wait_closed(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    # 1つの接続: 部屋を購読し、版が進むたびに最新の版を送る
+    async def _handle(self, connection):
+        from websockets.exceptions import ConnectionClosed
+
+        path = connection.request.path
+        room = self.manager.get(path[len('/rooms/'):]) if path.startswith('/rooms/') else None
+        if room is None:
+            await connection.close(4404, "room not found")
+            return
+
+        changed = asyncio.Event()
+        try:
+            unsubscribe = room.subscribe(lambda version: self.loop.call_soon_threadsafe(changed.set))
+        except ValueError:
+            await connection.close(4429, "too many subscribers")
+            return
+
+        closed = asyncio.ensure_future(connection.wait_closed())
+        try:
+            sent = None
+            while True:
+                changed.clear()
+                if room.version != sent:
+                    sent = room.version
+                    await connection.send(json.dumps({'room': room.room_id, 'version': sent}))
+                waiter = asyncio.ensure_future(changed.wait())
+                await asyncio.wait((waiter, closed), return_when=asyncio.FIRST_COMPLETED)
+                if closed.done():
+                    waiter.cancel()
+                    break
+        except ConnectionClosed:
+            pass
+        finally:
+            unsubscribe()
+            closed.cancel()
+
+
+# ハブを立てる（websockets がない・ポートが使えないときは None を返し、画面は版の確認に切り替える）
+def start_hub(manager, port, host='127.0.0.1'):
+    try:
+        return Hub(manager, host, port).start()
+    except ImportError:
+        logger.warning("websockets がないため、部屋の更新は数秒ごとの確認で行います")
+    except OSError as error:
+        logger.warning("部屋のハブを %s:%s で開けませんでした: %s", host, port, error)
+    return None
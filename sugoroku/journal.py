@@ -0,0 +1,139 @@
+# プレイヤーごとの複式簿記の仕訳帳
+#
+# お金の動きは、すべて借方と貸方が同じ額の仕訳（post）として記帳する。勘定は番号で持ち、
+# 記帳のたびに勘定ごとの残高（借方をプラス、貸方をマイナス）と、現金の動きの区分ごとの合計を足し引きしておく。
+# 貸借対照表・損益計算書・キャッシュフロー計算書は、どの項目も残高を1つ読むだけ（O(1)）で出せる。
+#
+# 仕訳は列ごとの型付き配列に追記し、ターンの終わりには残高の写しを締め（close）として残す。
+# 元に戻すときは、最後の仕訳から逆に打ち消して行数を戻す（打ち消すのは戻した仕訳の分だけ）。
+#
+# check は、記帳のたびに保たれているはずの関係（貸借の一致・現金とキャッシュフローの一致・資産と負債が
+# マイナスにならないこと）を、勘定の数だけの手間で確かめる。
+from array import array
+
+from .rules import INITIAL_CASH, INVESTMENT_TYPES
+
+# 勘定（番号 → 名前）
+CASH = 0
+ASSETS = tuple(range(1, 1 + len(INVESTMENT_TYPES)))   # 投資資産（種類ごと。INVESTMENT_TYPES の順）
+DEBT = ASSETS[-1] + 1           # 借入金
+CAPITAL = DEBT + 1              # 資本金（開始時の現金）
+REVENUE = CAPITAL + 1           # 収益（ボーナスを含む）
+EXPENSES = REVENUE + 1          # 費用
+VALUATION = EXPENSES + 1        # 投資の評価損益（売却は評価額で行うので、実現した損益もここに入る）
+ACCOUNTS = ('現金', *INVESTMENT_TYPES, '借入金', '資本金', '収益', '費用', '投資の評価損益')
+
+# キャッシュフロー計算書の区分（現金の相手の勘定で決まる）
+OPERATIONS, INVESTING, FINANCING = range(3)
+_FLOW_OF = [OPERATIONS] * len(ACCOUNTS)
+for _account in ASSETS:
+    _FLOW_OF[_account] = INVESTING
+_FLOW_OF[DEBT] = FINANCING
+_ASSET_SET = frozenset(ASSETS)
+
+
+# 投資資産の種類の勘定
+def asset_account(asset_type):
+    return ASSETS[INVESTMENT_TYPES.index(asset_type)]
+
+
+# 残高から利益（収益 − 費用 + 投資の評価損益）を出す
+def profit_of(balances):
+    return -(balances[REVENUE] + balances[EXPENSES] + balances[VALUATION])
+
+
+class Journal:
+    __slots__ = ('debit', 'credit', 'amount', 'balances', 'flows', 'closes')
+
+    def __init__(self, capital=INITIAL_CASH):
+        self.debit = array('B')
+        self.credit = array('B')
+        self.amount = array('q')
+        self.balances = [0] * len(ACCOUNTS)
+        self.flows = [0, 0, 0]   # 営業・投資・財務
+        self.closes = []         # (ターン, 残高の tuple) のリスト
+        # 開始時の現金は資本金（キャッシュフローには入れない）
+        self.balances[CASH] = capital
+        self.balances[CAPITAL] = -capital
+
+    def __len__(self):
+        return len(self.amount)
+
+    # 借方 debit・貸方 credit に amount を記帳する（マイナスの額は貸借を入れ替えて記帳する）
+    def post(self, debit, credit, amount):
+        if amount < 0:
+            debit, credit, amount = credit, debit, -amount
+        self.debit.append(debit)
+        self.credit.append(credit)
+        self.amount.append(amount)
+        self._apply(debit, credit, amount)
+
+    def _apply(self, debit, credit, amount):
+        self.balances[debit] += amount
+        self.balances[credit] -= amount
+        if debit == CASH:
+            self.flows[_FLOW_OF[credit]] += amount
+        elif credit == CASH:
+            self.flows[_FLOW_OF[debit]] -= amount
+
+    # start 件目より後の仕訳に、投資資産の勘定を使ったものがあるか
+    def touches_assets(self, start=0):
+        for i in range(start, len(self.amount)):
+            if self.debit[i] in _ASSET_SET or self.credit[i] in _ASSET_SET:
+                return True
+        return False
+
+    def balance(self, account):
+        return self.balances[account]
+
+    # ターン turn の締め（その時点の残高の写し）を残す
+    def close(self, turn):
+        self.closes.append((turn, tuple(self.balances)))
+
+    # 最後の締め（なければ None）
+    def last_close(self):
+        return self.closes[-1] if self.closes else None
+
+    # 最初の length 件の仕訳と closes 件の締めだけを残す（後の仕訳は逆に打ち消す）
+    def truncate(self, length, closes):
+        for i in range(len(self.amount) - 1, length - 1, -1):
+            self._apply(self.credit[i], self.debit[i], self.amount[i])
+        del self.debit[length:]
+        del self.credit[length:]
+        del self.amount[length:]
+        del self.closes[closes:]
+
+    # 保たれていない関係の説明のリスト（すべて保たれていれば空）
+    def check(self):
+        balances = self.balances
+        total = sum(balances)
+        if (total == 0 and balances[CASH] == sum(self.flows) - balances[CAPITAL] and balances[DEBT] <= 0
+                and min(balances[ASSETS[0]:ASSETS[-1] + 1]) >= 0):
+            return []
+        problems = []
+        if total != 0:
+            problems.append(f"借方と貸方の合計が {total:+,}円 ずれています")
+        if balances[CASH] != -balances[CAPITAL] + sum(self.flows):
+            problems.append(f"現金 {balances[CASH]:,}円 が資本金とキャッシュフローの合計と合いません")
+        for account in ASSETS:
+            if balances[account] < 0:
+                problems.append(f"{ACCOUNTS[account]}の残高がマイナスです（{balances[account]:,}円）")
+        if balances[DEBT] > 0:
+            problems.append(f"借入金の残高がマイナスです（{-balances[DEBT]:,}円）")
+        return problems
+
+    # 以前のプレイヤー（残高を属性で持っていた頃）の値から仕訳帳を作る
+    # 投資の評価損益は記帳していなかったので、純資産と資本金・収益・費用との差を評価損益とする
+    @classmethod
+    def opening(cls, cash, asset_values, debt, revenue, expenses, flows):
+        journal = cls()
+        balances = journal.balances
+        balances[CASH] = cash
+        for account, value in zip(ASSETS, asset_values):
+            balances[account] = value
+        balances[DEBT] = -debt
+        balances[REVENUE] = -revenue
+        balances[EXPENSES] = expenses
+        balances[VALUATION] = -sum(balances)
+        journal.flows = list(flows)
+        return journal
@@ -0,0 +1,147 @@
+# 順位表（値の大きい順。値が変わるたびに全体を並べ直さない順序統計の構造）
+#
+# 項目はキー (-値, 項目ID) の昇順に、長さ LOAD 前後のソート済みのリスト（バケット）に分けて持つ。
+# 各バケットの長さは Fenwick 木（二分インデックス木）に入れておくので、n 項目のとき
+#   値の更新（古いキーの削除と新しいキーの挿入）: バケットの二分探索 O(log n) + バケット内の移動 O(LOAD)
+#   順位（上に何項目あるか）                    : O(log n)
+#   k 番目の項目                                : O(log n)
+# で済む。バケットが 2×LOAD を超えたら2つに分け、空になったら取り除く（Fenwick 木を作り直すのはこのときだけ）。
+# 同じ値の項目は項目IDの順に並ぶので、項目IDはどれも互いに比べられる型にすること。
+# スレッドセーフではない（使う側でロックを取る）。
+import bisect
+
+LOAD = 256
+
+
+class Leaderboard:
+    def __init__(self, load=LOAD):
+        self._load = load
+        self._buckets = []   # キーのソート済みのリスト
+        self._maxes = []     # 各バケットの最後のキー
+        self._tree = [0]     # バケットの長さの Fenwick 木（1始まり）
+        self._keys = {}      # 項目ID → キー
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, item):
+        return item in self._keys
+
+    def value(self, item):
+        return -self._keys[item][0]
+
+    # 項目の値を設定する（新しい項目なら加える）。値が変わらなければ何もせず False
+    def update(self, item, value):
+        key = (-value, item)
+        old = self._keys.get(item)
+        if old == key:
+            return False
+        if old is not None:
+            self._remove(old)
+        self._insert(key)
+        self._keys[item] = key
+        return True
+
+    def discard(self, item):
+        key = self._keys.pop(item, None)
+        if key is not None:
+            self._remove(key)
+
+    # 値が value より大きい項目の数（同じ値は同じ順位にするときの「順位 - 1」）
+    def count_above(self, value):
+        return self._position((-value,))
+
+    # 項目の順位（1位から。同じ値なら同じ順位）
+    def rank(self, item):
+        return self.count_above(self.value(item)) + 1
+
+    # 上から start 番目〜stop 番目の手前までの (項目ID, 値) のリスト
+    def items(self, start=0, stop=None):
+        stop = len(self._keys) if stop is None else min(stop, len(self._keys))
+        result = []
+        if start >= stop:
+            return result
+        i, offset = self._locate(start)
+        while len(result) < stop - start:
+            for negative, item in self._buckets[i][offset:offset + stop - start - len(result)]:
+                result.append((item, -negative))
+            i += 1
+            offset = 0
+        return result
+
+    # キーが key より小さい項目の数
+    def _position(self, key):
+        i = bisect.bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return len(self._keys)
+        return self._prefix(i) + bisect.bisect_left(self._buckets[i], key)
+
+    def _insert(self, key):
+        if not self._buckets:
+            self._buckets.append([key])
+            self._maxes.append(key)
+            self._rebuild()
+            return
+        i = bisect.bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            i -= 1
+            self._buckets[i].append(key)
+            self._maxes[i] = key
+        else:
+            bisect.insort(self._buckets[i], key)
+
+        bucket = self._buckets[i]
+        if len(bucket) > 2 * self._load:
+            self._buckets[i:i + 1] = [bucket[:self._load], bucket[self._load:]]
+            self._maxes[i:i + 1] = [bucket[self._load - 1], bucket[-1]]
+            self._rebuild()
+        else:
+            self._add(i, 1)
+
+    def _remove(self, key):
+        i = bisect.bisect_left(self._maxes, key)
+        bucket = self._buckets[i]
+        del bucket[bisect.bisect_left(bucket, key)]
+        if bucket:
+            self._maxes[i] = bucket[-1]
+            self._add(i, -1)
+        else:
+            del self._buckets[i]
+            del self._maxes[i]
+            self._rebuild()
+
+    # Fenwick 木: バケットの長さから作り直す / i 番目のバケットの長さを delta 変える /
+    # 最初の i 個のバケットの長さの合計 / 上から position 番目の項目の (バケット, バケット内の位置)
+    def _rebuild(self):
+        n = len(self._buckets)
+        tree = [0] * (n + 1)
+        for i, bucket in enumerate(self._buckets, 1):
+            tree[i] += len(bucket)
+            parent = i + (i & -i)
+            if parent <= n:
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _add(self, i, delta):
+        i += 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, i):
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, position):
+        i = 0
+        step = 1 << (len(self._tree).bit_length() - 1)
+        while step:
+            j = i + step
+            if j < len(self._tree) and self._tree[j] <= position:
+                position -= self._tree[j]
+                i = j
+            step >>= 1
+        return i, position
@@ -0,0 +1,119 @@
+# 取引履歴（列ごとの型付き配列に追記していく台帳）
+#
+# 種類・理由の文字列はプロセス全体で共有する表に登録し、台帳には番号だけを持つ。
+# 同じ文字列を何百ゲーム分も dict のキー・値として持たずに済む。
+# 投資の取得・売却の行には保有の番号（holding、それ以外の行は 0）を付け、売却と取得を結び付けられるようにする。
+import threading
+from array import array
+
+import numpy as np
+
+_strings = []
+_codes = {}
+_lock = threading.Lock()
+
+
+# 文字列を共有の表に登録して番号を返す
+def intern_code(text):
+    code = _codes.get(text)
+    if code is None:
+        with _lock:
+            code = _codes.get(text)
+            if code is None:
+                code = len(_strings)
+                _strings.append(text)
+                _codes[text] = code
+    return code
+
+
+def code_text(code):
+    return _strings[code]
+
+
+class Ledger:
+    __slots__ = ('turn', 'amount', 'cash_after', 'type_code', 'reason_code', 'holding')
+
+    COLUMNS = ('turn', 'type', 'amount', 'reason', 'cash_after', 'holding')
+
+    def __init__(self):
+        self.turn = array('h')
+        self.amount = array('q')
+        self.cash_after = array('q')
+        self.type_code = array('H')
+        self.reason_code = array('H')
+        self.holding = array('i')
+
+    def __len__(self):
+        return len(self.turn)
+
+    # 最初の length 行だけを残す（元に戻すとき。台帳は追記だけなので行数を覚えておけば戻せる）
+    def truncate(self, length):
+        for name in self.__slots__:
+            del getattr(self, name)[length:]
+
+    def append(self, turn, transaction_type, amount, reason, cash_after, holding=0):
+        self.turn.append(turn)
+        self.type_code.append(intern_code(transaction_type))
+        self.amount.append(amount)
+        self.reason_code.append(intern_code(reason))
+        self.cash_after.append(cash_after)
+        self.holding.append(holding)
+
+    # 1行を dict で取り出す（表示やデバッグ用）
+    def row(self, index):
+        return {
+            'turn': self.turn[index],
+            'type': code_text(self.type_code[index]),
+            'amount': self.amount[index],
+            'reason': code_text(self.reason_code[index]),
+            'cash_after': self.cash_after[index],
+            'holding': self.holding[index],
+        }
+
+    def rows(self):
+        return [self.row(i) for i in range(len(self))]
+
+    # 数値の列は配列のバッファをそのまま参照する（コピーしない）
+    # DataFrame が生きている間は配列を伸ばせない（追記すると BufferError）ので、
+    # ゲーム中に使う場合は copy=True を指定する
+    def to_frame(self, copy=False):
+        import pandas as pd
+
+        categories = list(_strings)
+
+        def column(values, dtype):
+            data = np.frombuffer(values, dtype=dtype)
+            return data.copy() if copy else data
+
+        return pd.DataFrame({
+            'turn': column(self.turn, np.int16),
+            'type': pd.Categorical.from_codes(column(self.type_code, np.uint16), categories=categories),
+            'amount': column(self.amount, np.int64),
+            'reason': pd.Categorical.from_codes(column(self.reason_code, np.uint16), categories=categories),
+            'cash_after': column(self.cash_after, np.int64),
+            'holding': column(self.holding, np.int32),
+        }, copy=False)
+
+    # 番号はプロセスごとに異なるため、保存時は使っている文字列と一緒に書き出す
+    def __getstate__(self):
+        used = sorted(set(self.type_code) | set(self.reason_code))
+        local = {code: i for i, code in enumerate(used)}
+        return {
+            'strings': [_strings[code] for code in used],
+            'turn': self.turn.tobytes(),
+            'amount': self.amount.tobytes(),
+            'cash_after': self.cash_after.tobytes(),
+            'type_code': array('H', [local[code] for code in self.type_code]).tobytes(),
+            'reason_code': array('H', [local[code] for code in self.reason_code]).tobytes(),
+            'holding': self.holding.tobytes(),
+        }
+
+    def __setstate__(self, state):
+        codes = [intern_code(text) for text in state['strings']]
+        self.turn = array('h', state['turn'])
+        self.amount = array('q', state['amount'])
+        self.cash_after = array('q', state['cash_after'])
+        self.type_code = array('H', [codes[i] for i in array('H', state['type_code'])])
+        self.reason_code = array('H', [codes[i] for i in array('H', state['reason_code'])])
+        # 保有の番号がない以前の台帳は、すべて 0（どの保有にも結び付かない）
+        self.holding = array('i', state['holding']) if 'holding' in state else array('i', bytes(4 * len(self.turn)))
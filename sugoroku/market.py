@@ -0,0 +1,37 @@
+# 投資資産の値動き（ローソク足）の生成
+#
+# ローソク足は float64 の配列で持つ。最後の軸が [始値, 高値, 安値, 終値] の4列で、
+# 陽線・陰線は始値と終値から分かるため色は保持しない。
+import numpy as np
+
+from .rules import NUM_CANDLES
+
+OPEN, HIGH, LOW, CLOSE = range(4)
+
+_rng = np.random.default_rng()
+
+
+# ローソク足チャートデータの生成
+# n_paths を省略すると (num_candles, 4)、指定すると (n_paths, num_candles, 4) の独立な値動きを返す
+def generate_candlestick_data(n_paths=None, num_candles=NUM_CANDLES, rng=None):
+    rng = _rng if rng is None else rng
+    n = 1 if n_paths is None else n_paths
+
+    base_price = rng.uniform(100, 500, (n, 1))
+    change = rng.uniform(-0.1, 0.1, (n, num_candles))  # -10% 〜 +10% の変動
+    close_price = base_price * np.cumprod(1 + change, axis=1)
+
+    data = np.empty((n, num_candles, 4))
+    data[:, 0, OPEN] = base_price[:, 0]
+    data[:, 1:, OPEN] = close_price[:, :-1]
+    data[:, :, CLOSE] = close_price
+    data[:, :, HIGH] = np.maximum(data[:, :, OPEN], close_price) * (1 + rng.uniform(0, 0.05, (n, num_candles)))
+    data[:, :, LOW] = np.minimum(data[:, :, OPEN], close_price) * (1 - rng.uniform(0, 0.05, (n, num_candles)))
+    np.round(data, 2, out=data)
+
+    return data[0] if n_paths is None else data
+
+
+# 1本目の終値に対する各ローソク足の終値の比（投資額に掛けると評価額になる）
+def price_ratios(data):
+    return data[..., CLOSE] / data[..., :1, CLOSE]
@@ -0,0 +1,272 @@
+# 再実行ごとの計測（どこに時間がかかったか・どの操作が何回・送ったデータの大きさ）
+#
+# 環境変数 SUGOROKU_METRICS=1 のときだけ計測する。オフのときは section() が何もしない
+# 共有のオブジェクトを返し、inc() / observe() もすぐ戻るので、ほとんど負荷がかからない。
+#
+# 計測値はプロセス全体で集計し、次の形で取り出せる。
+#   prometheus_text()            Prometheus のテキスト形式
+#   json_lines()                 1系列1行の JSON
+#   SUGOROKU_METRICS_PORT=9100   /metrics（Prometheus）と /metrics.jsonl を返す HTTP サーバーを立てる
+#   SUGOROKU_METRICS_HOST=addr   その HTTP サーバーが待ち受けるアドレス（認証がないので、既定はこのマシンだけの 127.0.0.1）
+#   SUGOROKU_METRICS_FILE=path   再実行ごとの内訳を JSON lines で追記する
+import functools
+import json
+import os
+import threading
+import time
+
+ENABLED = os.environ.get('SUGOROKU_METRICS', '') not in ('', '0')
+
+_lock = threading.Lock()
+_counters = {}    # (名前, ラベル) → 値
+_summaries = {}   # (名前, ラベル) → [回数, 合計, 最大]
+_local = threading.local()
+_log_file = None
+_exporter = None
+
+HELP = {
+    'sugoroku_reruns_total': "スクリプト・フラグメントの実行回数",
+    'sugoroku_actions_total': "操作の回数",
+    'sugoroku_section_seconds': "画面の各部分の所要時間（秒）",
+    'sugoroku_action_seconds': "操作（コールバック）の所要時間（秒）",
+    'sugoroku_payload_bytes': "コンポーネントに送ったデータの大きさ（バイト）",
+    'sugoroku_invariant_violations_total': "記帳と保有が合わなくなったイベントの数",
+}
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(name, value, **labels):
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        summary = _summaries.get(key)
+        if summary is None:
+            _summaries[key] = [1, value, value]
+        else:
+            summary[0] += 1
+            summary[1] += value
+            if value > summary[2]:
+                summary[2] = value
+
+
+class _NullSection:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SECTION = _NullSection()
+
+
+# 画面の一部分の所要時間を測る（実行中の run() があればその内訳にも入れる）
+class _Section:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        observe('sugoroku_section_seconds', elapsed, section=self.name)
+        record = getattr(_local, 'record', None)
+        if record is not None:
+            record['sections'][self.name] = record['sections'].get(self.name, 0.0) + elapsed
+        return False
+
+
+# 1回のスクリプト（またはフラグメントだけ）の実行を測る
+# すでに実行中の run() の中で呼ばれたときは、その一部分（section）として扱う
+class _Run(_Section):
+    __slots__ = ('record',)
+
+    def __enter__(self):
+        if getattr(_local, 'record', None) is not None:
+            self.record = None
+            return super().__enter__()
+        self.record = _local.record = {'scope': self.name, 'time': time.time(), 'sections': {}}
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.record is None:
+            return super().__exit__(*exc)
+        _local.record = None
+        self.record['seconds'] = time.perf_counter() - self.start
+        inc('sugoroku_reruns_total', scope=self.name)
+        observe('sugoroku_section_seconds', self.record['seconds'], section=f'{self.name}:total')
+        _local.last = self.record
+        _write_log(self.record)
+        return False
+
+
+def section(name):
+    return _Section(name) if ENABLED else _NULL_SECTION
+
+
+def run(scope):
+    return _Run(scope) if ENABLED else _NULL_SECTION
+
+
+# 関数全体を run(scope) で測るデコレーター（オフのときは関数をそのまま返す）
+def timed(scope):
+    def decorate(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Run(scope):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# このスレッドで最後に終わった run() の内訳
+def last_run():
+    return getattr(_local, 'last', None)
+
+
+# 操作の回数と所要時間
+def record_action(action, seconds, actor='human'):
+    if not ENABLED:
+        return
+    inc('sugoroku_actions_total', action=action, actor=actor)
+    observe('sugoroku_action_seconds', seconds, action=action)
+
+
+# コンポーネントに送ったデータの大きさ（payload は str か JSON にできる値）
+def record_payload(component, payload):
+    if not ENABLED:
+        return
+    size = len(payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False))
+    observe('sugoroku_payload_bytes', size, component=component)
+
+
+def _write_log(record):
+    if _log_file is None:
+        return
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+    with _lock:
+        _log_file.write(line)
+
+
+# 集計値の一覧（名前, ラベル, 種類, 値）
+def snapshot():
+    with _lock:
+        counters = list(_counters.items())
+        summaries = [(key, list(summary)) for key, summary in _summaries.items()]
+    rows = [(name, dict(labels), 'counter', value) for (name, labels), value in sorted(counters)]
+    for (name, labels), (count, total, maximum) in sorted(summaries):
+        rows.append((name, dict(labels), 'summary', {'count': count, 'sum': total, 'max': maximum}))
+    return rows
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+
+# 要約（summary）は _count と _sum、最大値は別の gauge（名前_max）として出す
+def prometheus_text():
+    lines = []
+    maxima = []
+    declared = set()
+    for name, labels, kind, value in snapshot():
+        if name not in declared:
+            declared.add(name)
+            if name in HELP:
+                lines.append(f"# HELP {name} {HELP[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+        if kind == 'counter':
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        else:
+            lines.append(f"{name}_count{_format_labels(labels)} {value['count']}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {value['sum']}")
+            maxima.append((f"{name}_max", labels, value['max']))
+
+    for name, labels, value in maxima:
+        if name not in declared:
+            declared.add(name)
+            lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def json_lines():
+    now = time.time()
+    return "".join(
+        json.dumps({'time': now, 'name': name, 'labels': labels, 'type': kind, 'value': value},
+                   ensure_ascii=False) + "\n"
+        for name, labels, kind, value in snapshot())
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _summaries.clear()
+
+
+# /metrics と /metrics.jsonl を返す HTTP サーバー（プロセスで1つ）
+def start_exporter(port, host='127.0.0.1'):
+    global _exporter
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                body, content_type = prometheus_text(), 'text/plain; version=0.0.4; charset=utf-8'
+            elif self.path == '/metrics.jsonl':
+                body, content_type = json_lines(), 'application/x-ndjson; charset=utf-8'
+            else:
+                self.send_error(404)
+                return
+            data = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    with _lock:
+        if _exporter is None:
+            _exporter = ThreadingHTTPServer((host, port), Handler)
+            threading.Thread(target=_exporter.serve_forever, name="sugoroku-metrics", daemon=True).start()
+    return _exporter
+
+
+# 環境変数の設定に従って出力先を用意する（何度呼んでもよい）
+def setup():
+    global _log_file
+    if not ENABLED:
+        return
+    path = os.environ.get('SUGOROKU_METRICS_FILE')
+    if path and _log_file is None:
+        with _lock:
+            if _log_file is None:
+                _log_file = open(path, 'a', buffering=1, encoding='utf-8')
+    port = os.environ.get('SUGOROKU_METRICS_PORT')
+    if port and _exporter is None:
+        start_exporter(int(port), os.environ.get('SUGOROKU_METRICS_HOST') or '127.0.0.1')
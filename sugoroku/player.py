@@ -0,0 +1,105 @@
+from .journal import (
+    ASSETS, CASH, DEBT, EXPENSES, FINANCING, INVESTING, OPERATIONS, REVENUE, VALUATION, Journal, asset_account, profit_of,
+)
+from .ledger import Ledger
+from .rules import INVESTMENT_TYPES
+
+
+# プレイヤークラス
+# 同時に多数のゲームを保持しても軽いよう、属性は __slots__ に固定する
+# お金の動きはすべて仕訳帳（journal.Journal）に記帳し、現金・資産・借金・収益・費用・キャッシュフローは
+# 仕訳帳の勘定の残高を読む（ここで書き換えることはない）
+# 資産は保有している投資の評価額（時価）の種類ごとの合計で、ゲームの Portfolio が評価し直すたびに記帳される
+class Player:
+    __slots__ = ('name', 'number', 'position', 'journal', 'ledger')
+
+    def __init__(self, name, number):
+        self.name = name
+        self.number = number
+        self.position = 0
+        self.journal = Journal()
+        self.ledger = Ledger()
+
+    @property
+    def cash(self):
+        return self.journal.balances[CASH]
+
+    @property
+    def asset_values(self):
+        balances = self.journal.balances
+        return [balances[account] for account in ASSETS]
+
+    @property
+    def debt(self):
+        return -self.journal.balances[DEBT]
+
+    @property
+    def revenue(self):
+        return -self.journal.balances[REVENUE]
+
+    @property
+    def expenses(self):
+        return self.journal.balances[EXPENSES]
+
+    # 投資の評価損益（売却した保有の損益を含む）
+    @property
+    def valuation_gain(self):
+        return -self.journal.balances[VALUATION]
+
+    @property
+    def cf_operations(self):
+        return self.journal.flows[OPERATIONS]
+
+    @property
+    def cf_investment(self):
+        return self.journal.flows[INVESTING]
+
+    @property
+    def cf_financing(self):
+        return self.journal.flows[FINANCING]
+
+    def get_asset(self, asset_type):
+        return self.journal.balances[asset_account(asset_type)]
+
+    # (資産の種類, 金額) の組を種類順に返す
+    def asset_items(self):
+        return zip(INVESTMENT_TYPES, self.asset_values)
+
+    def get_total_assets(self):
+        balances = self.journal.balances
+        return balances[CASH] + sum(balances[account] for account in ASSETS)
+
+    def get_equity(self):
+        return self.get_total_assets() - self.debt
+
+    # 利益（収益 − 費用 + 投資の評価損益）。開始時からの純資産の増減と一致する
+    def get_profit(self):
+        return profit_of(self.journal.balances)
+
+    # 元に戻すための写し（仕訳帳と取引履歴は追記だけなので、行数だけを持つ）
+    def checkpoint(self):
+        return self.position, len(self.journal), len(self.journal.closes), len(self.ledger)
+
+    def restore(self, checkpoint):
+        self.position, entries, closes, rows = checkpoint
+        self.journal.truncate(entries, closes)
+        self.ledger.truncate(rows)
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    # 仕訳帳のない以前のプレイヤーは、残高の属性から仕訳帳を作る
+    def __setstate__(self, state):
+        if isinstance(state, tuple):
+            state = state[1]
+        if 'journal' not in state:
+            state = dict(state, journal=Journal.opening(
+                state['cash'], state['asset_values'], state['debt'], state['revenue'], state['expenses'],
+                (state['cf_operations'], state['cf_investment'], state['cf_financing'])))
+        for name in self.__slots__:
+            setattr(self, name, state[name])
+
+    # ターン番号は呼び出し側から渡す（セッション状態に依存しない）
+    # holding は投資の取得・売却の行の保有の番号
+    def add_transaction(self, transaction_type, amount, reason, turn, holding=0):
+        self.ledger.append(turn, transaction_type, amount, reason, self.cash, holding)
@@ -0,0 +1,212 @@
+# 投資の保有（ポートフォリオ）と時価評価
+#
+# 投資マスで購入した資産は売るまで持ち続け、1件ごとに購入時に引いた値動き（ローソク足 NUM_CANDLES 本）を持つ。
+# 購入時は1本目で評価し、ターン（全員の手番）が終わるたびに、すべての保有を CANDLES_PER_TURN 本ずつ進めて
+# 評価額 = 取得額 × (その足の終値 / 1本目の終値) を計算し直す。
+#
+# 1ゲームの全プレイヤーの保有は、列ごとの NumPy 配列1組にまとめて持つ（owners 列が持ち主）。
+# 評価し直すのはターンごとに NumPy の演算数回で、保有がいくつあっても Python のループは回らない。
+# 売却した行は最後の行で埋めるので、配列の先頭 size 行が保有中のもの（順番は保たない）。
+# 各プレイヤーの資産（Player.asset_values）は、保有の評価額の資産の種類ごとの合計にしておく。
+#
+# 元に戻すための写し（checkpoint）は、小さな列のコピーと、保有ごとに1度だけ作る読み取り専用の値動きの参照を持つ。
+# 変わるたびに version を新しくするので、前の写しから変わっていなければ同じ写しを使い回せる。
+import itertools
+
+import numpy as np
+
+from .market import CLOSE
+from .rules import INVESTMENT_TYPES, NUM_CANDLES, NUM_TURNS
+
+# 1ターンで進むローソク足の本数（1ターン目に買った保有が最後のターンの終わりに最後の足の手前まで進む）
+CANDLES_PER_TURN = max(1, (NUM_CANDLES - 1) // NUM_TURNS)
+
+_TYPE_INDEX = {investment_type: i for i, investment_type in enumerate(INVESTMENT_TYPES)}
+
+# 写しに入れる列（値動きは別に参照で持つ）
+_CHECKPOINT_COLUMNS = ('ids', 'owners', 'kinds', 'costs', 'values', 'candles', 'turns')
+
+# 版の番号（プロセス全体で重ならない）
+_versions = itertools.count(1)
+
+
+# 1件の保有（画面用に取り出したもの）
+class Holding:
+    __slots__ = ('holding_id', 'owner', 'investment_type', 'cost', 'value', 'candle', 'turn')
+
+    def __init__(self, holding_id, owner, investment_type, cost, value, candle, turn):
+        self.holding_id = holding_id
+        self.owner = owner
+        self.investment_type = investment_type
+        self.cost = cost
+        self.value = value
+        self.candle = candle
+        self.turn = turn
+
+
+class Portfolio:
+    __slots__ = ('ids', 'owners', 'kinds', 'costs', 'values', 'candles', 'turns', 'paths', 'size', 'next_id',
+                 'version', '_path_of')
+
+    def __init__(self, capacity=8):
+        self.size = 0
+        self.next_id = 1
+        self.version = next(_versions)
+        self._path_of = {}       # 保有の番号 → 値動き（読み取り専用。写しと共有する）
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.owners = np.zeros(capacity, dtype=np.int16)
+        self.kinds = np.zeros(capacity, dtype=np.int16)      # INVESTMENT_TYPES の番号
+        self.costs = np.zeros(capacity, dtype=np.int64)      # 取得額
+        self.values = np.zeros(capacity, dtype=np.int64)     # 評価額
+        self.candles = np.zeros(capacity, dtype=np.int16)    # 今のローソク足の番号
+        self.turns = np.zeros(capacity, dtype=np.int16)      # 購入したターン
+        self.paths = np.zeros((capacity, NUM_CANDLES, 4))    # 値動き
+
+    def __len__(self):
+        return self.size
+
+    # 保有を加え、保有の番号を返す（評価額は取得額、ローソク足は1本目）
+    def open(self, owner, investment_type, cost, candles, turn):
+        if self.size == len(self.ids):
+            self._grow(2 * len(self.ids))
+        i = self.size
+        holding_id = self.next_id
+        self.ids[i] = holding_id
+        self.owners[i] = owner
+        self.kinds[i] = _TYPE_INDEX[investment_type]
+        self.costs[i] = cost
+        self.values[i] = cost
+        self.candles[i] = 0
+        self.turns[i] = turn
+        path = np.array(candles, dtype=np.float64)
+        path.setflags(write=False)
+        self._path_of[holding_id] = path
+        self.paths[i] = path
+        self.size += 1
+        self.next_id += 1
+        self.version = next(_versions)
+        return holding_id
+
+    def _grow(self, capacity):
+        for name in ('ids', 'owners', 'kinds', 'costs', 'values', 'candles', 'turns', 'paths'):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    # 保有の行（なければ None）
+    def _row(self, holding_id):
+        rows = np.flatnonzero(self.ids[:self.size] == holding_id)
+        return int(rows[0]) if rows.size else None
+
+    def holding(self, holding_id):
+        i = self._row(holding_id)
+        return None if i is None else self._holding(i)
+
+    def _holding(self, i):
+        return Holding(int(self.ids[i]), int(self.owners[i]), INVESTMENT_TYPES[self.kinds[i]],
+                       int(self.costs[i]), int(self.values[i]), int(self.candles[i]), int(self.turns[i]))
+
+    # プレイヤー owner の保有のリスト（購入した順）
+    def held(self, owner):
+        rows = np.flatnonzero(self.owners[:self.size] == owner)
+        rows = rows[np.argsort(self.ids[rows])]
+        return [self._holding(i) for i in rows]
+
+    # プレイヤー owner の最後に買った保有の番号（なければ None）
+    def latest(self, owner):
+        mine = self.ids[:self.size][self.owners[:self.size] == owner]
+        return int(mine.max()) if mine.size else None
+
+    # 保有の値動きの、今のローソク足までの部分
+    def history(self, holding_id):
+        i = self._row(holding_id)
+        return self.paths[i, :self.candles[i] + 1].copy()
+
+    # candle 本目の終値で評価した額（以前の「購入した手番に選んだ足で売る」売却用）
+    def value_at(self, holding_id, candle):
+        i = self._row(holding_id)
+        close = self.paths[i, :, CLOSE]
+        return int(self.costs[i] * (close[candle] / close[0]))
+
+    # 保有を外して Holding を返す（空いた行は最後の行で埋める）
+    def close(self, holding_id):
+        i = self._row(holding_id)
+        if i is None:
+            return None
+        holding = self._holding(i)
+        last = self.size - 1
+        if i != last:
+            for name in ('ids', 'owners', 'kinds', 'costs', 'values', 'candles', 'turns', 'paths'):
+                column = getattr(self, name)
+                column[i] = column[last]
+        self.size = last
+        del self._path_of[holding_id]
+        self.version = next(_versions)
+        return holding
+
+    # すべての保有を steps 本進めて評価し直す
+    # (プレイヤー × 資産の種類) ごとの評価額の合計と、その増減の配列を返す
+    def revalue(self, steps, num_players):
+        n = self.size
+        before = self.marks(num_players)
+        if n:
+            candles = np.minimum(self.candles[:n] + steps, NUM_CANDLES - 1)
+            close = self.paths[:n, :, CLOSE]
+            self.candles[:n] = candles
+            self.values[:n] = (self.costs[:n] * (close[np.arange(n), candles] / close[:, 0])).astype(np.int64)
+            self.version = next(_versions)
+        after = self.marks(num_players)
+        return after, after - before
+
+    # (プレイヤー × 資産の種類) ごとの評価額の合計
+    def marks(self, num_players):
+        n = self.size
+        kinds = len(INVESTMENT_TYPES)
+        cells = self.owners[:n].astype(np.int64) * kinds + self.kinds[:n]
+        totals = np.bincount(cells, weights=self.values[:n], minlength=num_players * kinds)
+        return np.rint(totals).astype(np.int64).reshape(num_players, kinds)
+
+    # 元に戻すための写し（previous から変わっていなければ previous をそのまま返す）
+    def checkpoint(self, previous=None):
+        if previous is not None and previous[0] == self.version:
+            return previous
+        n = self.size
+        columns = {name: getattr(self, name)[:n].copy() for name in _CHECKPOINT_COLUMNS}
+        paths = tuple(self._path_of[holding_id] for holding_id in columns['ids'].tolist())
+        return self.version, n, self.next_id, columns, paths
+
+    def restore(self, checkpoint):
+        version, n, next_id, columns, paths = checkpoint
+        if n > len(self.ids):
+            self._grow(n)
+        for name, values in columns.items():
+            getattr(self, name)[:n] = values
+        for i, path in enumerate(paths):
+            self.paths[i] = path
+        self.size = n
+        self.next_id = next_id
+        self.version = version
+        self._path_of = dict(zip(columns['ids'].tolist(), paths))
+
+    # 保有中の行だけを保存する
+    def __getstate__(self):
+        n = self.size
+        return {
+            'next_id': self.next_id,
+            'columns': {name: getattr(self, name)[:n].copy()
+                        for name in ('ids', 'owners', 'kinds', 'costs', 'values', 'candles', 'turns', 'paths')},
+        }
+
+    def __setstate__(self, state):
+        columns = state['columns']
+        n = len(columns['ids'])
+        self.__init__(max(8, n))
+        for name, values in columns.items():
+            getattr(self, name)[:n] = values
+        self.size = n
+        self.next_id = state['next_id']
+        for i, holding_id in enumerate(self.ids[:n].tolist()):
+            path = self.paths[i].copy()
+            path.setflags(write=False)
+            self._path_of[holding_id] = path
@@ -0,0 +1,53 @@
+# 投資の相場の先読み
+#
+# 投資マスに止まったプレイヤーが購入するか迷っている間に、購入したときに引くローソク足
+# （GameRNG の相場の系列の次の1本）と、それを使う重い処理（図の JSON など）をワーカースレッドで作っておく。
+# 先読みでは系列を進めない（peek）ので、見送ってもゲームの乱数と再現性は変わらない。
+# 購入のときは完成した結果を受け取るだけになり、見送ったときは捨てる（まだ始まっていなければ取り消す）。
+#
+# 先読みの実行中は相場の系列に触れないこと（購入では先に result()、見送り・元に戻す・やり直すでは discard() で終わるのを待つ）。
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_executor = None
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="sugoroku-prefetch")
+    return _executor
+
+
+# ゲームとその時点（この時点の次のイベントで購入したときだけ先読みが使える）
+def state_key(state):
+    return state['game_id'], state['event_seq']
+
+
+class MarketPrefetch:
+    __slots__ = ('key', 'future')
+
+    def __init__(self, key, future):
+        self.key = key
+        self.future = future
+
+    # (ローソク足, render の結果) を待って受け取る
+    def result(self):
+        return self.future.result()
+
+    # 捨てる（まだ始まっていなければ取り消し、実行中なら終わるのを待ってから結果を使わない）
+    def discard(self):
+        self.future.cancel() or self.future.exception()
+
+
+# 次に購入したときのローソク足と render(candles) の結果を作り始める
+def start(state, render=None):
+    market = state['rng'].market
+
+    def build():
+        candles = market.peek()
+        return candles, render(candles) if render is not None else None
+
+    return MarketPrefetch(state_key(state), _get_executor().submit(build))
@@ -0,0 +1,187 @@
+# 保存したゲームのリプレイと観戦
+#
+# GameStore にはイベント（サイコロの目・マスの金額・投資と売却の選択）と、手番の終わりごとの
+# 状態全体のスナップショットがある。Recording はイベントを1手ずつの短い記録（Move）にして持ち、
+# 任意の手の状態は、それ以前で最も新しいスナップショット（主キーで引く）から高々1手番分の
+# イベントを適用し直して作る。最初から適用し直すことはない。
+#
+# 観戦中のゲームは refresh で追加されたイベントだけを読み足す。読み込みは書き込み用のスレッドを待たず、
+# コミット済みの分だけを WAL で読むので、プレイヤー側の保存や再実行を遅らせない。
+# 同じゲームを見ている人は Recording を共有し、作った状態も手ごとに少しだけ取っておいて使い回す。
+# プレイヤーが操作を元に戻すと保存先の revision が進むので、そのときは最初から読み直す。
+import bisect
+import threading
+import time
+from collections import OrderedDict
+
+from . import engine
+from .rules import MASS_TYPES, RULES
+
+# プロセスで持っておく Recording の数（超えたら最近見られていないものから捨てる）
+MAX_RECORDINGS = 64
+
+
+# 1手の記録
+#   seq:    このイベントを適用した後の event_seq
+#   turn, player: そのときのターンと手番のプレイヤーの番号
+#   kind:   イベントの種類
+#   label:  画面に出す短い説明
+class Move:
+    __slots__ = ('seq', 'turn', 'player', 'kind', 'label')
+
+    def __init__(self, seq, turn, player, kind, label):
+        self.seq = seq
+        self.turn = turn
+        self.player = player
+        self.kind = kind
+        self.label = label
+
+
+# 保存したイベントから1手の説明を作る（position は移動後の位置）
+def _label(kind, payload, board, position):
+    if kind == 'roll':
+        mass_type = board[position]
+        effect = RULES.effect_of(mass_type)
+        text = f"🎲 {payload['dice']} → {position}マス目 {MASS_TYPES[mass_type]['emoji']} {MASS_TYPES[mass_type]['name']}"
+        outcome = payload.get('outcome')
+        if effect == 'revenue':
+            text += f" +{outcome['amount']:,}円"
+        elif effect == 'expense':
+            text += f" -{outcome['amount']:,}円"
+        elif effect == 'debt':
+            text += f" 借入 {outcome['amount']:,}円"
+        elif effect == 'investment':
+            text += f" {outcome['type']} {outcome['amount']:,}円"
+        return text
+    if kind == 'bonus':
+        successes = sum(payload['flips'])
+        payout = RULES.masses[board[position]].payout
+        return f"🍾 ボトルフリップ {successes}/{payload['dice']} 成功 +{successes * payout:,}円"
+    if kind == 'buy':
+        return "🏢 投資した" if payload.get('candles') is not None else "❌ 資金不足で投資できなかった"
+    if kind == 'skip':
+        return "投資を見送った"
+    if kind == 'sell':
+        if payload.get('holding_id') is not None:
+            return f"💹 保有 #{payload['holding_id']} を売却"
+        return f"💹 {payload['sell_index'] + 1}本目で売却"
+    return "手番終了"
+
+
+class Recording:
+    def __init__(self, store, game_id, initial, cache_size=32, refresh_interval=1.0):
+        self.store = store
+        self.game_id = game_id
+        self.names = [player.name for player in initial['players']]
+        self.board = initial['board']
+        self.num_players = initial['num_players']
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._states = OrderedDict()   # seq → 状態（最近使った順、読むだけにすること）
+        self._cache_size = cache_size
+        self._refreshed = 0.0
+        self._start(initial, store.revision(game_id, flush=False))
+        self.refresh(force=True)
+
+    # 最初の状態から数え直す
+    def _start(self, initial, revision):
+        self.moves = []            # Move のリスト（seq の順。moves[i].seq は i + 1）
+        self.turn_ends = []        # 手番の終わり（end_turn）の seq
+        self.finished = initial['game_finished']
+        self.revision = revision
+        # 読み足すときに続きから数えるための、最後の手の後のターン・手番・各プレイヤーの位置
+        self._turn = initial['turn']
+        self._player = initial['current_player']
+        self._positions = [player.position for player in initial['players']]
+        self._states.clear()
+        self._states[0] = initial
+
+    @property
+    def latest(self):
+        return self.moves[-1].seq if self.moves else 0
+
+    # 追加されたイベントを読み足す（refresh_interval 秒以内に読んだばかりなら何もしない）
+    # 新しい手があるか、元に戻されて読み直したら True
+    def refresh(self, force=False):
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._refreshed < self.refresh_interval:
+                return False
+            self._refreshed = now
+            revision = self.store.revision(self.game_id, flush=False)
+            rewound = revision != self.revision
+            if rewound:
+                self._start(self.store.load(self.game_id, until=0, flush=False), revision)
+            elif self.finished:
+                return False
+            events = self.store.events(self.game_id, self.latest, flush=False)
+            for seq, kind, payload in events:
+                self._append(seq, kind, payload)
+            return rewound or bool(events)
+
+    def _append(self, seq, kind, payload):
+        player = self._player
+        if kind == 'roll':
+            self._positions[player] = (self._positions[player] + payload['dice']) % len(self.board)
+        self.moves.append(Move(seq, self._turn, player, kind, _label(kind, payload, self.board, self._positions[player])))
+        if kind == 'end_turn':
+            self.turn_ends.append(seq)
+            self._player, self._turn, self.finished = engine.advance_turn(player, self._turn, self.num_players)
+
+    # seq のイベントを適用した直後の状態（手番の終わりのスナップショットから作る）
+    def state_at(self, seq):
+        with self._lock:
+            state = self._states.get(seq)
+            if state is not None:
+                self._states.move_to_end(seq)
+                return state
+        state = self.store.load(self.game_id, until=seq, flush=False)
+        with self._lock:
+            self._states[seq] = state
+            while len(self._states) > self._cache_size:
+                self._states.popitem(last=False)
+        return state
+
+    # 手番の始まりの seq のリスト（ゲームの始まりの 0 と、各手番の終わり）
+    def move_starts(self):
+        return [0] + self.turn_ends
+
+    # seq の手を含む手番の手のリスト（seq が 0 なら空）
+    def turn_moves(self, seq):
+        if seq <= 0:
+            return []
+        i = bisect.bisect_left(self.turn_ends, seq)
+        start = self.turn_ends[i - 1] if i > 0 else 0
+        end = self.turn_ends[i] if i < len(self.turn_ends) else self.latest
+        return self.moves[start:end]
+
+    # ターン turn の始まりの seq（まだ始まっていなければ最新）
+    def turn_start(self, turn):
+        for move in self.moves:
+            if move.turn == turn:
+                return move.seq - 1
+        return self.latest
+
+
+_recordings = OrderedDict()
+_recordings_lock = threading.Lock()
+
+
+# ゲームの Recording（プロセスで共有する。見つからなければ None）
+def open_recording(store, game_id):
+    key = (store.path, game_id)
+    with _recordings_lock:
+        recording = _recordings.get(key)
+        if recording is not None:
+            _recordings.move_to_end(key)
+            return recording
+
+    initial = store.load(game_id, until=0, flush=False)
+    if initial is None:
+        return None
+    recording = Recording(store, game_id, initial)
+    with _recordings_lock:
+        recording = _recordings.setdefault(key, recording)
+        while len(_recordings) > MAX_RECORDINGS:
+            _recordings.popitem(last=False)
+    return recording
@@ -0,0 +1,145 @@
+# ゲームごとの乱数
+#
+# 1つのシードから用途ごとの独立な系列（ボード・サイコロ・マスのイベント・ボトルフリップ・相場）を作る。
+# ボードは開始時に NumPy で一度に並べるので Generator をそのまま使う。
+# それ以外の系列は numpy.random.Generator から一様乱数をまとめて引いておき、1回ごとには Generator を呼ばない。
+# 系列が分かれているので、例えば投資するかどうかで相場の系列を使っても、サイコロの目はずれない。
+# シードと各系列で引いた数だけを pickle するため、スナップショットが小さい。
+# 元に戻すときも各系列で引いた数だけを覚えておき、戻すときに変わった系列だけをシードから作り直して進め直す。
+import secrets
+
+import numpy as np
+
+from .market import generate_candlestick_data
+
+STREAMS = ('board', 'dice', 'events', 'bottle', 'market')
+
+# 引いた数を保存して読み込み時に進め直す系列（ボードは開始時にしか使わない）
+DRAWN_STREAMS = ('dice', 'events', 'bottle', 'market')
+
+
+# random モジュール互換（randint / choice / sample / shuffle / random）の系列
+class UniformStream:
+    __slots__ = ('_generator', '_block', '_values', '_index', '_blocks')
+
+    def __init__(self, generator, block=64):
+        self._generator = generator
+        self._block = block
+        self._values = []
+        self._index = 0
+        self._blocks = 0
+
+    # これまでに引いた数
+    @property
+    def drawn(self):
+        return (self._blocks - 1) * self._block + self._index if self._blocks else 0
+
+    def random(self):
+        if self._index == len(self._values):
+            self._values = self._generator.random(self._block).tolist()
+            self._index = 0
+            self._blocks += 1
+        value = self._values[self._index]
+        self._index += 1
+        return value
+
+    def randint(self, a, b):
+        return a + int(self.random() * (b - a + 1))
+
+    def choice(self, seq):
+        return seq[int(self.random() * len(seq))]
+
+    def shuffle(self, x):
+        for i in range(len(x) - 1, 0, -1):
+            j = int(self.random() * (i + 1))
+            x[i], x[j] = x[j], x[i]
+
+    def sample(self, population, k):
+        pool = list(population)
+        for i in range(k):
+            j = i + int(self.random() * (len(pool) - i))
+            pool[i], pool[j] = pool[j], pool[i]
+        return pool[:k]
+
+    def skip(self, count):
+        for _ in range(count):
+            self.random()
+
+
+# ローソク足の系列（block 本ずつまとめて生成する）
+class MarketStream:
+    __slots__ = ('_generator', '_block', '_paths', '_index', 'drawn')
+
+    def __init__(self, generator, block=4):
+        self._generator = generator
+        self._block = block
+        self._paths = None
+        self._index = block
+        self.drawn = 0
+
+    def candles(self):
+        data = self.peek()
+        self._index += 1
+        self.drawn += 1
+        return data
+
+    # 次に candles() で引く1本を、系列を進めずに返す（まとめて生成する順は変わらないので、後で引く値も同じ）
+    def peek(self):
+        if self._index == self._block:
+            self._paths = generate_candlestick_data(self._block, rng=self._generator)
+            self._index = 0
+        return self._paths[self._index].copy()
+
+    def skip(self, count):
+        for _ in range(count):
+            self.candles()
+
+
+class GameRNG:
+    __slots__ = ('seed',) + STREAMS
+
+    def __init__(self, seed=None):
+        self.seed = secrets.randbits(63) if seed is None else int(seed)
+        board, dice, events, bottle, market = (
+            np.random.default_rng(child) for child in np.random.SeedSequence(self.seed).spawn(len(STREAMS)))
+        self.board = board
+        self.dice = UniformStream(dice)
+        self.events = UniformStream(events)
+        self.bottle = UniformStream(bottle)
+        self.market = MarketStream(market)
+
+    # 各系列で引いた数（rewind で戻す位置）
+    def position(self):
+        return tuple(getattr(self, name).drawn for name in DRAWN_STREAMS)
+
+    # 各系列を position() の位置に戻す（引いた数が変わった系列だけ作り直す）
+    def rewind(self, position):
+        children = None
+        for name, drawn in zip(DRAWN_STREAMS, position):
+            stream = getattr(self, name)
+            if stream.drawn == drawn:
+                continue
+            if stream.drawn > drawn:
+                if children is None:
+                    children = np.random.SeedSequence(self.seed).spawn(len(STREAMS))
+                generator = np.random.default_rng(children[STREAMS.index(name)])
+                stream = MarketStream(generator) if name == 'market' else UniformStream(generator)
+                setattr(self, name, stream)
+            stream.skip(drawn - stream.drawn)
+
+    # ローソク足を1本分（num_candles × 4）引く
+    def candles(self):
+        return self.market.candles()
+
+    # 次に candles() で引くローソク足（系列は進めない）
+    def peek_candles(self):
+        return self.market.peek()
+
+    # シードと各系列で引いた数だけを保存し、読み込み時に同じ位置まで進め直す
+    def __getstate__(self):
+        return {'seed': self.seed, 'drawn': {name: getattr(self, name).drawn for name in DRAWN_STREAMS}}
+
+    def __setstate__(self, state):
+        self.__init__(state['seed'])
+        for name in DRAWN_STREAMS:
+            getattr(self, name).skip(state['drawn'].get(name, 0))
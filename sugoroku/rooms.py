@@ -0,0 +1,242 @@
+# オンライン対戦の部屋
+#
+# 各プレイヤーは自分のブラウザから部屋に参加し、ゲームの正しい状態はサーバーの Room だけが持つ。
+# 操作は Room.play が部屋のロックを取って1つずつ確かめて適用するので、手番は必ず順に進む。
+# 状態が変わるたびに版（version）を1つ進め、購読しているもの（WebSocket のハブなど）に知らせる。
+# 画面は版ごとに1つだけ作る読み取り用の写し（view）を読む。
+#
+# 部屋は RoomManager が部屋IDのハッシュでシャードに分けて持つ。ロックと部屋数の上限はシャードごとなので、
+# 1つのプロセスで多数の卓を同時に扱ってもロックの取り合いが起きにくく、メモリも上限を超えない。
+# 部屋1つが持つのは席（最大4）・最新の状態とその写し・直前の操作のメッセージ・購読者（上限あり）だけで、
+# イベントの履歴はメモリに残さず GameStore に保存する。
+# イベントコード付きで作った部屋は、状態が変わるたびに tables.TableRegistry に知らせる（主催者の画面の集計用）。
+import pickle
+import secrets
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+
+from . import bots, game
+from .board import DEFAULT_CONFIG
+
+MAX_SEATS = 4
+MAX_SUBSCRIBERS = 32
+ROOM_ID_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+ROOM_ID_LENGTH = 6
+
+# 写しに含めるゲームの状態のキー（乱数は部屋だけが引く）
+VIEW_KEYS = tuple(key for key in game.GAME_KEYS if key != 'rng')
+
+
+class Room:
+    def __init__(self, room_id, host_name, store=None, event=None, tables=None):
+        self.room_id = room_id
+        self.store = store
+        self.event = event    # イベントコード（イベントの卓でなければ None）
+        self.tables = tables
+        self.seats = []       # 参加順の席 {'name', 'token', 'bot'}（0番が部屋を作った人）
+        self.state = None     # 開始後のゲームの状態
+        self.version = 0
+        self.messages = []    # 直前の操作のメッセージ（種類, 文）
+        self.updated = time.monotonic()
+        self._lock = threading.RLock()
+        self._subscribers = {}
+        self._next_subscriber = 0
+        self._view = None
+        self.host_token = self.join(host_name)
+
+    @property
+    def started(self):
+        return self.state is not None
+
+    @property
+    def finished(self):
+        return self.state is not None and self.state['game_finished']
+
+    # 席に着き、その席の合言葉（token）を返す
+    def join(self, name, bot=False):
+        with self._lock:
+            if self.started:
+                raise ValueError("ゲームはもう始まっています")
+            if len(self.seats) >= MAX_SEATS:
+                raise ValueError("席が埋まっています")
+            token = secrets.token_urlsafe(12)
+            self.seats.append({'name': f"🤖 {name}" if bot else name, 'token': token, 'bot': bot})
+            self._changed([])
+            return token
+
+    def add_bot(self, token):
+        self._check_host(token)
+        return self.join(f"コンピューター{len(self.seats) + 1}", bot=True)
+
+    # 合言葉の席の番号（観戦や知らない合言葉なら None）
+    def seat_of(self, token):
+        for i, seat in enumerate(self.seats):
+            if token is not None and seat['token'] == token:
+                return i
+        return None
+
+    def _check_host(self, token):
+        if self.seat_of(token) != 0:
+            raise ValueError("部屋を作った人だけができる操作です")
+
+    # ゲームを始める（部屋を作った人だけ）
+    def start(self, token, seed=None, board_config=DEFAULT_CONFIG):
+        with self._lock:
+            self._check_host(token)
+            if self.started:
+                raise ValueError("ゲームはもう始まっています")
+            if len(self.seats) < 2:
+                raise ValueError("2人以上そろってから始めてください")
+            self.state = game.new_game(
+                uuid.uuid4().hex, [seat['name'] for seat in self.seats], seed,
+                [i for i, seat in enumerate(self.seats) if seat['bot']], board_config)
+            if self.store is not None:
+                self.store.create_game(self.state)
+            self._changed(self._run_bots())
+
+    # 席 token の操作を確かめて適用し、メッセージを返す（手番でない・今はできない操作なら ValueError）
+    def play(self, token, kind, **decision):
+        with self._lock:
+            if not self.started:
+                raise ValueError("ゲームはまだ始まっていません")
+            if self.seat_of(token) != self.state['current_player']:
+                raise ValueError("あなたの手番ではありません")
+            game.check_decision(self.state, kind, **decision)
+            messages = self._apply(kind, decision)
+            messages += self._run_bots()
+            self._changed(messages)
+            return messages
+
+    def _apply(self, kind, decision):
+        name = game.current_turn_player(self.state).name
+        event = game.draw_event(self.state, kind, **decision)
+        messages = game.apply_event(self.state, event)
+        if self.store is not None:
+            self.store.record(self.state, event)
+        return [(message_kind, f"{name}: {text}") for message_kind, text in messages]
+
+    # コンピューターの手番を人の手番（かゲーム終了）まで進める
+    def _run_bots(self):
+        messages = []
+        while bots.is_bot_turn(self.state):
+            kind, decision = bots.next_decision(self.state)
+            messages += self._apply(kind, decision)
+        return messages
+
+    # 版を進めて購読者に知らせる（コールバックはロックを持ったまま呼ぶので、すぐ戻ること）
+    def _changed(self, messages):
+        self.version += 1
+        self.messages = messages
+        self.updated = time.monotonic()
+        if self.event is not None and self.tables is not None and self.started:
+            self.tables.report(self.event, self.room_id, f"部屋 {self.room_id}", self.state)
+        for callback in list(self._subscribers.values()):
+            callback(self.version)
+
+    # 版が進むたびに callback(version) を呼ぶ。戻り値は購読をやめる関数
+    def subscribe(self, callback):
+        with self._lock:
+            if len(self._subscribers) >= MAX_SUBSCRIBERS:
+                raise ValueError("この部屋を見ている人が多すぎます")
+            number = self._next_subscriber
+            self._next_subscriber += 1
+            self._subscribers[number] = callback
+
+        def unsubscribe():
+            with self._lock:
+                self._subscribers.pop(number, None)
+        return unsubscribe
+
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    # 画面用の写し（版ごとに1つだけ作って全員で共有するので、読むだけにすること）
+    def view(self):
+        with self._lock:
+            if self._view is None or self._view['room_version'] != self.version:
+                view = {
+                    'room_version': self.version,
+                    'room_seats': [seat['name'] for seat in self.seats],
+                    'room_event': self.event,
+                    'action_messages': list(self.messages),
+                }
+                if self.started:
+                    state = {key: self.state[key] for key in VIEW_KEYS}
+                    view.update(pickle.loads(pickle.dumps(state, pickle.HIGHEST_PROTOCOL)))
+                self._view = view
+            return self._view
+
+    # 片付けてよい部屋か（終わったか、しばらく誰も見ず何も起きていない）
+    def evictable(self, idle_seconds, now=None):
+        if self._subscribers:
+            return False
+        now = time.monotonic() if now is None else now
+        return self.finished or now - self.updated > idle_seconds
+
+
+class _Shard:
+    __slots__ = ('lock', 'rooms')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rooms = OrderedDict()   # 部屋ID → Room（最近使った順）
+
+
+# 部屋の一覧（部屋IDのハッシュでシャードに分け、シャードごとに部屋数の上限を持つ）
+class RoomManager:
+    def __init__(self, shards=16, rooms_per_shard=64, idle_seconds=3600, store=None, tables=None):
+        self.rooms_per_shard = rooms_per_shard
+        self.idle_seconds = idle_seconds
+        self.store = store
+        self.tables = tables
+        self._shards = [_Shard() for _ in range(shards)]
+
+    def _shard(self, room_id):
+        return self._shards[zlib.crc32(room_id.encode('utf-8')) % len(self._shards)]
+
+    # 部屋を作り、(部屋, 作った人の合言葉) を返す（event はイベントコード）
+    # 部屋IDが入るシャードが満杯なら別のIDで試し、どこにも入らなければ ValueError
+    def create_room(self, host_name, event=None):
+        for _ in range(4 * len(self._shards)):
+            room_id = "".join(secrets.choice(ROOM_ID_ALPHABET) for _ in range(ROOM_ID_LENGTH))
+            shard = self._shard(room_id)
+            with shard.lock:
+                if room_id in shard.rooms or not self._make_space(shard):
+                    continue
+                room = Room(room_id, host_name, self.store, event, self.tables)
+                shard.rooms[room_id] = room
+                return room, room.host_token
+        raise ValueError("部屋の数が上限に達しています。しばらくしてからお試しください")
+
+    def get(self, room_id):
+        room_id = room_id.strip().upper()
+        shard = self._shard(room_id)
+        with shard.lock:
+            room = shard.rooms.get(room_id)
+            if room is not None:
+                shard.rooms.move_to_end(room_id)
+            return room
+
+    # シャードに空きを作る（満杯なら使われていない部屋を古い順に1つ片付ける。片付けられなければ False）
+    def _make_space(self, shard):
+        if len(shard.rooms) < self.rooms_per_shard:
+            return True
+        now = time.monotonic()
+        for room_id, room in shard.rooms.items():
+            if room.evictable(self.idle_seconds, now):
+                del shard.rooms[room_id]
+                return True
+        return False
+
+    def __len__(self):
+        return sum(len(shard.rooms) for shard in self._shards)
+
+    def rooms(self):
+        rooms = []
+        for shard in self._shards:
+            with shard.lock:
+                rooms.extend(shard.rooms.values())
+        return rooms
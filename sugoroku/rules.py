@@ -0,0 +1,31 @@
+# ゲームルールの定義（Streamlitに依存しない）
+#
+# マスの種類・イベントの表・金額の範囲・ボーナスの額はルールファイル（既定は rules.json）から読み込む。
+# 環境変数 SUGOROKU_RULES に別のファイル（.json か .toml）を指定すると、そのルールで遊べる。
+import os
+
+from .ruleset import DEFAULT_RULES_PATH, load_rules
+
+# ボードとターン
+BOARD_SIZE = 72
+BOARD_COLS = 12  # 表示は蛇行パターン（6行×12列）
+NUM_TURNS = 12
+INITIAL_CASH = 5000
+
+# マスのルール（読み込み時に選択の表と効果の振り分けを作っておく）
+RULES = load_rules(os.environ.get('SUGOROKU_RULES') or DEFAULT_RULES_PATH)
+
+# マスの種類と表示（ルールファイルの順）
+MASS_TYPES = {key: rule.display() for key, rule in RULES.masses.items()}
+
+# 確実に配置するマスの数
+MASS_MINIMUMS = RULES.minimums()
+
+# 投資できる資産の種類（すべての投資マスの分）
+INVESTMENT_TYPES = RULES.investment_types
+
+# プレイヤーの色と絵文字
+PLAYER_COLORS = ['🔴', '🔵', '🟢', '🟡']
+
+# ローソク足
+NUM_CANDLES = 50
@@ -0,0 +1,171 @@
+# マスのルール表の読み込みと、読み込み時の下ごしらえ
+#
+# マスの種類・イベントの表・金額の範囲・ボーナスの額は JSON（または TOML）のルールファイルに書く。
+# 各マスは効果の種類（effect）と、その効果が使う値を持つ。
+#   none        何も起こらない
+#   revenue     events から1つ選び、その範囲の金額を収益にする
+#   expense     events から1つ選び、その範囲の金額を費用にする
+#   debt        amount の範囲の金額を借りる（reason は取引履歴の理由）
+#   investment  assets から1つ選び、amount の範囲の金額で投資を提案する
+#   bonus       ボトルフリップ1回の成功につき payout
+# 効果の種類を組み合わせれば、コードを変えずに新しいマスを足せる。
+# events の各項目には weight（省略すると 1）を付けられ、選ぶときは読み込み時に作った
+# エイリアス法の表を一様乱数1つで引く（重みがすべて同じなら choice と同じ値になる）。
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+
+EFFECTS = ('none', 'revenue', 'expense', 'debt', 'investment', 'bonus')
+
+DEFAULT_RULES_PATH = Path(__file__).with_name('rules.json')
+
+
+# 重み付きの選択（Vose のエイリアス法。1回の選択は一様乱数1つと表を1回引くだけ）
+class AliasSampler:
+    __slots__ = ('items', 'probabilities', 'prob', 'alias', 'uniform', '_prob_array', '_alias_array')
+
+    def __init__(self, items, weights):
+        weights = np.asarray(weights, dtype=np.float64)
+        if len(items) == 0 or len(items) != len(weights):
+            raise ValueError("選択肢と重みの数が合いません")
+        if (weights <= 0).any():
+            raise ValueError("重みは正の数にしてください")
+        n = len(weights)
+        self.items = list(items)
+        self.probabilities = weights / weights.sum()
+        self.uniform = bool((weights == weights[0]).all())
+
+        scaled = self.probabilities * n
+        prob = np.ones(n)
+        alias = np.arange(n)
+        # 重みがすべて同じなら表を引くまでもない（丸め誤差で別の添字に回らないよう、そのままにする）
+        small = [] if self.uniform else [i for i in range(n) if scaled[i] < 1.0]
+        large = [] if self.uniform else [i for i in range(n) if scaled[i] >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            prob[s] = scaled[s]
+            alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        self.prob = prob.tolist()
+        self.alias = alias.tolist()
+        self._prob_array = prob
+        self._alias_array = alias
+
+    # random() を持つ乱数（random モジュールや rng.UniformStream）で選んだ添字
+    def index(self, rng):
+        x = rng.random() * len(self.prob)
+        i = int(x)
+        return i if x - i < self.prob[i] else self.alias[i]
+
+    def sample(self, rng):
+        return self.items[self.index(rng)]
+
+    # numpy.random.Generator で size 個の添字をまとめて選ぶ
+    def indices(self, generator, size):
+        if self.uniform:
+            return generator.integers(0, len(self.prob), size)
+        x = generator.random(size) * len(self.prob)
+        i = x.astype(np.int64)
+        return np.where(x - i < self._prob_array[i], i, self._alias_array[i])
+
+
+# 1種類のマスのルール
+class MassRule:
+    __slots__ = ('key', 'name', 'color', 'emoji', 'weight', 'minimum', 'effect',
+                 'events', 'low', 'high', 'reason', 'amount', 'assets', 'payout')
+
+    def __init__(self, key, spec):
+        self.key = key
+        self.name = spec.get('name', key)
+        self.color = spec.get('color', '#FFFFFF')
+        self.emoji = spec.get('emoji', '⬜')
+        self.weight = spec.get('weight', 0)
+        self.minimum = spec.get('minimum', 0)
+        self.effect = spec.get('effect', 'none')
+        if self.effect not in EFFECTS:
+            raise ValueError(f"{key}: effect は {', '.join(EFFECTS)} のいずれかです（{self.effect}）")
+
+        self.events = None
+        self.low = self.high = None
+        self.reason = spec.get('reason', "")
+        self.amount = None
+        self.assets = None
+        self.payout = 0
+
+        if self.effect in ('revenue', 'expense'):
+            events = spec.get('events') or []
+            if not events:
+                raise ValueError(f"{key}: events がありません")
+            for event in events:
+                _check_range(key, event['amount'])
+            self.events = AliasSampler(
+                [(event['reason'], event['amount'][0], event['amount'][1]) for event in events],
+                [event.get('weight', 1) for event in events])
+            self.low = np.array([event['amount'][0] for event in events], dtype=np.int64)
+            self.high = np.array([event['amount'][1] for event in events], dtype=np.int64)
+        elif self.effect in ('debt', 'investment'):
+            self.amount = _check_range(key, spec.get('amount'))
+            if self.effect == 'investment':
+                self.assets = list(spec.get('assets') or [])
+                if not self.assets:
+                    raise ValueError(f"{key}: assets がありません")
+        elif self.effect == 'bonus':
+            self.payout = spec.get('payout', 0)
+
+    # 画面に出す表示（MASS_TYPES の形）
+    def display(self):
+        return {'name': self.name, 'color': self.color, 'emoji': self.emoji, 'weight': self.weight, 'effect': self.effect}
+
+
+def _check_range(key, amount):
+    if amount is None or len(amount) != 2 or amount[0] > amount[1]:
+        raise ValueError(f"{key}: amount は [下限, 上限] で指定してください（{amount}）")
+    return int(amount[0]), int(amount[1])
+
+
+# 読み込んだルール（マスの種類の順は、ボードのマスのコードの順になる）
+class RuleSet:
+    def __init__(self, spec, source=None):
+        mass_types = spec.get('mass_types') or {}
+        if not mass_types:
+            raise ValueError("mass_types がありません")
+        self.source = source
+        # ルールの中身の要約（ルールから作った表を、同じルールかどうかで使い分けるため）
+        self.digest = hashlib.sha256(json.dumps(spec, sort_keys=True, ensure_ascii=False).encode()).hexdigest()[:16]
+        self.masses = {key: MassRule(key, value) for key, value in mass_types.items()}
+        self.names = tuple(self.masses)
+
+        # 投資の資産の種類（すべての投資マスを合わせ、最初に出てきた順）
+        assets = []
+        for rule in self.masses.values():
+            for asset in rule.assets or ():
+                if asset not in assets:
+                    assets.append(asset)
+        self.investment_types = assets
+
+    def effect_of(self, mass_type):
+        return self.masses[mass_type].effect
+
+    # 効果が effects のいずれかのマスの種類
+    def keys_with(self, *effects):
+        return [key for key, rule in self.masses.items() if rule.effect in effects]
+
+    def minimums(self):
+        return {key: rule.minimum for key, rule in self.masses.items() if rule.minimum}
+
+
+# ルールファイルを読み込む（.toml は Python 3.11 以降の tomllib で読む）
+def load_rules(path=DEFAULT_RULES_PATH):
+    path = Path(path)
+    if path.suffix == '.toml':
+        import tomllib
+
+        with open(path, 'rb') as f:
+            spec = tomllib.load(f)
+    else:
+        with open(path, encoding='utf-8') as f:
+            spec = json.load(f)
+    return RuleSet(spec, str(path))
@@ -0,0 +1,232 @@
+# 多数のゲームを NumPy 配列でまとめて実行するモンテカルロシミュレーター
+#
+#   python -m sugoroku.simulator --games 1000000 --players 4
+#
+# ルールは engine.py と同じ（rules.RULES の読み込み済みの表を使用）。ゲームはチャンク単位で処理し、
+# 1チャンク内では「ターン × プレイヤー」の手番ごとに全ゲームを一括で進める。
+# 止まったマスの効果は、マスの種類ごとにその効果の種類のまとめて処理する関数に振り分ける。
+# 投資はゲームと同じく売らずに持ち続け、最後の評価額（残りのターンの分だけ値動きが進んだ足）で資産に数える。
+import argparse
+import time
+
+import numpy as np
+
+from .board import DEFAULT_CONFIG, MASS_CODES, BoardConfig, encode_board, generate_boards
+from .market import generate_candlestick_data, price_ratios
+from .portfolio import CANDLES_PER_TURN
+from .rules import NUM_TURNS, INITIAL_CASH, NUM_CANDLES, RULES
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+
+# 1本目の終値に対する candle 本目の終値の比（generate_candlestick_data と同じ値動き）
+# 手番ごとに値動きを生成する代わりに、market.py で大量に生成した値動きの
+# 分位点テーブルから逆関数法で引く
+# 保有が評価されるのは CANDLES_PER_TURN 本ごとの足だけなので、それらの足のテーブルを同じ値動きから一度に作る
+_RATIO_TABLE_SIZE = 1 << 18
+_RATIO_TABLE_BATCH = 1 << 14
+_RATIO_CANDLES = sorted({min(CANDLES_PER_TURN * k, NUM_CANDLES - 1) for k in range(1, NUM_TURNS + 1)})
+_ratio_tables = {}
+
+
+def _ratio_table(candle):
+    table = _ratio_tables.get(candle)
+    if table is None:
+        candles = _RATIO_CANDLES if candle in _RATIO_CANDLES else [candle]
+        rng = np.random.default_rng(candle if candles == [candle] else 0)
+        length = max(candles) + 1
+        tables = np.concatenate([
+            price_ratios(generate_candlestick_data(_RATIO_TABLE_BATCH, length, rng))[:, candles]
+            for _ in range(_RATIO_TABLE_SIZE // _RATIO_TABLE_BATCH)
+        ])
+        tables.sort(axis=0)
+        for i, c in enumerate(candles):
+            _ratio_tables[c] = np.ascontiguousarray(tables[:, i])
+        table = _ratio_tables[candle]
+    return table
+
+
+def _price_ratios(n, candle, rng):
+    if candle == 0:
+        return np.ones(n)
+    table = _ratio_table(candle)
+    u = rng.random(n) * (len(table) - 1)
+    lower = u.astype(np.int64)
+    return table[lower] + (table[np.minimum(lower + 1, len(table) - 1)] - table[lower]) * (u - lower)
+
+
+# 効果の種類ごとに、そのマスに止まったゲーム（hit）をまとめて処理する（p は手番のプレイヤー）
+# final_candle はこの手番に買った投資がゲームの終わりまでに進むローソク足の番号
+def _bulk_nothing(rule, p, hit, totals, buy_probability, final_candle, rng):
+    pass
+
+
+# イベントはルールの選択の表で選び、その範囲の金額を引く
+def _bulk_revenue(rule, p, hit, totals, buy_probability, final_candle, rng):
+    event = rule.events.indices(rng, hit.size)
+    amount = rng.integers(rule.low[event], rule.high[event] + 1)
+    totals['cash'][p, hit] += amount
+    totals['revenue'][p, hit] += amount
+
+
+def _bulk_expense(rule, p, hit, totals, buy_probability, final_candle, rng):
+    event = rule.events.indices(rng, hit.size)
+    amount = rng.integers(rule.low[event], rule.high[event] + 1)
+    totals['cash'][p, hit] -= amount
+    totals['expenses'][p, hit] += amount
+
+
+def _bulk_debt(rule, p, hit, totals, buy_probability, final_candle, rng):
+    amount = rng.integers(rule.amount[0], rule.amount[1] + 1, hit.size)
+    totals['cash'][p, hit] += amount
+    totals['debt'][p, hit] += amount
+
+
+# 購入して最後まで持ち続ける（資産は final_candle 本目の終値での評価額）
+def _bulk_investment(rule, p, hit, totals, buy_probability, final_candle, rng):
+    cash = totals['cash']
+    amount = rng.integers(rule.amount[0], rule.amount[1] + 1, hit.size)
+    buy = (cash[p, hit] >= amount) & (rng.random(hit.size) < buy_probability)
+    hit, amount = hit[buy], amount[buy]
+    if hit.size:
+        cash[p, hit] -= amount
+        totals['assets'][p, hit] += (amount * _price_ratios(hit.size, final_candle, rng)).astype(np.int64)
+        totals['cf_investment'][p, hit] -= amount
+
+
+# サイコロの目の回数だけボトルフリップ
+def _bulk_bonus(rule, p, hit, totals, buy_probability, final_candle, rng):
+    flips = rng.integers(1, 7, hit.size)
+    bonus = rng.binomial(flips, 0.5) * rule.payout
+    totals['cash'][p, hit] += bonus
+    totals['revenue'][p, hit] += bonus
+
+
+_BULK_EFFECTS = {
+    'none': _bulk_nothing,
+    'revenue': _bulk_revenue,
+    'expense': _bulk_expense,
+    'debt': _bulk_debt,
+    'investment': _bulk_investment,
+    'bonus': _bulk_bonus,
+}
+
+# 効果のあるマスの (コード, ルール)（コードの順に処理する）
+_RULES_BY_CODE = [(MASS_CODES[key], rule) for key, rule in RULES.masses.items() if rule.effect != 'none']
+
+
+# 1チャンク分のゲームを実行
+def _simulate_chunk(n, num_players, board, config, buy_probability, rng):
+    if board is None:
+        board_size = config.size
+        boards = generate_boards(n, config, rng)
+    else:
+        board_size = len(board)
+        boards = np.broadcast_to(encode_board(board), (n, board_size))
+    boards = boards.ravel()
+    offsets = np.arange(n, dtype=np.int64) * board_size
+
+    # 手番ごとに1行を連続領域で扱えるよう (num_players, n) で持つ
+    shape = (num_players, n)
+    position_dtype = np.min_scalar_type(-(board_size + 6))
+    position = np.zeros(shape, dtype=position_dtype)
+    totals = {
+        'cash': np.full(shape, INITIAL_CASH, dtype=np.int64),
+        'debt': np.zeros(shape, dtype=np.int64),
+        'assets': np.zeros(shape, dtype=np.int64),
+        'revenue': np.zeros(shape, dtype=np.int64),
+        'expenses': np.zeros(shape, dtype=np.int64),
+        'cf_investment': np.zeros(shape, dtype=np.int64),
+    }
+
+    for turn in range(NUM_TURNS):
+        # このターンに買った投資は、残りのターンの終わりごとに CANDLES_PER_TURN 本ずつ進む
+        final_candle = min(CANDLES_PER_TURN * (NUM_TURNS - turn), NUM_CANDLES - 1)
+        for p in range(num_players):
+            pos = position[p]
+            pos += rng.integers(1, 7, n, dtype=position_dtype)
+            pos[pos >= board_size] -= board_size
+            mass = boards[offsets + pos]
+
+            # 止まったマスの種類ごとにゲームを振り分ける
+            order = np.argsort(mass, kind='stable')
+            bounds = np.concatenate(([0], np.cumsum(np.bincount(mass, minlength=len(MASS_CODES)))))
+            for code, rule in _RULES_BY_CODE:
+                hit = order[bounds[code]:bounds[code + 1]]
+                if hit.size:
+                    _BULK_EFFECTS[rule.effect](rule, p, hit, totals, buy_probability, final_candle, rng)
+
+    cash, debt, assets = totals['cash'], totals['debt'], totals['assets']
+    revenue, expenses = totals['revenue'], totals['expenses']
+    return {
+        'cash': cash.T,
+        'debt': debt.T,
+        'assets': assets.T,
+        'revenue': revenue.T,
+        'expenses': expenses.T,
+        'cf_operations': (revenue - expenses).T,
+        'cf_investment': totals['cf_investment'].T,
+        'cf_financing': debt.T,
+        'equity': (cash + assets - debt).T,
+    }
+
+
+# n_games ゲームを実行し、各指標を (n_games, num_players) の配列で返す
+#   board: 全ゲームで共通のボード（None ならゲームごとに config で生成）
+#   buy_probability: 投資マスで購入する確率（買った投資は最後まで持ち続ける）
+def simulate(n_games, num_players=4, board=None, buy_probability=1.0,
+             seed=None, chunk_size=DEFAULT_CHUNK_SIZE, config=DEFAULT_CONFIG):
+    rng = np.random.default_rng(seed)
+    chunks = []
+    for start in range(0, n_games, chunk_size):
+        n = min(chunk_size, n_games - start)
+        chunks.append(_simulate_chunk(n, num_players, board, config, buy_probability, rng))
+
+    return {key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0]}
+
+
+# 結果の集計（席ごとの勝率と純資産の分布）
+def summarize(result):
+    equity = result['equity']
+    n_games, num_players = equity.shape
+    winners = np.argmax(equity, axis=1)
+    wins = np.bincount(winners, minlength=num_players)
+
+    return {
+        'games': n_games,
+        'win_rate': (wins / n_games).tolist(),
+        'equity_mean': equity.mean(axis=0).tolist(),
+        'equity_std': equity.std(axis=0).tolist(),
+        'equity_percentiles': {
+            q: np.percentile(equity, q).item() for q in (1, 5, 25, 50, 75, 95, 99)
+        },
+        'bankrupt_rate': (equity < 0).mean().item(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="年間収益勝ち組ゲームのモンテカルロシミュレーション")
+    parser.add_argument('--games', type=int, default=100_000)
+    parser.add_argument('--players', type=int, default=4, choices=[2, 3, 4])
+    parser.add_argument('--buy-probability', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--board-size', type=int, default=DEFAULT_CONFIG.size)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    result = simulate(args.games, args.players, buy_probability=args.buy_probability,
+                      seed=args.seed, config=BoardConfig(args.board_size))
+    elapsed = time.perf_counter() - start
+
+    summary = summarize(result)
+    print(f"{summary['games']:,} ゲーム / {elapsed:.2f} 秒")
+    for p in range(args.players):
+        print(f"  プレイヤー{p + 1}: 勝率 {summary['win_rate'][p]:.3%}  "
+              f"平均純資産 {summary['equity_mean'][p]:,.0f}円 (σ {summary['equity_std'][p]:,.0f})")
+    for q, value in summary['equity_percentiles'].items():
+        print(f"  純資産 {q:>2}パーセンタイル: {value:,.0f}円")
+    print(f"  債務超過率: {summary['bankrupt_rate']:.3%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+# ゲームの保存と再開（SQLite）
+#
+# ゲームごとにイベントを追記していき、ターン終了ごとに状態全体のスナップショットを保存する。
+# 再開するときは最新のスナップショットを読み、それ以降のイベントを game.replay_event で適用し直す。
+# 書き込みは専用のスレッドがまとめて1トランザクションで行うので、再実行（rerun）は待たされない。
+# WAL モードなので、書き込み中でも他のプロセスから同じファイルを読んでゲームを再開できる。
+# 操作を元に戻したときは、それより後のイベントとスナップショットを消し、ゲームの revision を1つ進める
+# （観戦中の画面は revision が変わったら読み直す）。
+# 観戦には、ゲームIDから作った別の観戦ID（watch_id）を使う。ゲームIDはゲームを再開して操作できる合言葉なので、
+# 観戦用の URL や一覧には出さない。観戦IDからゲームIDは求められない。
+# 同じゲームの同じ seq のイベントとスナップショットは上書きしない（同じゲームを2つのセッションで進めても、
+# 先に書いた方が残り、後から書いた方は記録されない）。
+import atexit
+import hashlib
+import json
+import logging
+import pickle
+import queue
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from .game import game_state, replay_event, upgrade_state
+
+_log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    game_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    finished INTEGER NOT NULL DEFAULT 0,
+    revision INTEGER NOT NULL DEFAULT 0,
+    watch_id TEXT
+);
+CREATE TABLE IF NOT EXISTS events (
+    game_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (game_id, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS snapshots (
+    game_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    state BLOB NOT NULL,
+    PRIMARY KEY (game_id, seq)
+) WITHOUT ROWID;
+"""
+
+# スナップショットを保存するイベント
+SNAPSHOT_KINDS = frozenset({'end_turn'})
+
+
+# イベントの中の NumPy の値（ローソク足など）を JSON にする
+def _json_default(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} は JSON にできません")
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+# revision の列がない以前のファイルに列を足す（別のプロセスが先に足していれば何もしない）
+def _add_revision_column(conn):
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(games)")}
+    if 'revision' in columns:
+        return
+    try:
+        conn.execute("ALTER TABLE games ADD COLUMN revision INTEGER NOT NULL DEFAULT 0")
+    except sqlite3.OperationalError:
+        pass
+
+
+# 観戦ID（ゲームIDから求める。観戦IDからゲームIDは求められない）
+def watch_id(game_id):
+    return hashlib.sha256(f"watch:{game_id}".encode()).hexdigest()[:32]
+
+
+# watch_id の列がない以前のファイルに列と索引を足し、観戦IDのないゲームに観戦IDを入れる
+def _add_watch_column(conn):
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(games)")}
+    if 'watch_id' not in columns:
+        try:
+            conn.execute("ALTER TABLE games ADD COLUMN watch_id TEXT")
+        except sqlite3.OperationalError:
+            pass
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS games_watch_id ON games (watch_id)")
+    rows = conn.execute("SELECT game_id FROM games WHERE watch_id IS NULL").fetchall()
+    conn.executemany("UPDATE games SET watch_id = ? WHERE game_id = ?", [(watch_id(game_id), game_id) for game_id, in rows])
+
+
+class GameStore:
+    def __init__(self, path, batch_size=256, flush_interval=0.05):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        with _connect(path) as conn:
+            conn.executescript(SCHEMA)
+            _add_revision_column(conn)
+            _add_watch_column(conn)
+        conn.close()
+
+        self._queue = queue.Queue()
+        self._local = threading.local()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="sugoroku-store", daemon=True)
+        self._writer.start()
+
+    # 新しいゲームを登録し、最初のスナップショットを保存する
+    def create_game(self, state):
+        now = time.time()
+        self._queue.put((
+            "INSERT OR IGNORE INTO games (game_id, watch_id, created_at, updated_at) VALUES (?, ?, ?, ?)",
+            (state['game_id'], watch_id(state['game_id']), now, now),
+        ))
+        self.save_snapshot(state)
+
+    # 適用済みのイベントを追記する（state は適用後の状態）
+    # ターン終了ではスナップショットも保存する（同じ seq のイベントがすでにあれば記録しない）
+    def record(self, state, event):
+        game_id = state['game_id']
+        payload = {key: value for key, value in event.items() if key != 'kind'}
+        self._queue.put((
+            "INSERT INTO events (game_id, seq, kind, payload) VALUES (?, ?, ?, ?)",
+            (game_id, state['event_seq'], event['kind'], json.dumps(payload, default=_json_default)),
+        ))
+        if event['kind'] in SNAPSHOT_KINDS:
+            self.save_snapshot(state)
+        self._queue.put((
+            "UPDATE games SET updated_at = ?, finished = ? WHERE game_id = ?",
+            (time.time(), int(state['game_finished']), game_id),
+        ))
+
+    # 元に戻したとき、seq より後のイベントとスナップショットを消す（state は戻した後の状態）
+    def truncate(self, state):
+        game_id = state['game_id']
+        seq = state['event_seq']
+        self._queue.put(("DELETE FROM events WHERE game_id = ? AND seq > ?", (game_id, seq)))
+        self._queue.put(("DELETE FROM snapshots WHERE game_id = ? AND seq > ?", (game_id, seq)))
+        self._queue.put((
+            "UPDATE games SET updated_at = ?, finished = ?, revision = revision + 1 WHERE game_id = ?",
+            (time.time(), int(state['game_finished']), game_id),
+        ))
+
+    # 観戦IDのゲームID（見つからなければ None）
+    def game_of(self, watch, flush=True):
+        if flush:
+            self.flush()
+        row = self._reader().execute("SELECT game_id FROM games WHERE watch_id = ?", (watch,)).fetchone()
+        return None if row is None else row[0]
+
+    # ゲームの revision（元に戻すたびに進む。見つからなければ None）
+    def revision(self, game_id, flush=True):
+        if flush:
+            self.flush()
+        row = self._reader().execute("SELECT revision FROM games WHERE game_id = ?", (game_id,)).fetchone()
+        return None if row is None else row[0]
+
+    # 状態はこの時点で pickle する（この後プレイヤーのオブジェクトが書き換わっても影響しない）
+    def save_snapshot(self, state):
+        blob = pickle.dumps(game_state(state), protocol=pickle.HIGHEST_PROTOCOL)
+        self._queue.put((
+            "INSERT INTO snapshots (game_id, seq, state) VALUES (?, ?, ?)",
+            (state['game_id'], state['event_seq'], blob),
+        ))
+
+    # ゲームを再開する（見つからなければ None）
+    # until を渡すと、その seq のイベントを適用した直後の状態を、それ以前で最も新しいスナップショットから作る
+    # flush=False なら書き込み待ちを待たずに、コミット済みの分だけを読む（観戦など、少し遅れてよい読み込み用）
+    def load(self, game_id, until=None, flush=True):
+        if flush:
+            self.flush()
+        conn = self._reader()
+        if until is None:
+            row = conn.execute(
+                "SELECT seq, state FROM snapshots WHERE game_id = ? ORDER BY seq DESC LIMIT 1",
+                (game_id,),
+            ).fetchone()
+        else:
+            row = conn.execute(
+                "SELECT seq, state FROM snapshots WHERE game_id = ? AND seq <= ? ORDER BY seq DESC LIMIT 1",
+                (game_id, until),
+            ).fetchone()
+        if row is None:
+            return None
+
+        seq, blob = row
+        state = upgrade_state(pickle.loads(blob))
+        for event_seq, kind, payload in self.events(game_id, seq, until, flush=False):
+            event = dict(payload, kind=kind)
+            replay_event(state, event)
+            if state['event_seq'] != event_seq:
+                raise ValueError(f"ゲーム {game_id} のイベントが欠けています（{state['event_seq']} ≠ {event_seq}）")
+        return state
+
+    # 1ゲーム分のイベントを順に返す（seq, kind, payload）。until を渡すとその seq まで
+    def events(self, game_id, after=0, until=None, flush=True):
+        if flush:
+            self.flush()
+        sql = "SELECT seq, kind, payload FROM events WHERE game_id = ? AND seq > ?"
+        params = (game_id, after)
+        if until is not None:
+            sql += " AND seq <= ?"
+            params += (until,)
+        rows = self._reader().execute(sql + " ORDER BY seq", params)
+        return [(seq, kind, json.loads(payload)) for seq, kind, payload in rows]
+
+    # 新しい順にゲームの一覧を返す（game_id, updated_at, finished）
+    def list_games(self, limit=20, finished=None):
+        self.flush()
+        sql = "SELECT game_id, updated_at, finished FROM games"
+        params = ()
+        if finished is not None:
+            sql += " WHERE finished = ?"
+            params = (int(finished),)
+        sql += " ORDER BY updated_at DESC LIMIT ?"
+        return self._reader().execute(sql, params + (limit,)).fetchall()
+
+    # 書き込み待ちがなくなるまで待つ
+    def flush(self):
+        if not self._closed:
+            self._queue.join()
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+
+    # 読み込み用の接続はスレッドごとに持つ
+    def _reader(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = _connect(self.path)
+        return conn
+
+    # 溜まった書き込みを batch_size 件か flush_interval 秒ごとにまとめてコミットする
+    def _write_loop(self):
+        conn = _connect(self.path)
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while item is not None and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                batch.append(item)
+
+            writes = [entry for entry in batch if entry is not None]
+            stop = len(writes) < len(batch)
+            try:
+                with conn:
+                    for sql, params in writes:
+                        try:
+                            conn.execute(sql, params)
+                        except sqlite3.IntegrityError:
+                            # 同じ seq がすでにある（別のセッションが同じゲームを進めた）。上書きせずに捨てる
+                            _log.warning("ゲーム %s の seq %s はすでに保存されているので記録しません", params[0], params[1])
+            except sqlite3.Error:
+                _log.exception("ゲームの保存に失敗しました（%d 件）", len(writes))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        conn.close()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+# プロセスで1つの GameStore をファイルごとに共有する
+def open_store(path):
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = GameStore(path)
+            atexit.register(store.close)
+        return store
+
+
+# 開いている GameStore の書き込みを終わらせて閉じる
+def close_stores():
+    with _stores_lock:
+        stores = list(_stores.values())
+        _stores.clear()
+    for store in stores:
+        store.close()
@@ -0,0 +1,148 @@
+# イベント（研修などで多数の卓を同時に遊ぶ会）の卓の一覧と、全体の順位表
+#
+# 卓はホットシートのゲームかオンライン対戦の部屋で、同じイベントコードを入れた卓が1つのイベントになる。
+# 卓は操作のたびに report で状態を知らせ、Event は純資産が変わったプレイヤーの分だけ順位表
+# （leaderboard.Leaderboard）を更新する。全員を並べ直すことはないので、卓やプレイヤーが多くても
+# 1回の報告は O(席の数 × log プレイヤー数) で、主催者の画面は見ているページの分だけを読む。
+# ロックはイベントごとなので、別のイベントの卓どうしが待たされることはない。
+# プロセスのメモリだけに持ち、サーバーを再起動したら卓の次の報告から作り直す。
+import threading
+import time
+from collections import OrderedDict
+
+from .leaderboard import Leaderboard
+
+MAX_EVENTS = 64          # プロセスで持つイベントの数（超えたら最近報告のないものから捨てる）
+MAX_TABLES = 2000        # 1つのイベントの卓の数
+
+
+# 卓の要約（報告のたびに作り直して差し替えるので、読むだけにすること）
+class Table:
+    __slots__ = ('table_id', 'label', 'names', 'equities', 'turn', 'current_player', 'finished', 'updated')
+
+    def __init__(self, table_id, label, state, updated):
+        self.table_id = table_id
+        self.label = label
+        self.names = [player.name for player in state['players']]
+        self.equities = [player.get_equity() for player in state['players']]
+        self.turn = state['turn']
+        self.current_player = state['current_player']
+        self.finished = state['game_finished']
+        self.updated = updated
+
+
+class Event:
+    def __init__(self, code):
+        self.code = code
+        self.tables = OrderedDict()   # 卓ID → Table（最初に報告した順）
+        self.leaderboard = Leaderboard()   # (卓ID, 席) → 純資産
+        self.version = 0              # 卓の状態が変わるたびに進む
+        self.finished_count = 0
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    # 卓の状態を取り込む（卓が上限に達していて新しい卓なら False）
+    def report(self, table_id, label, state):
+        now = time.monotonic()
+        table = Table(table_id, label, state, now)
+        with self._lock:
+            old = self.tables.get(table_id)
+            if old is None and len(self.tables) >= MAX_TABLES:
+                return False
+            for seat, equity in enumerate(table.equities):
+                self.leaderboard.update((table_id, seat), equity)
+            if old is not None:
+                # 席の数が変わることはないが、念のため減った席は順位表から外す
+                for seat in range(len(table.equities), len(old.equities)):
+                    self.leaderboard.discard((table_id, seat))
+                self.finished_count -= old.finished
+            self.finished_count += table.finished
+            self.tables[table_id] = table
+            self.version += 1
+            self.updated = now
+            return True
+
+    def remove(self, table_id):
+        with self._lock:
+            table = self.tables.pop(table_id, None)
+            if table is None:
+                return
+            for seat in range(len(table.equities)):
+                self.leaderboard.discard((table_id, seat))
+            self.finished_count -= table.finished
+            self.version += 1
+
+    # (卓の数, 終わった卓の数, プレイヤーの数)
+    def summary(self):
+        with self._lock:
+            return len(self.tables), self.finished_count, len(self.leaderboard)
+
+    # 上から start 番目〜stop 番目の手前までのプレイヤー (順位, 名前, 卓の表示名, 純資産) のリスト
+    # 同じ純資産なら同じ順位
+    def standings(self, start=0, stop=None):
+        with self._lock:
+            rows = []
+            rank = None
+            previous = None
+            for position, ((table_id, seat), equity) in enumerate(self.leaderboard.items(start, stop), start):
+                if equity != previous:
+                    rank = position + 1 if rank is not None else self.leaderboard.count_above(equity) + 1
+                    previous = equity
+                table = self.tables[table_id]
+                rows.append((rank, table.names[seat], table.label, equity))
+            return rows
+
+    # 卓の席の順位（まだ報告がなければ None）
+    def rank_of(self, table_id, seat):
+        with self._lock:
+            if (table_id, seat) not in self.leaderboard:
+                return None
+            return self.leaderboard.rank((table_id, seat))
+
+    # 名前に text を含むプレイヤーの (順位, 名前, 卓の表示名, 純資産) のリスト（順位の順、limit 人まで）
+    def find(self, text, limit=20):
+        with self._lock:
+            rows = []
+            for table_id, table in self.tables.items():
+                for seat, name in enumerate(table.names):
+                    if text in name:
+                        rows.append((self.leaderboard.rank((table_id, seat)), name, table.label, table.equities[seat]))
+        rows.sort(key=lambda row: row[0])
+        return rows[:limit]
+
+    # 卓の要約のリスト（最初に報告した順）
+    def table_list(self):
+        with self._lock:
+            return list(self.tables.values())
+
+
+# イベントの一覧（プロセスで1つ）
+class TableRegistry:
+    def __init__(self, max_events=MAX_EVENTS):
+        self.max_events = max_events
+        self._events = OrderedDict()   # イベントコード → Event（最近報告があった順）
+        self._lock = threading.Lock()
+
+    # イベント（なければ None。create なら作る）
+    def event(self, code, create=False):
+        code = normalize_code(code)
+        with self._lock:
+            event = self._events.get(code)
+            if event is None and create:
+                event = self._events[code] = Event(code)
+                while len(self._events) > self.max_events:
+                    self._events.popitem(last=False)
+            elif event is not None and create:
+                self._events.move_to_end(code)
+            return event
+
+    # 卓の状態を、イベント code の卓の一覧と順位表に取り込む
+    def report(self, code, table_id, label, state):
+        return self.event(code, create=True).report(table_id, label, state)
+
+    def __len__(self):
+        return len(self._events)
+
+
+def normalize_code(code):
+    return code.strip().upper()
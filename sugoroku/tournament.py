@@ -0,0 +1,212 @@
+# 戦略どうしの対戦（Streamlit なしで多数のゲームを並列に実行する）
+#
+#   python -m sugoroku.tournament bot always/hold never always/first_profit --games 100000
+#
+# 戦略は「投資するか」と「保有のどれを今売るか」の2つの関数の組で、"買い方/売り方" で指定する。
+#   買い方: always（常に買う）, never（買わない）, bot（コンピューターの表）
+#   売り方: hold（最後まで持つ）, first_profit（評価額が取得額を上回った保有を売る）, bot
+# "bot" と "never" は1語でも指定できる。"モジュール:名前" で buy / sell を持つ独自の戦略も使える。
+#
+# 席による有利不利が出ないよう、ゲームごとに席の並びを1つずつずらす。
+# ゲーム i のシードは seed と i から決まるので、ワーカー数やチャンクの大きさを変えても結果は同じ。
+import argparse
+import importlib
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from . import bots, game
+
+
+def always_buy(state):
+    return True
+
+
+def never_buy(state):
+    return False
+
+
+# 売らずに最後まで持ち続ける
+def sell_last(state):
+    return None
+
+
+# 評価額が取得額を上回った最初の保有を売る（なければ売らない）
+def sell_first_profit(state):
+    for holding in state['portfolio'].held(state['current_player']):
+        if holding.value > holding.cost:
+            return holding.holding_id
+    return None
+
+
+BUY_RULES = {
+    'always': always_buy,
+    'never': never_buy,
+    'bot': bots.choose_buy,
+}
+
+SELL_RULES = {
+    'hold': sell_last,
+    'first_profit': sell_first_profit,
+    'bot': bots.choose_sell,
+}
+
+# 1語で指定できる戦略
+SHORTHANDS = {
+    'bot': 'bot/bot',
+    'never': 'never/hold',
+}
+
+
+# 戦略の指定を (buy, sell) の関数の組にする
+def resolve_strategy(spec):
+    spec = SHORTHANDS.get(spec, spec)
+    if ':' in spec:
+        module_name, attribute = spec.split(':', 1)
+        strategy = getattr(importlib.import_module(module_name), attribute)
+        if isinstance(strategy, dict):
+            return strategy['buy'], strategy['sell']
+        return strategy.buy, strategy.sell
+
+    buy, _, sell = spec.partition('/')
+    if buy not in BUY_RULES or sell not in SELL_RULES:
+        raise ValueError(f"戦略 {spec!r} が分かりません（買い方: {', '.join(BUY_RULES)} / 売り方: {', '.join(SELL_RULES)}）")
+    return BUY_RULES[buy], SELL_RULES[sell]
+
+
+# ゲーム i のシード
+def game_seed(seed, index):
+    return seed * (1 << 32) + index
+
+
+# 1ゲームを最後まで進め、席ごとの純資産を返す
+def play_game(seed, lineup):
+    state = game.new_game(None, [f"席{i + 1}" for i in range(len(lineup))], seed)
+    while not state['game_finished']:
+        buy, sell = lineup[state['current_player']]
+        kind, decision = bots.next_decision(state, buy, sell)
+        game.apply_event(state, game.draw_event(state, kind, **decision))
+    return [player.get_equity() for player in state['players']]
+
+
+# start から count ゲーム分を実行し、戦略ごとの純資産（ゲーム順）と勝ち数を返す
+def run_chunk(specs, seed, start, count):
+    strategies = [resolve_strategy(spec) for spec in specs]
+    n = len(specs)
+    equity = np.empty((count, n), dtype=np.int64)
+    wins = np.zeros(n)
+
+    for row, index in enumerate(range(start, start + count)):
+        # 席 s には戦略 (s + index) % n が座る
+        order = [(seat + index) % n for seat in range(n)]
+        result = play_game(game_seed(seed, index), [strategies[k] for k in order])
+        for seat, k in enumerate(order):
+            equity[row, k] = result[seat]
+
+        # 同点のときは勝ちを分け合う
+        best = max(result)
+        winners = [order[seat] for seat, value in enumerate(result) if value == best]
+        for k in winners:
+            wins[k] += 1 / len(winners)
+
+    return start, equity, wins
+
+
+def _warm_up(specs):
+    if any('bot' in SHORTHANDS.get(spec, spec).split('/') for spec in specs):
+        bots.get_policy()
+
+
+# games ゲームをチャンクに分けてプロセスで並列に実行し、届いた順に集計する
+def run_tournament(specs, games, seed=0, workers=None, chunk_size=1000):
+    if not 2 <= len(specs) <= 4:
+        raise ValueError("戦略は 2〜4 個指定してください")
+    for spec in specs:
+        resolve_strategy(spec)
+
+    equity = np.empty((games, len(specs)), dtype=np.int64)
+    wins = np.zeros(len(specs))
+    chunks = [(start, min(chunk_size, games - start)) for start in range(0, games, chunk_size)]
+
+    if workers == 1:
+        _warm_up(specs)
+        results = (run_chunk(specs, seed, start, count) for start, count in chunks)
+        for start, chunk_equity, chunk_wins in results:
+            equity[start:start + len(chunk_equity)] = chunk_equity
+            wins += chunk_wins
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_warm_up, initargs=(specs,)) as pool:
+            futures = [pool.submit(run_chunk, specs, seed, start, count) for start, count in chunks]
+            for future in as_completed(futures):
+                start, chunk_equity, chunk_wins = future.result()
+                equity[start:start + len(chunk_equity)] = chunk_equity
+                wins += chunk_wins
+
+    return summarize(specs, equity, wins)
+
+
+# 勝率の 95% 信頼区間（Wilson）
+def wilson_interval(successes, n, z=1.96):
+    if n == 0:
+        return 0.0, 1.0
+    p = successes / n
+    center = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return center - half, center + half
+
+
+def summarize(specs, equity, wins):
+    games = len(equity)
+    results = []
+    for k, spec in enumerate(specs):
+        values = equity[:, k]
+        std = float(values.std(ddof=1)) if games > 1 else 0.0
+        half = 1.96 * std / math.sqrt(games) if games else 0.0
+        low, high = wilson_interval(wins[k], games)
+        results.append({
+            'strategy': spec,
+            'win_rate': wins[k] / games,
+            'win_rate_ci95': [low, high],
+            'equity_mean': float(values.mean()),
+            'equity_mean_ci95': [float(values.mean()) - half, float(values.mean()) + half],
+            'equity_std': std,
+            'equity_percentiles': {q: float(np.percentile(values, q)) for q in (5, 25, 50, 75, 95)},
+            'bankrupt_rate': float((values < 0).mean()),
+        })
+    return {'games': games, 'strategies': results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="戦略どうしの対戦（2〜4人）")
+    parser.add_argument('strategies', nargs='+', help="戦略（例: bot always/hold never always/first_profit）")
+    parser.add_argument('--games', type=int, default=10_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None, help="プロセス数（既定は CPU コア数）")
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--output', default=None, help="結果を書き出す JSON ファイル")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    report = run_tournament(args.strategies, args.games, args.seed, args.workers, args.chunk_size)
+    elapsed = time.perf_counter() - start
+
+    print(f"{report['games']:,} ゲーム / {elapsed:.1f} 秒（{args.workers or os.cpu_count()} プロセス）")
+    for result in report['strategies']:
+        low, high = result['win_rate_ci95']
+        mean_low, mean_high = result['equity_mean_ci95']
+        percentiles = result['equity_percentiles']
+        print(f"  {result['strategy']:<20} 勝率 {result['win_rate']:.2%} [{low:.2%}, {high:.2%}]  "
+              f"平均純資産 {result['equity_mean']:,.0f}円 [{mean_low:,.0f}, {mean_high:,.0f}]  "
+              f"中央値 {percentiles[50]:,.0f}円 (5%: {percentiles[5]:,.0f} / 95%: {percentiles[95]:,.0f})")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# Streamlit の画面（app.py から main() を呼ぶ）
+#
+# 画面ごとにモジュールを分け、重い依存（pandas・plotly）は使う画面になってから読み込む。
+#   session  セッション状態と、保存先・部屋の一覧・ハブ
+#   actions  操作（コールバック）と操作のあとの再実行
+#   lobby    開始画面とオンライン対戦の待合室
+#   play     ゲーム中の画面
+#   results  ゲーム終了画面（pandas・plotly）
+#   viewer   保存したゲームのリプレイと観戦
+#   dashboard  イベントの主催者の画面（複数の卓の合同の順位）
+#   charts   Plotly の図（plotly）
+import streamlit as st
+
+from .. import metrics
+from .actions import resume_game
+from .dashboard import dashboard_screen
+from .lobby import game_start_screen, room_lobby_screen, watch_room
+from .play import main_game_screen
+from .session import current_room, enter_room, get_rooms, init_session, leave_room, sync_room, warm_up_bots
+from .viewer import replay_screen
+
+# メイン処理（スクリプトの実行ごとに呼ばれる）
+def main():
+    st.set_page_config(page_title="年間収益勝ち組ゲーム", layout="wide")
+    init_session()
+    warm_up_bots()
+    metrics.setup()
+    with metrics.run('app'):
+        route()
+    if metrics.ENABLED:
+        st.session_state.metrics_last_run = metrics.last_run()
+
+# 画面の切り替え
+def route():
+    # リプレイ・観戦（?replay=観戦ID。自分のゲームの状態には触れない）
+    if 'replay' in st.query_params:
+        replay_screen(st.query_params['replay'])
+        return
+    
+    # イベントの主催者の画面（?dashboard=イベントコード）
+    if 'dashboard' in st.query_params:
+        dashboard_screen(st.query_params['dashboard'])
+        return
+    
+    # URL のゲームIDから再開（再起動・デプロイ・接続切れの後や別のサーバープロセスでも続けられる）
+    if not st.session_state.game_started and 'game' in st.query_params:
+        if not resume_game(st.query_params['game']):
+            del st.query_params['game']
+    
+    # URL の部屋IDと席の合言葉から、同じ席に戻る（再読み込みした場合など）
+    if not st.session_state.get('room_id') and 'seat' in st.query_params:
+        room = get_rooms().get(st.query_params.get('room', ""))
+        if room is not None and room.seat_of(st.query_params['seat']) is not None:
+            enter_room(room, st.query_params['seat'])
+    
+    if st.session_state.get('room_id'):
+        room = current_room()
+        if room is None:
+            leave_room()
+            st.session_state.room_error = "部屋が見つかりません（閉じられたか、サーバーが再起動しました）"
+            st.rerun()
+        sync_room(room)
+        watch_room(room)
+        if not room.started:
+            room_lobby_screen(room)
+            return
+    
+    if not st.session_state.game_started:
+        game_start_screen()
+    elif st.session_state.get('game_finished', False):
+        from .results import game_end_screen
+        game_end_screen()
+    else:
+        main_game_screen()
@@ -0,0 +1,251 @@
+# 操作（ボタンのコールバック）と、操作のあとの再実行
+import time
+
+import numpy as np
+import streamlit as st
+
+from .. import bots, game, metrics, prefetch
+from ..undo import UndoHistory
+from .session import current_room, get_store, report_table, sync_room
+
+# 保存されたゲームを読み込んでセッションに戻す（見つからなければ False）
+# URL にイベントコードと卓の名前があれば、イベントの卓として続ける
+def resume_game(game_id):
+    store = get_store()
+    state = store.load(game_id) if store is not None else None
+    if state is None:
+        return False
+    st.session_state.update(state)
+    st.session_state.action_messages = []
+    st.session_state.undo_history = UndoHistory()
+    st.session_state.event_code = st.query_params.get('event')
+    st.session_state.table_name = st.query_params.get('table')
+    st.query_params['game'] = game_id
+    run_bots()
+    report_table()
+    prefetch_market()
+    return True
+
+# 画面の各部分（フラグメント）と、それぞれが読む状態
+#   アプリ全体 : turn, game_finished（タイトル・進行バー・画面の切り替え）
+#   board      : game_id, board, current_player, 各プレイヤーの position
+#   turn_panel : current_player と手番のプレイヤーの状態, dice_rolled, last_dice, bonus_mode,
+#                investment_*, portfolio（手番のプレイヤーの保有）, action_messages
+#   sidebar    : current_player, 各プレイヤーの position / cash / 保有の評価額 / 純資産 / 利益
+# 操作はすべて turn_panel のボタンのコールバックで行い、読んでいる状態が変わった部分だけを再実行する
+def _app_state():
+    return (st.session_state.turn, st.session_state.get('game_finished', False))
+
+def _board_state():
+    return (
+        st.session_state.game_id,
+        st.session_state.current_player,
+        tuple(player.position for player in st.session_state.players),
+    )
+
+def _sidebar_state():
+    return (
+        st.session_state.current_player,
+        st.session_state.turn,
+        st.session_state.dice_rolled,
+        st.session_state.bonus_mode,
+        tuple((player.position, player.cash, sum(player.asset_values), player.get_equity(), player.get_profit())
+              for player in st.session_state.players),
+    )
+
+FRAGMENT_STATES = {
+    'board': _board_state,
+    'sidebar': _sidebar_state,
+}
+
+# update() で状態を変え、turn_panel と状態が変わったフラグメントだけを再実行する（コールバック専用）
+def rerun_changed(update):
+    app_before = _app_state()
+    before = {key: state() for key, state in FRAGMENT_STATES.items()}
+    
+    update()
+    
+    if _app_state() != app_before:
+        st.rerun()
+    changed = [key for key, state in FRAGMENT_STATES.items() if state() != before[key]]
+    st.rerun(['turn_panel'] + changed)
+
+# 操作を実行して再実行する（コールバック専用）
+def run_action(action, *args):
+    def update():
+        st.session_state.action_messages = []
+        action(*args)
+        run_bots()
+    rerun_changed(update)
+
+# ハブから部屋の更新の知らせが届いたとき（コールバック）
+# 写しを読み込み、変わった部分だけを再実行する（自分の操作の知らせなど、読み込み済みなら何もしない）
+def on_room_push():
+    room = current_room()
+    if room is None or st.session_state.get('room_version') == room.version:
+        return
+    if not st.session_state.game_started:
+        sync_room(room)
+        st.rerun()
+    rerun_changed(lambda: sync_room(room))
+
+def current_turn_player():
+    return game.current_turn_player(st.session_state)
+
+# 選択からイベントを作って適用し、保存する（乱数はゲームごとの GameRNG から引く）
+# 人の操作の前に元に戻すための手順を始め、続くコンピューターの手番のイベントも同じ手順に記録する
+# オンライン対戦では部屋に送り、部屋が適用したあとの写しを読み込む
+def play_event(kind, actor='human', **decision):
+    start = time.perf_counter()
+    room = current_room()
+    if room is not None:
+        try:
+            room.play(st.session_state.room_token, kind, **decision)
+        except ValueError as error:
+            st.session_state.action_messages = [('warning', str(error))]
+        else:
+            sync_room(room)
+        metrics.record_action(kind, time.perf_counter() - start, actor)
+        return
+    # 古い画面のボタン（売却済みの保有など）は受け付けない
+    try:
+        game.check_decision(st.session_state, kind, **decision)
+    except ValueError as error:
+        st.session_state.action_messages = [('warning', str(error))]
+        return
+    history = st.session_state.get('undo_history')
+    if history is not None and actor == 'human':
+        history.begin(st.session_state)
+    event = game.draw_event(st.session_state, kind, **decision)
+    st.session_state.action_messages.extend(game.apply_event(st.session_state, event))
+    if history is not None:
+        history.record(event)
+    store = get_store()
+    if store is not None:
+        store.record(st.session_state, event)
+    report_table()
+    prefetch_market()
+    metrics.record_action(kind, time.perf_counter() - start, actor)
+
+# ローソク足の図の JSON（plotly はここで初めて読み込む。先読みではワーカースレッドで呼ばれる）
+def candlestick_json(data):
+    from .charts import build_candlestick_figure
+    return build_candlestick_figure(data).to_json()
+
+# 購入した直後の保有の図（1本目のローソク足だけ）の JSON
+def first_candle_json(data):
+    return candlestick_json(data[:1])
+
+# 人が投資マスで購入を迷っている間に、購入したときの相場とその図の JSON を先に作っておく
+def prefetch_market():
+    state = st.session_state
+    if state.investment_pending and not bots.is_bot_turn(state) and state.get('market_prefetch') is None:
+        state.market_prefetch = prefetch.start(state, first_candle_json)
+
+# 先読みを受け取る（終わるまで待つ。別の時点のものなら捨てて None）
+def take_prefetch():
+    ready = st.session_state.pop('market_prefetch', None)
+    if ready is None:
+        return None
+    if ready.key != prefetch.state_key(st.session_state):
+        ready.discard()
+        return None
+    return ready.result()
+
+# 先読みを捨てる（実行中なら終わるのを待つので、この後は相場の系列に触れてよい）
+def discard_prefetch():
+    ready = st.session_state.pop('market_prefetch', None)
+    if ready is not None:
+        ready.discard()
+
+# コンピューターの手番を人の手番（かゲーム終了）まで続けて進める
+# 同じコールバックの中で進めるので、コンピューターの手番のために再実行は増えない
+# オンライン対戦では部屋がコンピューターの手番を進める
+def run_bots():
+    if current_room() is not None:
+        return
+    while bots.is_bot_turn(st.session_state):
+        name = current_turn_player().name
+        start = len(st.session_state.action_messages)
+        kind, decision = bots.next_decision(st.session_state)
+        play_event(kind, actor='bot', **decision)
+        st.session_state.action_messages[start:] = [
+            (message_kind, f"{name}: {text}") for message_kind, text in st.session_state.action_messages[start:]]
+
+# サイコロを振る
+def roll_dice_action():
+    play_event('roll')
+
+# ボトルフリップ
+def bonus_action():
+    play_event('bonus')
+
+# 投資資産を購入する（先読みした相場と図があれば、それを使う）
+# 買えたら、その保有の値動きを表示する
+def buy_action():
+    ready = take_prefetch()
+    next_id = st.session_state.portfolio.next_id
+    play_event('buy')
+    portfolio = st.session_state.portfolio
+    if portfolio.next_id == next_id:
+        return
+    holding_id = portfolio.latest(st.session_state.current_player)
+    st.session_state.holding_chart = holding_id
+    if ready is not None and np.array_equal(ready[0][:1], portfolio.history(holding_id)):
+        st.session_state.candlestick_figure = (st.session_state.game_id, holding_id, 0, ready[1])
+
+# 投資を見送る（先読みは捨てる）
+def skip_action():
+    discard_prefetch()
+    play_event('skip')
+
+# 保有を今の評価額で売却する
+def sell_action(holding_id):
+    play_event('sell', holding_id=holding_id)
+
+# ターン終了
+def end_turn_action():
+    play_event('end_turn')
+
+# 元に戻す / やり直すボタンに出す、手順の最初の操作の名前
+UNDO_LABELS = {
+    'roll': "サイコロ",
+    'bonus': "ボトルフリップ",
+    'buy': "投資の購入",
+    'skip': "投資の見送り",
+    'sell': "売却",
+    'end_turn': "ターン終了",
+}
+
+# 最後の操作（と、それに続くコンピューターの手番）を取り消す（ホットシートのゲームだけ）
+# 保存したイベントも取り消した分を消す
+def undo_action():
+    history = st.session_state.get('undo_history')
+    if history is None or not history.can_undo():
+        return
+    discard_prefetch()
+    kind = history.undo_kind()
+    history.undo(st.session_state)
+    store = get_store()
+    if store is not None:
+        store.truncate(st.session_state)
+    # 取り消した後に買うと同じ保有の番号になるので、図は作り直す
+    st.session_state.pop('candlestick_figure', None)
+    st.session_state.action_messages = [('info', f"↩️ {UNDO_LABELS[kind]}を取り消しました")]
+    report_table()
+    prefetch_market()
+
+# 取り消した操作をやり直す（記録したイベントを適用し直すので、サイコロの目なども同じになる）
+def redo_action():
+    history = st.session_state.get('undo_history')
+    if history is None or not history.can_redo():
+        return
+    discard_prefetch()
+    kind = history.redo_kind()
+    store = get_store()
+    applied = (lambda event: store.record(st.session_state, event)) if store is not None else None
+    messages = history.redo(st.session_state, applied)
+    st.session_state.pop('candlestick_figure', None)
+    st.session_state.action_messages = [('info', f"↪️ {UNDO_LABELS[kind]}をやり直しました")] + messages
+    report_table()
+    prefetch_market()
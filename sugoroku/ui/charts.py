@@ -0,0 +1,68 @@
+# Plotly の図（plotly は重いので、このモジュールは図が必要になったときに読み込む）
+import plotly.graph_objects as go
+
+from ..market import OPEN, HIGH, LOW, CLOSE
+
+# ローソク足チャート（全ローソク足を含む図）
+def build_candlestick_figure(data):
+    fig = go.Figure(data=go.Candlestick(
+        x=list(range(len(data))),
+        open=data[:, OPEN].tolist(),
+        high=data[:, HIGH].tolist(),
+        low=data[:, LOW].tolist(),
+        close=data[:, CLOSE].tolist()
+    ))
+    
+    fig.update_layout(
+        title="投資資産価値チャート",
+        xaxis_title="ローソク足番号",
+        yaxis_title="価格",
+        width=800,
+        height=400,
+        xaxis_rangeslider_visible=False
+    )
+    
+    return fig
+
+# 終了したゲームの分析の図（純資産・現金の推移、理由ごとの収益と費用、区分ごとのCF、投資の利回り）
+def build_analytics_figures(result):
+    names = result['names']
+    figures = {}
+
+    fig = go.Figure()
+    for i, name in enumerate(names):
+        fig.add_trace(go.Scatter(x=result['equity'].index.tolist(), y=result['equity'][i].tolist(),
+                                 mode='lines+markers', name=f"{name} 純資産", legendgroup=name))
+        fig.add_trace(go.Scatter(x=result['cash'].index.tolist(), y=result['cash'][i].tolist(),
+                                 mode='lines', line={'dash': 'dot'}, name=f"{name} 現金", legendgroup=name))
+    fig.update_layout(title="ターンごとの純資産と現金", xaxis_title="ターン", yaxis_title="円", height=400)
+    figures['curves'] = fig
+
+    pl = result['pl']
+    fig = go.Figure()
+    for i, name in enumerate(names):
+        rows = pl[pl['player'] == i]
+        fig.add_trace(go.Bar(x=rows['amount'].tolist(), y=rows['reason'].tolist(), orientation='h', name=name))
+    fig.update_layout(title="理由ごとの収益と費用", barmode='relative', xaxis_title="円",
+                      height=max(300, 24 * pl['reason'].nunique() + 120))
+    figures['pl'] = fig
+
+    cash_flow = result['cash_flow']
+    fig = go.Figure()
+    for i, name in enumerate(names):
+        fig.add_trace(go.Bar(x=cash_flow.columns.tolist(), y=cash_flow.loc[i].tolist(), name=name))
+    fig.update_layout(title="キャッシュフローの区分ごとの合計", barmode='group', yaxis_title="円", height=350)
+    figures['cash_flow'] = fig
+
+    investments = result['investments']
+    fig = go.Figure()
+    for i, name in enumerate(names):
+        rows = investments[investments['player'] == i]
+        # 売らずに持っていた保有は白抜きの印（評価額での利回り）
+        fig.add_trace(go.Scatter(x=rows['turn'].tolist(), y=(rows['roi'] * 100).tolist(), mode='markers',
+                                 marker={'size': 10, 'symbol': ['circle-open' if held else 'circle' for held in rows['open']]},
+                                 name=name, text=rows['asset'].tolist()))
+    fig.update_layout(title="投資ごとの利回り（白抜きは保有中の評価額）", xaxis_title="ターン", yaxis_title="利回り（%）", height=350)
+    figures['roi'] = fig
+
+    return figures
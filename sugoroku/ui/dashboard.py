@@ -0,0 +1,85 @@
+# イベントの主催者の画面（?dashboard=イベントコード）
+#
+# 同じイベントコードの卓をまとめて、全体の順位表と卓ごとの進み具合を数秒ごとに表示する。
+# 順位表は卓の報告のたびに少しずつ更新されているので、画面は見ているページの分だけを読む。
+import math
+import time
+
+import streamlit as st
+
+from ..rules import NUM_TURNS, PLAYER_COLORS
+from ..tables import normalize_code
+from .session import get_tables
+
+PAGE_SIZE = 20
+
+# 主催者の画面を開く / 閉じる
+def open_dashboard(code):
+    st.query_params['dashboard'] = code
+
+def close_dashboard():
+    del st.query_params['dashboard']
+    for key in ('dashboard_page', 'dashboard_search'):
+        st.session_state.pop(key, None)
+
+# 主催者の画面
+def dashboard_screen(code):
+    code = normalize_code(code)
+    st.title("📊 イベントの集計")
+    st.caption(f"イベントコード: {code}（各卓の開始画面の「🏆 イベントに参加する」でこのコードを入れてもらいます）")
+    dashboard_fragment(code)
+    st.write("---")
+    st.button("🏠 戻る", on_click=close_dashboard)
+
+# 集計（数秒ごとに読み直す。ページの切り替えや検索もこの部分だけを再実行する）
+@st.fragment(run_every="2s")
+def dashboard_fragment(code):
+    event = get_tables().event(code)
+    if event is None:
+        st.info("まだこのイベントの卓はありません。卓がゲームを始めると表示されます。")
+        return
+
+    tables, finished, players = event.summary()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("卓", tables)
+    col2.metric("プレイ中", tables - finished)
+    col3.metric("終了", finished)
+    col4.metric("プレイヤー", players)
+
+    st.subheader("🏆 全体の順位")
+    pages = max(1, math.ceil(players / PAGE_SIZE))
+    if st.session_state.get('dashboard_page', 1) > pages:
+        st.session_state.dashboard_page = pages
+    page = st.number_input(f"ページ（全 {pages} ページ）", min_value=1, max_value=pages, key='dashboard_page')
+    search = st.text_input("名前で探す", key='dashboard_search').strip()
+    rows = event.find(search) if search else event.standings((page - 1) * PAGE_SIZE, page * PAGE_SIZE)
+    display_standings(rows)
+
+    st.subheader("🎲 卓の一覧")
+    display_tables(event.table_list())
+
+def display_standings(rows):
+    if not rows:
+        st.caption("該当するプレイヤーはいません")
+        return
+    lines = ["| 順位 | 名前 | 卓 | 純資産 |", "|---:|---|---|---:|"]
+    for rank, name, label, equity in rows:
+        lines.append(f"| {rank} | {_cell(name)} | {_cell(label)} | {equity:,}円 |")
+    st.markdown("\n".join(lines))
+
+# 卓ごとの進み具合（ターン・手番・トップ・最後の報告からの時間）
+def display_tables(tables):
+    now = time.monotonic()
+    lines = ["| 卓 | ターン | 手番 | トップ | 最終報告 |", "|---|---:|---|---|---:|"]
+    for table in tables:
+        leader = max(range(len(table.names)), key=lambda seat: table.equities[seat])
+        turn = "🏁 終了" if table.finished else f"{min(table.turn, NUM_TURNS)}/{NUM_TURNS}"
+        current = "" if table.finished else f"{PLAYER_COLORS[table.current_player]} {_cell(table.names[table.current_player])}"
+        lines.append(
+            f"| {_cell(table.label)} | {turn} | {current} "
+            f"| {_cell(table.names[leader])}（{table.equities[leader]:,}円） | {now - table.updated:.0f}秒前 |")
+    st.markdown("\n".join(lines))
+
+# 表のセルに入れる文字（| で表が崩れないようにする）
+def _cell(text):
+    return str(text).replace("|", "｜")
@@ -0,0 +1,192 @@
+# 開始画面とオンライン対戦の待合室
+import os
+import uuid
+
+import streamlit as st
+
+from .. import game
+from ..board import LAYOUTS, BoardConfig
+from ..components import room_listener
+from ..forecast import FAIR_BOARD_BIAS
+from ..rooms import MAX_SEATS
+from ..rules import BOARD_SIZE, BOARD_COLS, NUM_TURNS, PLAYER_COLORS
+from ..tables import normalize_code
+from ..undo import UndoHistory
+from .actions import on_room_push, resume_game, run_bots
+from .dashboard import open_dashboard
+from .session import current_room, enter_room, get_hub, get_rooms, get_store, leave_room, report_table
+from .viewer import replay_list
+
+# ゲーム開始画面
+def game_start_screen():
+    st.title("🎮 年間収益勝ち組ゲーム")
+    st.subheader("会社経営すごろくゲーム")
+    
+    st.write("---")
+    st.write("### ゲームルール")
+    st.write("- 初期資金: 5,000円")
+    st.write(f"- {NUM_TURNS}ターン経営を行い、最も純資産が多いプレイヤーが勝利！")
+    st.write("- サイコロを振ってマスを進み、止まったマスの指示に従います")
+    st.write("- ボーナスタイムではボトルフリップに挑戦！")
+    st.write("- 投資した資産は売るまで持ち続け、ターンの終わりごとに時価で評価されます（いくつでも持てます）")
+    st.write("")
+    
+    num_players = st.number_input("プレイヤー数", min_value=2, max_value=4, value=4)
+    
+    st.write("### プレイヤー名入力")
+    player_names = []
+    bot_seats = []
+    cols = st.columns(num_players)
+    for i in range(num_players):
+        with cols[i]:
+            name = st.text_input(f"プレイヤー{i+1}", value=f"プレイヤー{i+1}", key=f"player_{i}")
+            if st.checkbox("🤖 コンピューター", key=f"bot_{i}"):
+                bot_seats.append(i)
+                name = f"🤖 {name}"
+            player_names.append(name)
+    
+    with st.expander("⚙️ ボードの設定"):
+        board_size = st.number_input("マスの数", min_value=12, max_value=10_000, value=BOARD_SIZE, step=12)
+        board_cols = st.number_input("列数", min_value=4, max_value=50, value=BOARD_COLS)
+        board_layout = st.radio("並べ方", LAYOUTS, horizontal=True,
+                                format_func=lambda layout: {'serpentine': "蛇行", 'rows': "行ごと"}[layout])
+        fair_board = st.checkbox("偏りの少ないボードにする",
+                                 help="スタートから止まるマスの損益の期待値が、同じマスの数のボードの平均に近くなるよう並べます")
+    
+    seed = st.text_input("シード（空欄ならランダム）", value="", help="同じシードで同じ選択をすると同じゲームになります")
+    
+    with st.expander("🏆 イベントに参加する", expanded='event' in st.query_params):
+        st.caption("同じイベントコードを入れた卓（ここで始めるゲームやオンライン対戦の部屋）の順位を、主催者の画面でまとめて見られます")
+        event_code = normalize_code(st.text_input("イベントコード", value=st.query_params.get('event', ""), key="event_code_input"))
+        table_name = st.text_input("卓の名前（空欄なら自動）", value=st.query_params.get('table', ""), key="table_name_input").strip()
+        st.button("📊 主催者の画面を開く", disabled=not event_code, on_click=open_dashboard, args=(event_code,))
+    
+    if st.button("🚀 ゲームスタート", type="primary", use_container_width=True):
+        state = game.new_game(uuid.uuid4().hex, player_names,
+                              int(seed) if seed.strip().isdigit() else None, bot_seats,
+                              BoardConfig(int(board_size), int(board_cols), board_layout,
+                                          max_bias=FAIR_BOARD_BIAS if fair_board else None))
+        st.session_state.update(state)
+        st.session_state.action_messages = []
+        st.session_state.undo_history = UndoHistory()
+        st.session_state.event_code = event_code or None
+        st.session_state.table_name = table_name or None
+        store = get_store()
+        if store is not None:
+            store.create_game(state)
+        st.query_params['game'] = state['game_id']
+        if event_code:
+            st.query_params['event'] = event_code
+        if table_name:
+            st.query_params['table'] = table_name
+        run_bots()
+        report_table()
+        st.rerun()
+    
+    # オンライン対戦（各プレイヤーが自分のブラウザから参加する）
+    st.write("---")
+    st.write("### 🌐 オンライン対戦")
+    if 'room_error' in st.session_state:
+        st.error(st.session_state.pop('room_error'))
+    online_name = st.text_input("あなたの名前", value="プレイヤー", key="online_name")
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("🏠 部屋を作る", use_container_width=True, disabled=not online_name.strip()):
+            try:
+                room, token = get_rooms().create_room(online_name.strip(), event_code or None)
+            except ValueError as error:
+                st.error(str(error))
+            else:
+                enter_room(room, token)
+                st.rerun()
+    with col2:
+        room_id = st.text_input("部屋ID", value=st.query_params.get('room', ""), key="join_room_id")
+        join, watch = st.columns(2)
+        if join.button("🚪 参加する", disabled=not (room_id.strip() and online_name.strip())):
+            room = get_rooms().get(room_id)
+            try:
+                if room is None:
+                    raise ValueError("部屋が見つかりません")
+                enter_room(room, room.join(online_name.strip()))
+            except ValueError as error:
+                st.error(str(error))
+            else:
+                st.rerun()
+        if watch.button("👀 観戦する", disabled=not room_id.strip()):
+            room = get_rooms().get(room_id)
+            if room is None:
+                st.error("部屋が見つかりません")
+            else:
+                enter_room(room, None)
+                st.rerun()
+    
+    # 保存されたゲームの再開
+    store = get_store()
+    if store is not None:
+        st.write("---")
+        st.write("### ゲームの再開")
+        resume_id = st.text_input("ゲームID", key="resume_game_id")
+        if st.button("▶️ 再開する", disabled=not resume_id):
+            if resume_game(resume_id.strip()):
+                st.rerun()
+            st.error("ゲームが見つかりません")
+        
+        st.write("### 📼 リプレイ・観戦")
+        st.caption("終わったゲームを見返したり、プレイ中のゲームを観戦したりできます（URL に ?replay=観戦ID でも開けます）")
+        replay_list(store)
+
+# 部屋の待合室（部屋を作った人がコンピューターを加えてゲームを始める）
+def room_lobby_screen(room):
+    st.title("🌐 オンライン対戦")
+    st.subheader(f"部屋ID: {room.room_id}")
+    st.caption("この部屋IDを他のプレイヤーに伝えてください（URL に ?room=部屋ID を付けても参加できます）")
+    if room.event is not None:
+        st.caption(f"🏆 イベント {room.event} の卓です")
+    
+    seat = room.seat_of(st.session_state.get('room_token'))
+    for i, name in enumerate(st.session_state.room_seats):
+        st.write(f"{PLAYER_COLORS[i]} {name}{'（あなた）' if i == seat else ''}")
+    
+    if seat == 0:
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("🤖 コンピューターを加える", disabled=len(st.session_state.room_seats) >= MAX_SEATS):
+                try:
+                    room.add_bot(st.session_state.room_token)
+                except ValueError as error:
+                    st.error(str(error))
+                else:
+                    st.rerun()
+        with col2:
+            if st.button("🚀 ゲームスタート", type="primary", disabled=len(st.session_state.room_seats) < 2):
+                try:
+                    room.start(st.session_state.room_token)
+                except ValueError as error:
+                    st.error(str(error))
+                else:
+                    st.rerun()
+    else:
+        st.info("部屋を作った人がゲームを始めるのを待っています。")
+    
+    if st.button("🚪 部屋を出る"):
+        leave_room()
+        st.rerun()
+
+# 部屋の更新を待つ（ハブがあれば知らせを受けたときだけ、なければ数秒ごとに版を確かめて再実行する）
+def watch_room(room):
+    hub = get_hub()
+    if hub is not None:
+        room_listener_fragment(room, hub)
+    else:
+        room_poll_fragment()
+
+@st.fragment(key='room_listener')
+def room_listener_fragment(room, hub):
+    room_listener(room.room_id, st.session_state.room_version, hub.port,
+                  os.environ.get('SUGOROKU_HUB_URL'), on_push=on_room_push)
+
+@st.fragment(run_every="2s")
+def room_poll_fragment():
+    room = current_room()
+    if room is not None and room.version != st.session_state.get('room_version'):
+        st.rerun()
@@ -0,0 +1,299 @@
+# ゲーム中の画面（ボード・手番のパネル・プレイヤー状況・開発者パネル）
+import streamlit as st
+
+from .. import forecast, metrics
+from ..components import candlestick_replay, sugoroku_board
+from ..journal import profit_of
+from ..portfolio import CANDLES_PER_TURN
+from ..rules import NUM_TURNS, MASS_TYPES, PLAYER_COLORS, RULES
+from ..store import watch_id
+from .actions import (
+    UNDO_LABELS, bonus_action, buy_action, candlestick_json, current_turn_player, end_turn_action,
+    redo_action, roll_dice_action, run_action, sell_action, skip_action, undo_action,
+)
+from .session import get_store, is_my_turn
+
+# すごろくボードの表示
+def display_board():
+    st.subheader("🎲 すごろくボード")
+    
+    # レイアウトはゲームごとに一度だけ送り、以降はコマの位置と手番だけを送る
+    sugoroku_board(
+        st.session_state.game_id,
+        st.session_state.board,
+        st.session_state.players,
+        st.session_state.current_player,
+    )
+
+# 保有の今のローソク足までの図の JSON（購入時に先読みしたもの。なければ作って、保有とローソク足ごとに一度だけ持つ）
+def candlestick_figure_json(holding):
+    key = (st.session_state.game_id, holding.holding_id, holding.candle)
+    cached = st.session_state.get('candlestick_figure')
+    if cached is None or cached[:3] != key:
+        cached = key + (candlestick_json(st.session_state.portfolio.history(holding.holding_id)),)
+        st.session_state.candlestick_figure = cached
+    return cached[3]
+
+# 手番のプレイヤーの保有の一覧と売却ボタン、選んだ保有のこれまでの値動き
+def display_holdings(player):
+    holdings = st.session_state.portfolio.held(player.number)
+    if not holdings:
+        return
+    st.write("### 📊 保有している投資")
+    st.caption(f"ターンの終わりごとに、ローソク足 {CANDLES_PER_TURN} 本分進めて時価で評価し直します。いつでも今の評価額で売却できます。")
+    for holding in holdings:
+        profit = holding.value - holding.cost
+        col1, col2, col3, col4 = st.columns([3, 3, 2, 2])
+        col1.write(f"#{holding.holding_id} {holding.investment_type}（ターン{holding.turn}に購入）")
+        col2.write(f"{holding.cost:,}円 → {holding.value:,}円")
+        col3.write(f"{profit:+,}円 {'📈' if profit >= 0 else '📉'}")
+        col4.button("💰 売却", key=f"sell_{holding.holding_id}", on_click=run_action, args=(sell_action, holding.holding_id))
+    
+    # 値動きの図は選んだときだけ作る（plotly はここで初めて読み込む）
+    names = {holding.holding_id: f"#{holding.holding_id} {holding.investment_type}" for holding in holdings}
+    if st.session_state.get('holding_chart') not in names:
+        st.session_state.holding_chart = None
+    chart = st.selectbox("値動きを見る", [None] + list(names), key='holding_chart',
+                         format_func=lambda holding_id: "（表示しない）" if holding_id is None else names[holding_id])
+    if chart is None:
+        return
+    holding = st.session_state.portfolio.holding(chart)
+    with metrics.section('candlestick_chart'):
+        sell_index = candlestick_replay(
+            f"{chart}_{holding.candle}", candlestick_figure_json(holding), holding.cost,
+            on_sell=lambda sell_index: run_action(sell_action, chart), history=True)
+    
+    # コールバックを経由せずに売却の値が入った場合（AppTest で値を直接設定したときなど）
+    if sell_index is not None:
+        st.session_state.action_messages = []
+        sell_action(chart)
+        st.rerun()
+
+# 財務諸表の表示
+def display_financial_statement(player):
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.subheader("📊 貸借対照表（B/S）")
+        
+        # 資産の部
+        st.write("**【資産の部】**")
+        st.write(f"現金: {player.cash:,}円")
+        for asset, value in player.asset_items():
+            st.write(f"{asset}: {value:,}円")
+        total_assets = player.get_total_assets()
+        st.write(f"**資産合計: {total_assets:,}円**")
+        
+        st.write("")
+        
+        # 負債・純資産の部
+        st.write("**【負債・純資産の部】**")
+        st.write(f"借金: {player.debt:,}円")
+        equity = player.get_equity()
+        st.write(f"**純資産: {equity:,}円**")
+        st.write(f"**負債・純資産合計: {total_assets:,}円**")
+    
+    with col2:
+        st.subheader("💵 損益計算書（P/L）")
+        st.write(f"収益: {player.revenue:,}円")
+        st.write(f"費用: {player.expenses:,}円")
+        if player.valuation_gain:
+            st.write(f"投資の評価損益: {player.valuation_gain:+,}円")
+        st.write("─" * 30)
+        profit = player.get_profit()
+        if profit >= 0:
+            st.write(f"**利益: {profit:,}円** ✨")
+        else:
+            st.write(f"**損失: {profit:,}円** 😰")
+        # 前のターンの締めからの増減（締めの残高の写しから読む）
+        closed = player.journal.last_close()
+        if closed is not None:
+            st.caption(f"ターン{closed[0]}の締めから {profit - profit_of(closed[1]):+,}円")
+        
+        st.write("")
+        
+        st.subheader("💰 キャッシュフロー計算書（C/F）")
+        st.write(f"営業CF: {player.cf_operations:,}円")
+        st.write(f"投資CF: {player.cf_investment:,}円")
+        st.write(f"財務CF: {player.cf_financing:,}円")
+
+# すごろくボード
+@st.fragment(key='board')
+@metrics.timed('board')
+def board_fragment():
+    display_board()
+
+# 手番のプレイヤーの状態・操作・財務諸表
+@st.fragment(key='turn_panel')
+@metrics.timed('turn_panel')
+def turn_panel_fragment():
+    # 現在のプレイヤー
+    current_player = current_turn_player()
+    
+    st.header(f"🎯 {PLAYER_COLORS[current_player.number]} {current_player.name} のターン")
+    
+    # プレイヤーの状態表示
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("現在位置", f"{current_player.position}マス目")
+    with col2:
+        st.metric("現金", f"{current_player.cash:,}円")
+    with col3:
+        st.metric("純資産", f"{current_player.get_equity():,}円")
+    with col4:
+        st.metric("利益", f"{current_player.get_profit():,}円")
+    
+    st.write("---")
+    
+    # オンライン対戦で自分の手番でなければ、直前の操作の結果だけを出して待つ
+    if not is_my_turn():
+        st.info(f"{current_player.name} の手番です。順番が来るまでお待ちください。")
+        for kind, text in st.session_state.get('action_messages', []):
+            getattr(st, kind)(text)
+        return
+    
+    # サイコロを振るボタン（まだ振っていない場合のみ表示）
+    if not st.session_state.dice_rolled:
+        st.button("🎲 サイコロを振る", type="primary", use_container_width=True,
+                  on_click=run_action, args=(roll_dice_action,))
+    
+    # サイコロを振った後の表示
+    if st.session_state.dice_rolled:
+        st.success(f"✅ サイコロの目: {st.session_state.last_dice}")
+        
+        mass_type = st.session_state.board[current_player.position]
+        mass_name = MASS_TYPES[mass_type]['name']
+        st.info(f"📍 現在のマス: {mass_name}")
+    
+    # この先の投資マス・ボーナスマスまでの距離（マスの種類ごとの位置の索引から引く）
+    board = st.session_state.board
+    if hasattr(board, 'next_position'):
+        ahead = []
+        for mass_type in RULES.keys_with('investment', 'bonus'):
+            found = board.next_position(mass_type, current_player.position)
+            if found is not None:
+                ahead.append(f"{MASS_TYPES[mass_type]['emoji']} 次の{MASS_TYPES[mass_type]['name']}: {found[0]}マス目（あと{found[1]}マス）")
+        st.caption(" / ".join(ahead))
+    
+    # 直前の操作の結果
+    for kind, text in st.session_state.get('action_messages', []):
+        getattr(st, kind)(text)
+    
+    # ボーナスモード
+    if st.session_state.get('bonus_mode', False):
+        st.write("### 🎉 ボーナスタイム！")
+        st.write("ボトルフリップに挑戦しましょう！")
+        
+        st.button("🍾 ボトルフリップ開始", type="primary", on_click=run_action, args=(bonus_action,))
+    
+    # 投資決定モード
+    if st.session_state.get('investment_pending', False):
+        st.write("### 🏢 投資オプション")
+        st.write(f"投資タイプ: {st.session_state.investment_type}")
+        st.write(f"投資額: {st.session_state.investment_amount:,}円")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.button("✅ 購入する", type="primary", on_click=run_action, args=(buy_action,))
+        
+        with col2:
+            st.button("❌ 購入しない", on_click=run_action, args=(skip_action,))
+    
+    # 保有している投資（売却はサイコロを振った後、ターン終了までいつでもできる）
+    if st.session_state.dice_rolled and not st.session_state.get('bonus_mode', False) and not st.session_state.get('investment_pending', False):
+        display_holdings(current_player)
+    
+    # 財務諸表表示
+    if st.session_state.dice_rolled and not st.session_state.get('investment_pending', False):
+        st.write("---")
+        with metrics.section('financial_statement'):
+            display_financial_statement(current_player)
+    
+    # ターン終了ボタン（サイコロを振った後のみ表示）
+    if st.session_state.dice_rolled and not st.session_state.get('bonus_mode', False) and not st.session_state.get('investment_pending', False):
+        st.write("---")
+        st.button("✅ ターン終了 - 次のプレイヤーへ", use_container_width=True, type="primary",
+                  on_click=run_action, args=(end_turn_action,))
+    
+    display_undo_buttons()
+
+# 元に戻す / やり直すボタン（ホットシートのゲームだけ。オンライン対戦では出さない）
+def display_undo_buttons():
+    history = st.session_state.get('undo_history')
+    if history is None or st.session_state.get('room_id'):
+        return
+    undo_kind = history.undo_kind()
+    redo_kind = history.redo_kind()
+    st.write("---")
+    col1, col2 = st.columns(2)
+    col1.button(f"↩️ 元に戻す（{UNDO_LABELS[undo_kind]}）" if undo_kind else "↩️ 元に戻す", use_container_width=True,
+                disabled=undo_kind is None, on_click=run_action, args=(undo_action,))
+    col2.button(f"↪️ やり直す（{UNDO_LABELS[redo_kind]}）" if redo_kind else "↪️ やり直す", use_container_width=True,
+                disabled=redo_kind is None, on_click=run_action, args=(redo_action,))
+
+# 全プレイヤーの状況
+@st.fragment(key='sidebar')
+@metrics.timed('sidebar')
+def sidebar_fragment():
+    st.header("👥 プレイヤー状況")
+    if st.session_state.get('room_id'):
+        st.caption(f"🌐 部屋ID: {st.session_state.room_id}")
+    if get_store() is not None:
+        st.caption(f"👀 観戦用の URL: ?replay={watch_id(st.session_state.game_id)}")
+    # 最終的な純資産の見込み（残りの手番で止まるマスの確率から計算する）
+    outlook = forecast.equity_outlook(st.session_state)
+    for i, player in enumerate(st.session_state.players):
+        is_current = i == st.session_state.current_player
+        with st.expander(f"{PLAYER_COLORS[i]} {player.name} {'🎯 (現在)' if is_current else ''}", expanded=is_current):
+            st.write(f"位置: {player.position}マス目")
+            st.write(f"現金: {player.cash:,}円")
+            if any(player.asset_values):
+                st.write(f"保有の評価額: {sum(player.asset_values):,}円")
+            st.write(f"純資産: {player.get_equity():,}円")
+            st.write(f"利益: {player.get_profit():,}円")
+            mean, std = outlook[i]
+            st.caption(f"📈 最終純資産の見込み: {mean:,.0f}円（±{std:,.0f}円）")
+
+# メインゲーム画面
+def main_game_screen():
+    st.title("🎮 年間収益勝ち組ゲーム")
+    
+    # ターン表示
+    progress = st.session_state.turn / NUM_TURNS
+    st.progress(progress, text=f"ターン {st.session_state.turn}/{NUM_TURNS}")
+    
+    # すごろくボードの表示
+    board_fragment()
+    
+    st.write("---")
+    
+    turn_panel_fragment()
+    
+    # サイドバーに全プレイヤーの状況表示
+    with st.sidebar:
+        sidebar_fragment()
+        if metrics.ENABLED:
+            developer_panel()
+
+# 開発者パネル（SUGOROKU_METRICS=1 のときだけ表示。数秒ごとに更新する）
+@st.fragment(run_every="3s")
+def developer_panel():
+    with st.expander("🛠 開発者パネル"):
+        last = st.session_state.get('metrics_last_run')
+        if last is not None:
+            st.caption(f"直前の再実行: {last['seconds'] * 1000:.1f}ms")
+            st.table([{'部分': name, 'ms': round(seconds * 1000, 2)} for name, seconds in last['sections'].items()])
+        
+        st.caption("プロセス全体")
+        rows = []
+        for name, labels, kind, value in metrics.snapshot():
+            label = ", ".join(f"{key}={item}" for key, item in labels.items())
+            if kind == 'counter':
+                rows.append({'指標': name, 'ラベル': label, '回数': value, '平均': None, '最大': None})
+            else:
+                rows.append({'指標': name, 'ラベル': label, '回数': value['count'],
+                             '平均': value['sum'] / value['count'], '最大': value['max']})
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+        
+        st.download_button("Prometheus 形式", metrics.prometheus_text(), file_name="sugoroku.prom")
+        st.download_button("JSON lines", metrics.json_lines(), file_name="sugoroku.jsonl")
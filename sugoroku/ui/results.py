@@ -0,0 +1,96 @@
+# ゲーム終了画面（分析に pandas と plotly を使うので、終了したときに読み込む）
+import streamlit as st
+
+from .. import analytics, metrics
+from ..rules import PLAYER_COLORS
+from .actions import UNDO_LABELS, run_action, undo_action
+from .charts import build_analytics_figures
+from .play import display_financial_statement
+from .session import current_event, get_store, get_tables
+from .viewer import open_replay
+
+# 終了したゲームの分析（ゲームごとに一度だけ計算し、終了画面の再実行では作り直さない）
+# 元に戻して別の終わり方をしたら作り直すよう、各プレイヤーの仕訳帳の残高もキーに入れる
+@st.cache_resource(max_entries=64, show_spinner=False)
+def game_analytics(game_id, players_key, _players, _portfolio):
+    result = analytics.analyze(_players, portfolio=_portfolio)
+    names = result['names']
+    ledger = result['ledger']
+    table = ledger[['turn', 'type', 'amount', 'reason', 'cash_after']].copy()
+    table.insert(0, 'player', [names[i] for i in ledger['player']])
+    result['table'] = table
+    return result, build_analytics_figures(result)
+
+# 終了したゲームの分析の表示
+def display_analytics():
+    players = st.session_state.players
+    players_key = tuple((player.checkpoint(), tuple(player.journal.balances)) for player in players)
+    result, figures = game_analytics(st.session_state.game_id, players_key, players, st.session_state.portfolio)
+
+    tab_curves, tab_pl, tab_cf, tab_roi, tab_ledger = st.tabs(
+        ["📈 推移", "💵 収益と費用", "💰 キャッシュフロー", "🏢 投資", "📜 取引履歴"])
+    with tab_curves:
+        st.plotly_chart(figures['curves'], use_container_width=True)
+    with tab_pl:
+        st.plotly_chart(figures['pl'], use_container_width=True)
+    with tab_cf:
+        st.plotly_chart(figures['cash_flow'], use_container_width=True)
+    with tab_roi:
+        st.plotly_chart(figures['roi'], use_container_width=True)
+        summary = result['investment_summary'].rename(
+            index=dict(enumerate(result['names'])),
+            columns={'cost': '投資額', 'proceeds': '売却額・評価額', 'count': '件数', 'roi': '利回り'})
+        st.dataframe(summary, use_container_width=True)
+    with tab_ledger:
+        st.dataframe(result['table'], use_container_width=True, hide_index=True)
+
+# 参加しているイベント（参加していなければ None）と、その中でのこの卓の ID
+def event_standing():
+    code = current_event()
+    return get_tables().event(code) if code else None
+
+def event_table_id():
+    return st.session_state.room_id if st.session_state.get('room_id') else st.session_state.game_id
+
+# ゲーム終了画面
+def game_end_screen():
+    st.title("🏆 ゲーム終了！")
+    st.balloons()
+    st.caption(f"シード: {st.session_state.seed}（同じシードで同じ選択をすると同じゲームを再現できます）")
+    
+    # 順位を計算
+    rankings = sorted(st.session_state.players, key=lambda p: p.get_equity(), reverse=True)
+    
+    st.subheader("最終順位")
+    
+    medals = ["🥇", "🥈", "🥉", "4️⃣"]
+    event = event_standing()
+    
+    for i, player in enumerate(rankings):
+        medal = medals[i] if i < len(medals) else f"{i+1}位"
+        label = f"{medal} {PLAYER_COLORS[player.number]} {player.name} - 純資産 {player.get_equity():,}円"
+        if event is not None:
+            rank = event.rank_of(event_table_id(), player.number)
+            if rank is not None:
+                label += f"（イベント {rank}位 / {len(event.leaderboard)}人）"
+        with st.expander(label, expanded=(i==0)):
+            display_financial_statement(player)
+    
+    st.subheader("ゲームの分析")
+    with metrics.section('analytics'):
+        display_analytics()
+    
+    st.write("---")
+    
+    history = st.session_state.get('undo_history')
+    if history is not None and history.can_undo() and not st.session_state.get('room_id'):
+        st.button(f"↩️ 元に戻す（{UNDO_LABELS[history.undo_kind()]}）", use_container_width=True,
+                  on_click=run_action, args=(undo_action,))
+    if get_store() is not None:
+        st.button("📼 リプレイを見る", use_container_width=True, on_click=open_replay, args=(st.session_state.game_id,))
+    if st.button("🔄 新しいゲームを始める", type="primary", use_container_width=True):
+        # セッションステートをリセット
+        for key in list(st.session_state.keys()):
+            del st.session_state[key]
+        st.query_params.clear()
+        st.rerun()
@@ -0,0 +1,100 @@
+# セッション状態と、プロセスで共有するもの（保存先・部屋の一覧・ハブ・イベントの卓の一覧・コンピューターの表）
+import os
+
+import streamlit as st
+
+from .. import bots
+from ..hub import start_hub
+from ..rooms import RoomManager
+from ..store import open_store
+from ..tables import TableRegistry
+
+# 最初の実行でセッション状態を初期化する
+def init_session():
+    if 'game_started' in st.session_state:
+        return
+    st.session_state.game_started = False
+    st.session_state.current_player = 0
+    st.session_state.turn = 1
+    st.session_state.players = []
+    st.session_state.board = []
+    st.session_state.num_players = 4
+    st.session_state.dice_rolled = False
+    st.session_state.investment_pending = False
+    st.session_state.investment_amount = 0
+    st.session_state.investment_type = ""
+    st.session_state.investment_position = 0
+    st.session_state.action_messages = []
+
+# コンピューターの表の用意を、サーバーで1度だけ裏のスレッドで始める（最初のコンピューターの手番で待たないように）
+@st.cache_resource
+def warm_up_bots():
+    return bots.warm_up()
+
+# ゲームの保存先（環境変数 SUGOROKU_DB で変更、空にすると保存しない）
+@st.cache_resource
+def get_store():
+    path = os.environ.get('SUGOROKU_DB', 'sugoroku.db')
+    return open_store(path) if path else None
+
+# オンライン対戦の部屋の一覧（プロセスで1つ）
+@st.cache_resource
+def get_rooms():
+    return RoomManager(store=get_store(), tables=get_tables())
+
+# イベント（複数の卓の合同の順位）の卓の一覧（プロセスで1つ）
+@st.cache_resource
+def get_tables():
+    return TableRegistry()
+
+# 部屋の更新をブラウザに知らせるハブ（環境変数 SUGOROKU_HUB_PORT、空にすると使わない）
+# 待ち受けるアドレスは SUGOROKU_HUB_HOST（既定はこのマシンだけの 127.0.0.1）
+# 立てられなければ None で、画面は数秒ごとに部屋の版を確かめる
+@st.cache_resource
+def get_hub():
+    port = os.environ.get('SUGOROKU_HUB_PORT', '8765')
+    host = os.environ.get('SUGOROKU_HUB_HOST') or '127.0.0.1'
+    return start_hub(get_rooms(), int(port), host) if port else None
+
+# 参加している部屋（ホットシートのゲームなら None）
+def current_room():
+    room_id = st.session_state.get('room_id')
+    return get_rooms().get(room_id) if room_id else None
+
+# 部屋に入る（token が None なら観戦）
+def enter_room(room, token):
+    st.session_state.room_id = room.room_id
+    st.session_state.room_token = token
+    st.query_params['room'] = room.room_id
+    if token is not None:
+        st.query_params['seat'] = token
+
+# 部屋を出る（ゲームの状態も初期状態に戻す）
+def leave_room():
+    for key in list(st.session_state.keys()):
+        del st.session_state[key]
+    st.query_params.clear()
+
+# 部屋の最新の写しをセッションに読み込む（版が変わったときだけ）
+def sync_room(room):
+    if st.session_state.get('room_version') != room.version:
+        st.session_state.update(room.view())
+
+# 自分の手番か（ホットシートなら常に True）
+def is_my_turn():
+    room = current_room()
+    return room is None or room.seat_of(st.session_state.room_token) == st.session_state.current_player
+
+# 参加しているイベントのコード（オンライン対戦なら部屋のもの。参加していなければ None）
+def current_event():
+    if st.session_state.get('room_id'):
+        return st.session_state.get('room_event')
+    return st.session_state.get('event_code')
+
+# イベントに参加しているホットシートのゲームの状態を、イベントの卓の一覧に知らせる
+# （オンライン対戦では部屋が知らせる）
+def report_table():
+    code = st.session_state.get('event_code')
+    if code and not st.session_state.get('room_id') and st.session_state.get('game_started'):
+        label = st.session_state.get('table_name') or f"卓 {st.session_state.game_id[:6]}"
+        get_tables().report(code, st.session_state.game_id, label, st.session_state)
@@ -0,0 +1,130 @@
+# リプレイと観戦の画面（?replay=観戦ID）
+#
+# 保存されたゲームを読むだけで、プレイヤーのセッションの状態には触れない。
+# URL と画面にはゲームIDではなく観戦IDを出す（ゲームIDを知っているとゲームを再開して操作できるため）。
+# 途中のゲームは数秒ごとに追加された手を読み足し、「最新を追う」ときは最新の手を表示する。
+import time
+
+import streamlit as st
+
+from ..components import sugoroku_board
+from ..replay import open_recording
+from ..rules import NUM_TURNS, PLAYER_COLORS
+from ..store import watch_id
+from .session import get_store
+
+# リプレイ画面を開く / 閉じる
+def open_replay(game_id):
+    st.query_params['replay'] = watch_id(game_id)
+
+def close_replay():
+    del st.query_params['replay']
+    for key in ('replay_game', 'replay_seq', 'replay_follow', 'replay_jump'):
+        st.session_state.pop(key, None)
+
+# 表示する手を変える（コールバック専用。自分で動かしたら最新は追わない）
+def jump_to(seq):
+    st.session_state.replay_seq = seq
+    st.session_state.replay_follow = False
+
+def _on_slide():
+    st.session_state.replay_follow = False
+
+def _on_turn_select(recording):
+    jump_to(recording.turn_start(st.session_state.replay_turn))
+
+# リプレイ画面（watch は観戦ID）
+def replay_screen(watch):
+    st.title("📼 リプレイ")
+    store = get_store()
+    game_id = store.game_of(watch, flush=False) if store is not None else None
+    recording = open_recording(store, game_id) if game_id is not None else None
+    if recording is None:
+        st.error("ゲームが見つかりません")
+        st.button("🏠 戻る", on_click=close_replay)
+        return
+
+    if st.session_state.get('replay_game') != game_id:
+        st.session_state.replay_game = game_id
+        st.session_state.replay_seq = recording.latest
+        st.session_state.replay_follow = not recording.finished
+    if 'replay_jump' in st.session_state:
+        st.session_state.replay_seq = st.session_state.pop('replay_jump')
+    # 元に戻されて手が減ったときは、残っている最新の手にする
+    st.session_state.replay_seq = min(st.session_state.replay_seq, recording.latest)
+
+    st.caption(f"観戦ID: {watch}")
+    if not recording.finished:
+        st.checkbox("🔴 ライブ: 最新の手を追う", key='replay_follow')
+        live_fragment(recording)
+
+    replay_controls(recording)
+    display_replay_state(recording, st.session_state.replay_seq)
+
+    st.write("---")
+    st.button("🏠 戻る", on_click=close_replay)
+
+# 途中のゲームの手を読み足す（同じゲームを見ている人で読み込みを共有する）
+@st.fragment(run_every="2s")
+def live_fragment(recording):
+    if recording.refresh() and st.session_state.get('replay_follow'):
+        st.session_state.replay_jump = recording.latest
+        st.rerun()
+
+# 手の選択（スライダー・手番ごとの移動・ターンへの移動）
+def replay_controls(recording):
+    seq = st.session_state.replay_seq
+    starts = recording.move_starts()
+    previous = max((start for start in starts if start < seq), default=0)
+    following = min((start for start in starts if start > seq), default=recording.latest)
+
+    if recording.latest > 0:
+        st.slider("手", 0, recording.latest, key='replay_seq', on_change=_on_slide)
+
+    col1, col2, col3, col4, col5 = st.columns([1, 1, 1, 1, 2])
+    col1.button("⏮ 最初", on_click=jump_to, args=(0,), use_container_width=True)
+    col2.button("◀ 前の手番", on_click=jump_to, args=(previous,), use_container_width=True)
+    col3.button("次の手番 ▶", on_click=jump_to, args=(following,), use_container_width=True)
+    col4.button("最新 ⏭", on_click=jump_to, args=(recording.latest,), use_container_width=True)
+    turns = sorted({move.turn for move in recording.moves}) or [1]
+    col5.selectbox("ターンへ移動", turns, index=None, placeholder="ターンを選ぶ", key='replay_turn',
+                   label_visibility="collapsed", on_change=_on_turn_select, args=(recording,))
+
+# seq の手の後の状態（ボード・各プレイヤー・その手番の手）
+def display_replay_state(recording, seq):
+    state = recording.state_at(seq)
+    turn = min(state['turn'], NUM_TURNS)
+    st.progress(turn / NUM_TURNS, text=f"ターン {turn}/{NUM_TURNS}（{seq}/{recording.latest} 手）")
+
+    sugoroku_board(recording.game_id, state['board'], state['players'], state['current_player'], key='replay_board')
+
+    cols = st.columns(len(state['players']))
+    for col, player in zip(cols, state['players']):
+        with col:
+            st.metric(f"{PLAYER_COLORS[player.number]} {player.name}", f"{player.get_equity():,}円")
+            st.caption(f"位置 {player.position}マス目 / 現金 {player.cash:,}円 / 借金 {player.debt:,}円")
+
+    moves = recording.turn_moves(seq)
+    if moves:
+        player = moves[0].player
+        st.write(f"**{PLAYER_COLORS[player]} {recording.names[player]} の手番（ターン {moves[0].turn}）**")
+        for move in moves:
+            if move.seq == seq:
+                st.write(f"▶ **{move.label}**")
+            elif move.seq < seq:
+                st.write(move.label)
+            else:
+                st.caption(move.label)
+    if state['game_finished']:
+        winner = max(state['players'], key=lambda p: p.get_equity())
+        st.success(f"🏆 {winner.name} の勝ち（純資産 {winner.get_equity():,}円）")
+
+# 保存されたゲームの一覧（開始画面から開く）
+def replay_list(store, limit=10):
+    games = store.list_games(limit=limit)
+    if not games:
+        st.caption("保存されたゲームはまだありません")
+        return
+    for game_id, updated_at, finished in games:
+        label = f"{'🏁 終了' if finished else '🔴 プレイ中'}  {watch_id(game_id)[:8]}  {time.strftime('%m/%d %H:%M', time.localtime(updated_at))}"
+        st.button(label, key=f"replay_{game_id}", on_click=open_replay, args=(game_id,))
@@ -0,0 +1,107 @@
+# 操作の取り消し（元に戻す / やり直す）
+#
+# 人の操作1回と、それに続くコンピューターの手番のイベントをまとめて1つの手順にする。
+# 手順の前の状態の写し（Checkpoint）を取っておき、元に戻すときは写しの状態に戻し、
+# やり直すときは記録したイベントを game.replay_event で適用し直す（乱数の系列も同じだけ進む）。
+#
+# 写しは前の写しと中身を共有する。変わらなかったプレイヤーの写しと保有の写しはそのまま使い回し、
+# 仕訳帳と取引履歴は追記だけなので行数、乱数は系列ごとの引いた数だけを持つ。
+# 1手順で増えるメモリは、その手順で変わったものの分だけになる。
+from . import game
+
+# 取っておく手順の数（超えたら古いものから捨てる）
+MAX_STEPS = 200
+
+# 写しに入れる状態のキー（ボード・席・シードなどゲームの間に変わらないものと、別に写すものを除く）
+FIELDS = tuple(key for key in game.GAME_KEYS
+               if key not in ('game_id', 'game_started', 'seed', 'rng', 'board', 'players', 'num_players', 'bots',
+                              'portfolio'))
+
+
+# ある時点の状態の写し
+class Checkpoint:
+    __slots__ = ('fields', 'players', 'portfolio', 'rng')
+
+    def __init__(self, fields, players, portfolio, rng):
+        self.fields = fields
+        self.players = players
+        self.portfolio = portfolio
+        self.rng = rng
+
+
+# 状態の写し（previous と同じ部分は previous のものを使う）
+def checkpoint(state, previous=None):
+    players = tuple(player.checkpoint() for player in state['players'])
+    if previous is not None:
+        players = tuple(old if old == new else new for old, new in zip(previous.players, players))
+    return Checkpoint(
+        tuple(state[key] for key in FIELDS),
+        players,
+        state['portfolio'].checkpoint(previous.portfolio if previous is not None else None),
+        state['rng'].position(),
+    )
+
+
+# 写しの時点に状態を戻す
+def restore(state, cp):
+    for key, value in zip(FIELDS, cp.fields):
+        state[key] = value
+    for player, values in zip(state['players'], cp.players):
+        player.restore(values)
+    state['portfolio'].restore(cp.portfolio)
+    state['rng'].rewind(cp.rng)
+
+
+# 1つのゲームの、元に戻す / やり直すための手順の記録
+class UndoHistory:
+    def __init__(self, max_steps=MAX_STEPS):
+        self.max_steps = max_steps
+        self._undo = []   # (手順の前の写し, [イベント]) のリスト（新しいものが最後）
+        self._redo = []
+
+    # 人の操作の前に呼ぶ（新しい手順を始める。やり直せる手順は捨てる）
+    def begin(self, state):
+        previous = self._undo[-1][0] if self._undo else None
+        self._undo.append((checkpoint(state, previous), []))
+        self._redo.clear()
+        if len(self._undo) > self.max_steps:
+            del self._undo[0]
+
+    # 適用したイベントを今の手順に加える
+    def record(self, event):
+        if self._undo:
+            self._undo[-1][1].append(event)
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    # 元に戻す / やり直す手順の最初のイベントの種類（なければ None）
+    def undo_kind(self):
+        return self._undo[-1][1][0]['kind'] if self._undo else None
+
+    def redo_kind(self):
+        return self._redo[-1][1][0]['kind'] if self._redo else None
+
+    # 最後の手順の前に戻し、戻した手順のイベントのリストを返す
+    def undo(self, state):
+        cp, events = self._undo.pop()
+        restore(state, cp)
+        self._redo.append((cp, events))
+        return events
+
+    # 戻した手順を適用し直し、メッセージのリストを返す（applied はイベントを1つ適用するたびに呼ぶ）
+    def redo(self, state, applied=None):
+        cp, events = self._redo.pop()
+        messages = []
+        for event in events:
+            messages.extend(game.replay_event(state, event))
+            if applied is not None:
+                applied(event)
+        self._undo.append((cp, events))
+        return messages
+
+    def __len__(self):
+        return len(self._undo)
@@ -0,0 +1,36 @@
+# シードと選択の列からのゲームの再現
+from sugoroku import bots, game
+from sugoroku.board import BoardConfig
+
+
+# コンピューターの判断で最後まで進め、(状態, 選択の列) を返す
+def play(seed, board_config):
+    state = game.new_game('test', ["A", "B"], seed, board_config=board_config)
+    decisions = []
+    while not state['game_finished']:
+        kind, decision = bots.next_decision(state)
+        game.apply_event(state, game.draw_event(state, kind, **decision))
+        decisions.append((kind, decision))
+    return state, decisions
+
+
+def equities(state):
+    return [player.get_equity() for player in state['players']]
+
+
+def test_replay_default_board():
+    state, decisions = play(3, BoardConfig())
+    replayed = game.replay(state['seed'], ["A", "B"], decisions)
+    assert equities(replayed) == equities(state)
+    assert replayed['event_seq'] == state['event_seq']
+
+
+def test_replay_custom_board():
+    config = BoardConfig(60, cols=10)
+    state, decisions = play(7, config)
+    assert state['board'].config == config
+    replayed = game.replay(state['seed'], ["A", "B"], decisions, board_config=state['board'].config)
+    assert len(replayed['board']) == 60
+    assert (replayed['board'].codes == state['board'].codes).all()
+    assert equities(replayed) == equities(state)
+    assert replayed['event_seq'] == state['event_seq']